@@ -1,42 +1,47 @@
 # app.py
 import os
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 
 # state and utils
-from src.components.state import init_session_state
-from src.utils import search_inventory, low_stock, expiring_soon
+from src.components.state import (
+    init_session_state, session_inventory, session_transactions, session_rollups, load_tables, save_session,
+    load_budget_forecast, load_recipes, select_user, user_key,
+)
+from src.components.recipes import purchase_quantities
+from src.components.treemap import treemap_nodes
+from src.utils import search_inventory, expiring_soon
 
 # feature modules
 from src.model_training import shopping_list as sl_mod
 from src.model_training import dietary as diet_mod
 from src.model_training import budget as budget_mod
+from src.model_training import replenishment as restock_mod
 
 st.set_page_config(page_title="Smart Grocery Assistant", page_icon="🛒", layout="wide")
 init_session_state(st)
 
 # --- Load dataset (no upload) ---
 data_path = os.path.join("artifacts", "data.csv")
-if os.path.exists(data_path):
-    df = pd.read_csv(data_path)
-    expected = st.session_state._expected_inventory_cols
-    for c in expected:
-        if c not in df.columns:
-            df[c] = pd.NA
-    st.session_state.inventory = df[expected].copy()
-else:
+if not os.path.exists(data_path):
     st.error("❌ Dataset not found. Please place it in artifacts/data.csv")
     st.stop()
 
 # --- Sidebar Navigation ---
 with st.sidebar:
     st.markdown("### ⚙️ Navigation")
+    users = load_tables("artifacts").users["User_ID"].astype(str).tolist()
+    choice = st.selectbox("👤 User", ["All users"] + users, key="user_choice")
+    select_user(st, None if choice == "All users" else choice, "artifacts")
     menu = st.radio("Go to", [
-        "Dashboard", "Inventory", "Dietary Preferences",
+        "Dashboard", "Inventory", "Dietary Preferences", "Recipes",
         "Shopping List", "Budget", "Expiry Alerts"
     ])
 
+# Shared memory-mapped tables, narrowed to the session's user, + this session's edits
+st.session_state.inventory = session_inventory(st, "artifacts")
+transactions = session_transactions(st, "artifacts")
+
 st.title("🛒 Smart Grocery Assistant")
 
 # ---------------- Dashboard ----------------
@@ -51,25 +56,23 @@ if menu == "Dashboard":
             num /= 1000.0
         return f"{num:.1f}T"
 
-    # --- Metrics row ---
+    # --- Metrics row (precomputed rollups, see src/components/rollups.py) ---
+    rollups = session_rollups(st, "artifacts")
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("🛍️ Unique products", int(df["Product_Name"].nunique() if "Product_Name" in df.columns else len(df)))
-    c2.metric("⚠️ Low stock items", int(len(low_stock(df))))
+    c1.metric("🛍️ Unique products", int(rollups.unique_products))
+    c2.metric("⚠️ Low stock items", int(rollups.low_stock))
     c3.metric("⏳ Expiring soon (7d)", int(len(expiring_soon(df, days=7))))
-    total_inv_value = (
-        pd.to_numeric(df.get("unit_price_inr", 0), errors="coerce").fillna(0) *
-        pd.to_numeric(df.get("quantity_on_hand", 0), errors="coerce").fillna(0)
-    ).sum()
-    c4.metric("💰 Est. inventory value", f"₹{human_format(total_inv_value)}")
+    c4.metric("💰 Est. inventory value", f"₹{human_format(rollups.inventory_value)}")
 
     # --- Visualizations ---
     st.subheader("📦 Inventory Overview")
     col1, col2 = st.columns(2)
 
     with col1:
-        if "Category" in df.columns and not df["Category"].isna().all():
-            cat_summary = df.groupby("Category")["quantity_on_hand"].sum().reset_index()
-            fig1 = px.pie(cat_summary, names="Category", values="quantity_on_hand",
+        # largest categories + "Other", through the same aggregation as the treemap
+        cat_summary = treemap_nodes(rollups.category_frame(), path=["Category"], color=None)
+        if not cat_summary.empty:
+            fig1 = px.pie(cat_summary, names="labels", values="value",
                           hole=0.4, title="Category-wise Inventory Share")
             fig1.update_traces(textinfo="percent+label", pull=[0.05] * len(cat_summary))
             st.plotly_chart(fig1, use_container_width=True)
@@ -77,11 +80,8 @@ if menu == "Dashboard":
             st.info("No category data available for visualization.")
 
     with col2:
-        if "purchase_date" in df.columns and not df["purchase_date"].isna().all():
-            df2 = df.copy()
-            df2["purchase_date"] = pd.to_datetime(df2["purchase_date"], errors="coerce")
-            time_summary = df2.groupby(df2["purchase_date"].dt.to_period("M"))["quantity_purchased"].sum().reset_index()
-            time_summary["purchase_date"] = time_summary["purchase_date"].astype(str)
+        time_summary = rollups.monthly_frame()
+        if not time_summary.empty:
             fig2 = px.line(time_summary, x="purchase_date", y="quantity_purchased",
                            markers=True, title="Purchases Over Time")
             fig2.update_layout(xaxis_title="Month", yaxis_title="Quantity Purchased")
@@ -98,9 +98,11 @@ elif menu == "Inventory":
 
     st.subheader("🌐 Inventory Overview")
     if not view.empty and "Category" in view.columns:
-        fig = px.treemap(view, path=["Category", "Brand", "Product_Name"],
-                         values="quantity_on_hand", color="unit_price_inr",
-                         color_continuous_scale="RdBu",
+        # pre-aggregated Category → Brand → Product nodes (top-N per node + "Other")
+        nodes = treemap_nodes(view)
+        fig = px.treemap(ids=nodes["ids"], names=nodes["labels"], parents=nodes["parents"],
+                         values=nodes["value"], color=nodes["color"], branchvalues="total",
+                         color_continuous_scale="RdBu", labels={"color": "unit_price_inr"},
                          title="Category → Brand → Product (by Quantity & Price)")
         st.plotly_chart(fig, use_container_width=True, height=600)
     else:
@@ -119,7 +121,7 @@ elif menu == "Inventory":
         if st.button("Add to Shopping List"):
             row = view.loc[idx]
             st.session_state.shopping_list = sl_mod.add_from_inventory_row(
-                st.session_state.shopping_list, row=row, qty=qty, unit=unit
+                st.session_state.shopping_list, row=row, qty=qty, unit=unit, inventory=df
             )
             st.success(f"Added {row.get('Product_Name','(item)')} (qty {qty:g} {unit}) to shopping list.")
     else:
@@ -132,6 +134,7 @@ elif menu == "Dietary Preferences":
 
     c1, c2, c3 = st.columns(3)
     prefs["vegetarian"] = c1.checkbox("Vegetarian", value=prefs.get("vegetarian", False))
+    prefs["vegan"] = c1.checkbox("Vegan", value=prefs.get("vegan", False))
     prefs["gluten_free"] = c1.checkbox("Gluten-free", value=prefs.get("gluten_free", False))
     prefs["lactose_free"] = c2.checkbox("Lactose-free", value=prefs.get("lactose_free", False))
     prefs["nut_free"] = c2.checkbox("Nut-free", value=prefs.get("nut_free", False))
@@ -146,9 +149,15 @@ elif menu == "Dietary Preferences":
             st.rerun()
 
     st.write("**Allergies:**", ", ".join(prefs["allergies"]) or "None")
+    prefs["allergy_whole_words"] = st.checkbox(
+        "Match allergies as whole words (e.g. 'nut' won't exclude 'coconut')",
+        value=prefs.get("allergy_whole_words", False),
+    )
 
     st.subheader("🍴 Suggestions (based on preferences)")
-    all_suggestions = diet_mod.suggest_items_any(st.session_state.inventory, prefs)
+    match = st.radio("Match", ["Any selected preference", "All selected preferences"], horizontal=True)
+    mode = "all" if match.startswith("All") else "any"
+    all_suggestions = diet_mod.suggest_items(st.session_state.inventory, prefs, mode=mode)
 
     if 'display_limit' not in st.session_state:
         st.session_state.display_limit = 10
@@ -179,15 +188,48 @@ elif menu == "Dietary Preferences":
     if suggestion_list:
         idx = st.selectbox("Choose a product", options=list(range(len(suggestion_list))), format_func=lambda i: suggestion_list[i])
         qty = st.number_input("Quantity", min_value=1.0, step=1.0, value=1.0, key="diet_qty")
-        unit = all_suggestions.loc[idx, "unit"] if "unit" in all_suggestions.columns else "pcs"
+        unit = all_suggestions["unit"].iloc[idx] if "unit" in all_suggestions.columns else "pcs"
 
         if st.button("Add suggestion to Shopping List"):
-            row = all_suggestions.loc[idx]
+            row = all_suggestions.iloc[idx]
             st.session_state.shopping_list = sl_mod.add_from_inventory_row(
-                st.session_state.shopping_list, row=row, qty=qty, unit=unit
+                st.session_state.shopping_list, row=row, qty=qty, unit=unit, inventory=st.session_state.inventory
             )
             st.success(f"Added {row.get('Product_Name','(item)')} to shopping list.")
 
+# ---------------- Recipes ----------------
+elif menu == "Recipes":
+    st.header("🍳 What can I cook?")
+    df = st.session_state.inventory
+    recipes = load_recipes("artifacts")
+    ranked = recipes.coverage(df)  # every recipe against current stock, best coverage first
+
+    if ranked.empty:
+        st.info("No recipes in the dataset.")
+    else:
+        c1, c2 = st.columns(2)
+        c1.metric("Recipes", len(ranked))
+        c2.metric("Cookable now", int((ranked["coverage"] >= 1.0).sum()))
+        shown = ranked.head(50).assign(coverage=lambda r: (100 * r["coverage"]).round(1))
+        st.dataframe(shown.rename(columns={"coverage": "coverage_%"}), use_container_width=True)
+
+        labels = dict(zip(ranked["recipe_id"], ranked["recipe_name"] + " (" + ranked["recipe_id"] + ")"))
+        chosen = st.multiselect("Recipes to cook", options=list(labels), format_func=lambda r: labels[r])
+        if chosen:
+            missing = recipes.missing(df, chosen, load_tables("artifacts").products)
+            if missing.empty:
+                st.success("✅ Everything needed is in stock.")
+            else:
+                st.dataframe(missing[[c for c in ["Product_ID", "Product_Name", "Brand", "unit", "missing_qty"]
+                                      if c in missing.columns]], use_container_width=True)
+                if st.button("Add missing ingredients to Shopping List"):
+                    notes = [f"short {q:g} {u} for recipe" for q, u in zip(missing["missing_qty"], missing["unit"])]
+                    qty, units = purchase_quantities(missing["missing_qty"], missing["unit"])
+                    st.session_state.shopping_list = sl_mod.add_from_inventory_rows(
+                        st.session_state.shopping_list, missing, qty=qty, unit=units, note=notes, inventory=df
+                    )
+                    st.success(f"Added {len(missing)} items to shopping list.")
+
 # ---------------- Shopping List ----------------
 elif menu == "Shopping List":
     st.header("📝 My Shopping List")
@@ -208,6 +250,7 @@ elif menu == "Budget":
     st.header("💰 Budget Manager")
     planned = sl_mod.estimate_total(st.session_state.shopping_list)
     b = st.session_state.budget
+    key = user_key("artifacts", st.session_state.user_id)
     col1, col2, col3 = st.columns(3)
     b["monthly_budget"] = col1.number_input("Monthly budget (₹)", min_value=0.0, step=100.0, value=float(b.get("monthly_budget", 0.0)))
     b["spent_this_month"] = col2.number_input("Spent this month (₹)", min_value=0.0, step=50.0, value=float(b.get("spent_this_month", 0.0)))
@@ -222,6 +265,40 @@ elif menu == "Budget":
     if status["remaining"] < 0:
         st.error("⚠️ Over budget!")
 
+    st.subheader("📈 Month-end forecast")
+    if key is None:
+        st.info("Select a user in the sidebar to forecast their month-end spend.")
+    else:
+        # fitted once per data version for all users; this is a lookup
+        forecast = budget_mod.forecast_budget_status({
+            "monthly_budget": b["monthly_budget"],
+            "spent_this_month": b["spent_this_month"],
+            "planned_spend": planned,
+        }, load_budget_forecast("artifacts"), key)
+        f1, f2, f3 = st.columns(3)
+        f1.metric("Typical monthly spend (₹)", round(forecast["forecast_month"], 2))
+        f2.metric("Projected month-end spend (₹)", round(forecast["projected_spend"], 2))
+        f3.metric("Chance of going over budget", f"{forecast['overrun_probability']:.0%}")
+
+    st.subheader("🧺 Restock low-stock items within budget")
+    remaining = max(status["remaining"], 0.0)
+    plan = restock_mod.plan_restock(st.session_state.inventory, remaining)
+    if plan.empty:
+        st.info("No products are below their reorder level.")
+    else:
+        chosen = plan[plan["selected"]]
+        r1, r2 = st.columns(2)
+        r1.metric("Items to restock", f"{len(chosen)} of {len(plan)}")
+        r2.metric("Restock cost (₹)", round(float(chosen["cost"].sum()), 2))
+        st.dataframe(plan[[c for c in ["Product_Name", "Brand", "quantity_on_hand", "reorder_level",
+                                       "restock_qty", "cost", "urgency", "selected"] if c in plan.columns]],
+                     use_container_width=True)
+        if not chosen.empty and st.button("Add restock basket to Shopping List"):
+            st.session_state.shopping_list = restock_mod.fill_shopping_list(
+                st.session_state.shopping_list, plan, st.session_state.inventory
+            )
+            st.success(f"Added {len(chosen)} items to shopping list.")
+
 # ---------------- Expiry Alerts ----------------
 elif menu == "Expiry Alerts":
     st.header("⏰ Expiry Alerts")
@@ -249,3 +326,6 @@ elif menu == "Expiry Alerts":
             else:
                 st.write("**Expiry date:**", "N/A")
             st.write("**Quantity on hand:**", row.get("quantity_on_hand", "N/A"))
+
+# --- Persist this run's shopping-list changes ---
+save_session(st)
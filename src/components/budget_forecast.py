@@ -0,0 +1,189 @@
+# src/components/budget_forecast.py
+import json
+import math
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+from src.components.shared_inventory import data_version
+
+FORECAST_DIRNAME = "forecasts"
+MANIFEST_NAME = "forecasts.json"
+ALPHAS = np.round(np.linspace(0.1, 0.9, 9), 2)  # smoothing factors tried for every user
+PRIOR_MONTHS = 3  # weight of the pooled error variance in each user's (in months of history)
+_ARRAYS = ("mean", "std", "alpha", "n_months", "profile")
+
+# forecast dir -> (transactions version, BudgetForecast), loaded once per process
+_LOADED: Dict[str, tuple] = {}
+
+
+def _months(dates: pd.Series) -> np.ndarray:
+    """Months since 1970-01 of each date (-1 if missing)."""
+    m = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[M]")
+    out = m.astype(np.int64)
+    out[np.isnat(m)] = -1
+    return out
+
+
+def monthly_spend(transactions: pd.DataFrame, n_users: int):
+    """
+    (first month, spend matrix): total_spent of every user (rows, by
+    user_key) in every month from the first to the last purchase (columns),
+    in one bincount over the purchase log. Months without purchases are 0.
+    """
+    month = _months(transactions["purchase_date"])
+    user = transactions["user_key"].to_numpy().astype(np.int64)
+    spent = np.nan_to_num(pd.to_numeric(transactions["total_spent"], errors="coerce")
+                          .to_numpy(dtype=np.float64, na_value=np.nan))
+    ok = (month >= 0) & (user >= 0) & (user < n_users)
+    if not ok.any():
+        return 0, np.zeros((n_users, 0))
+    first = int(month[ok].min())
+    n_months = int(month[ok].max()) - first + 1
+    flat = user[ok] * n_months + (month[ok] - first)
+    matrix = np.bincount(flat, weights=spent[ok], minlength=n_users * n_months)
+    return first, matrix.reshape(n_users, n_months)
+
+
+def day_profile(transactions: pd.DataFrame) -> np.ndarray:
+    """Share of a month's spend made by the end of each day of the month (31 values), pooled over all users."""
+    dates = pd.to_datetime(transactions["purchase_date"], errors="coerce")
+    ok = dates.notna().to_numpy()
+    spent = np.nan_to_num(pd.to_numeric(transactions["total_spent"], errors="coerce")
+                          .to_numpy(dtype=np.float64, na_value=np.nan))
+    by_day = np.bincount(dates.dt.day.to_numpy()[ok].astype(np.int64) - 1, weights=spent[ok], minlength=31)
+    total = by_day.sum()
+    if total <= 0:
+        return np.arange(1, 32) / 31.0
+    return np.cumsum(by_day) / total
+
+
+def smooth(matrix: np.ndarray, alphas: np.ndarray = ALPHAS):
+    """
+    Simple exponential smoothing of every user's monthly series for every
+    alpha at once (arrays of shape alphas x users), starting at each user's
+    first month with a purchase. Returns (next-month level, sum of squared
+    one-step errors, number of errors).
+    """
+    n_users, n_months = matrix.shape
+    a = np.asarray(alphas, dtype=np.float64)[:, None]
+    level = np.full((len(a), n_users), np.nan)
+    sse = np.zeros((len(a), n_users))
+    n_err = np.zeros(n_users, dtype=np.int64)
+    for t in range(n_months):
+        x = matrix[:, t]
+        started = ~np.isnan(level[0])
+        err = np.where(started, x - level, 0.0)
+        sse += err ** 2
+        n_err += started
+        level = np.where(started, a * x + (1 - a) * level, np.where(x > 0, x, np.nan))
+    return level, sse, n_err
+
+
+class BudgetForecast:
+    """
+    Next-month spend forecast of every user (by user_key): smoothed level
+    `mean`, one-step error `std`, the alpha chosen for the user and the
+    months of history, plus the pooled day-of-month spend profile used to
+    project a month in progress.
+    """
+
+    def __init__(self, mean, std, alpha, n_months, profile, month: int = 0):
+        self.mean, self.std, self.alpha = mean, std, alpha
+        self.n_months, self.profile = n_months, profile
+        self.month = month  # months since 1970-01 of the forecast month
+
+    @classmethod
+    def fit(cls, transactions: pd.DataFrame, n_users: int, alphas: np.ndarray = ALPHAS) -> "BudgetForecast":
+        first, matrix = monthly_spend(transactions, n_users)
+        level, sse, n_err = smooth(matrix, alphas)
+        best = np.argmin(sse, axis=0)  # per-user alpha
+        users = np.arange(n_users)
+        mean, user_sse = level[best, users], sse[best, users]
+
+        seen = ~np.isnan(mean)
+        pooled_mean = float(matrix[seen].mean()) if seen.any() else 0.0
+        pooled_var = float(user_sse.sum() / n_err.sum()) if n_err.sum() else pooled_mean ** 2
+        # few months of history -> lean on the pooled error variance
+        var = (user_sse + PRIOR_MONTHS * pooled_var) / (n_err + PRIOR_MONTHS)
+        return cls(np.where(seen, mean, pooled_mean), np.sqrt(var), np.asarray(alphas)[best],
+                   n_err + seen, day_profile(transactions), first + matrix.shape[1])
+
+    def month_end(self, user_key: int, spent_so_far: float = 0.0, planned: float = 0.0,
+                  budget: Optional[float] = None, day: Optional[int] = None) -> dict:
+        """
+        Projected month-end spend of one user on `day` of the month, having
+        spent `spent_so_far` and with `planned` (e.g. the shopping list)
+        still to buy: spent + max(planned, forecast spend for the rest of
+        the month). With a budget, also the probability of going over it
+        (rest-of-month spend taken as normal around the forecast).
+        """
+        day = min(max(int(day or date.today().day), 1), 31)
+        done = float(self.profile[day - 1]) if day < 31 else 1.0
+        mu = float(self.mean[user_key]) * (1 - done)
+        sigma = float(self.std[user_key]) * math.sqrt(1 - done)
+        out = {"forecast_month": float(self.mean[user_key]), "expected_remaining": mu,
+               "projected_spend": float(spent_so_far) + max(float(planned), mu)}
+        if budget is not None:
+            headroom = float(budget) - float(spent_so_far)
+            if float(planned) > headroom:
+                p = 1.0
+            elif sigma <= 0:
+                p = float(mu > headroom)
+            else:
+                p = 0.5 * math.erfc((headroom - mu) / (sigma * math.sqrt(2)))
+            out["overrun_probability"] = p
+        return out
+
+
+def write_forecast(forecast: BudgetForecast, forecast_dir, version: Optional[str]) -> None:
+    forecast_dir = Path(forecast_dir)
+    forecast_dir.mkdir(parents=True, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(forecast_dir / f"{name}.npy", getattr(forecast, name), allow_pickle=False)
+    tmp = forecast_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps({"transactions_version": version, "month": forecast.month,
+                               "n_users": int(len(forecast.mean))}, indent=2), encoding="utf-8")
+    os.replace(tmp, forecast_dir / MANIFEST_NAME)
+
+
+def read_forecast(forecast_dir, version: Optional[str]) -> Optional[BudgetForecast]:
+    """Stored forecast, or None if missing or fitted on other transactions."""
+    forecast_dir = Path(forecast_dir)
+    try:
+        manifest = json.loads((forecast_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        if version is None or manifest.get("transactions_version") != version:
+            return None
+        arrays = [np.load(forecast_dir / f"{name}.npy") for name in _ARRAYS]
+    except (OSError, ValueError):
+        return None
+    return BudgetForecast(*arrays, month=manifest["month"])
+
+
+def budget_forecast(transactions: pd.DataFrame, n_users: int, forecast_dir=None) -> BudgetForecast:
+    """
+    BudgetForecast of all users, fitted in one batch and stored in
+    forecast_dir per transactions data_version (so reruns, sessions and
+    processes only look users up). Cached per process.
+    """
+    version = data_version(transactions)
+    if forecast_dir is None or version is None:
+        return cached_per_frame(transactions, "budget_forecast", lambda t: BudgetForecast.fit(t, n_users))
+    key = str(Path(forecast_dir).resolve())
+    loaded = _LOADED.get(key)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+    forecast = read_forecast(forecast_dir, version)
+    if forecast is None:
+        forecast = BudgetForecast.fit(transactions, n_users)
+        try:
+            write_forecast(forecast, forecast_dir, version)
+        except OSError:
+            pass  # read-only deployment: keep it in memory
+    _LOADED[key] = (version, forecast)
+    return forecast
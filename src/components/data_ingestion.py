@@ -1,138 +1,332 @@
 # src/components/data_ingestion.py
-import os
+import io
 import sys
+import json
+import hashlib
 import logging
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
+from src.components.state import _EXPECTED_COLS, align_inventory_columns, apply_schema
+from src.components.snapshot import SnapshotWriter, read_snapshot, write_snapshot
+from src.components.splits import hash_split, read_split_manifest, write_split_index
+from src.components.tables import TablesWriter, normalize, write_tables
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+ARTIFACT_LOG = PROJECT_ROOT / "artifacts" / "data_ingestion.log"
+
+# Bump a stage's version when its code changes: that stage and everything
+# downstream of it is recomputed on the next run.
+STAGE_VERSIONS = {"read": 1, "clean": 1, "split": 2, "persist": 1}
+
+# Column mapping
+COLUMN_MAP = {
+    "User_ID": "user_id",
+    "Product_ID": "Product_ID",
+    "Product_Name": "Product_Name",
+    "Category": "Category",
+    "Subcategory": "Subcategory",
+    "unit": "Unit",
+    "unit_price_inr": "unit_price_inr",
+    "quantity_purchased": "quantity_purchased",
+    "discount_applied": "discount_applied",
+    "total_spent": "total_spent",
+    "storage_type": "storage_type",
+    "expiration_date": "Expiry_Date",
+    "days_to_expiry": "days_to_expiry",
+    "quantity_on_hand": "quantity_on_hand",
+    "reorder_level": "reorder_level",
+    "reorder_quantity": "reorder_quantity",
+    "payment_method": "payment_method",
+    "store_type": "store_type",
+    "calories": "calories",
+    "protein_g": "protein_g",
+    "fat_g": "fat_g",
+    "carbs_g": "carbs_g",
+    "fiber_g": "fiber_g",
+    "sugar_g": "sugar_g",
+    "sodium_mg": "sodium_mg",
+    "product_diet_tags": "product_diet_tags",
+    "recipe_id": "recipe_id",
+    "recipe_name": "recipe_name",
+    "recipe_cuisine": "recipe_cuisine",
+    "recipe_cook_time": "recipe_cook_time",
+    "ingredient_product_ids": "ingredient_product_ids",
+    "ingredient_qtys": "ingredient_qtys",
+    "recipe_instructions": "recipe_instructions",
+    "user_monthly_spend": "user_monthly_spend",
+    "category_spend_share": "category_spend_share"
+}
+
+# Ensure numeric fields
+NUM_COLS = [
+    "unit_price_inr", "quantity_purchased", "discount_applied", "total_spent",
+    "quantity_on_hand", "reorder_level", "reorder_quantity",
+    "calories", "protein_g", "fat_g", "carbs_g", "fiber_g", "sugar_g", "sodium_mg",
+    "user_monthly_spend", "category_spend_share"
+]
+
+
 # -------------------------------
 # Configure logging
 # -------------------------------
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-ARTIFACT_LOG = PROJECT_ROOT / "artifacts" / "data_ingestion.log"
+def configure_logging():
+    # Ensure artifacts folder exists
+    (ARTIFACT_LOG.parent).mkdir(parents=True, exist_ok=True)
 
-# Ensure artifacts folder exists
-(ARTIFACT_LOG.parent).mkdir(parents=True, exist_ok=True)
+    # Remove previous handlers to ensure logging updates in repeated runs
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
 
-# Remove previous handlers to ensure logging updates in repeated runs
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler(ARTIFACT_LOG, mode='w')  # overwrite log each run
+        ]
+    )
+
+
+# -------------------------------
+# Fingerprints
+# -------------------------------
+def _hash(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def file_digest(path, limit=None) -> str:
+    """sha256 of the file's first `limit` bytes (whole file if None), read in blocks."""
+    h = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            block = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return h.hexdigest()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(ARTIFACT_LOG, mode='w')  # overwrite log each run
-    ]
-)
 
 # -------------------------------
 # Data Ingestion Class
 # -------------------------------
 class DataIngestion:
+    """
+    read -> clean -> split -> persist, each stage fingerprinted by its input
+    fingerprint plus its code version and config. A stage whose fingerprint
+    matches the last run (and whose outputs exist) is skipped; rows appended
+    to the source since the last run are processed as a delta.
+    """
+
     def __init__(self, ingestion_config):
         self.ingestion_config = ingestion_config
 
+    # ---------- fingerprints / state ----------
+    def _config(self) -> dict:
+        c = self.ingestion_config
+        return {"test_size": c.test_size, "random_state": c.random_state, "split_key": c.split_key,
+                "columns": COLUMN_MAP}
+
+    def stage_fingerprints(self, source_digest: str) -> dict:
+        fps = {"read": _hash("read", STAGE_VERSIONS["read"], source_digest)}
+        fps["clean"] = _hash("clean", STAGE_VERSIONS["clean"], fps["read"], COLUMN_MAP, NUM_COLS)
+        fps["split"] = _hash("split", STAGE_VERSIONS["split"], fps["clean"], self._config())
+        fps["persist"] = _hash("persist", STAGE_VERSIONS["persist"], fps["clean"], _EXPECTED_COLS)
+        return fps
+
+    def _load_state(self) -> dict:
+        path = Path(self.ingestion_config.state_path)
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict):
+        path = Path(self.ingestion_config.state_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        tmp.replace(path)
+
+    def _outputs(self) -> dict:
+        c = self.ingestion_config
+        return {
+            "clean": [Path(c.raw_data_path)],
+            "split": [Path(c.train_data_path), Path(c.test_data_path), Path(c.splits_dir) / "splits.json"],
+            "persist": [Path(c.snapshot_dir) / "manifest.json"]
+            + [Path(c.tables_dir) / name / "manifest.json" for name in ("products", "users", "transactions")],
+        }
+
+    def _is_current(self, stage: str, fps: dict, state: dict) -> bool:
+        outputs = self._outputs().get(stage, [])
+        return state.get("stages", {}).get(stage) == fps[stage] and all(p.exists() for p in outputs)
+
+    def _appended_from(self, source: Path, state: dict):
+        """Byte offset where new rows start if the source only grew since the last run, else None."""
+        prev = state.get("source")
+        if not prev or state.get("versions") != STAGE_VERSIONS or state.get("config") != _hash(self._config()):
+            return None
+        if not all(p.exists() for paths in self._outputs().values() for p in paths):
+            return None
+        size = source.stat().st_size
+        if size <= prev["size"] or file_digest(source, limit=prev["size"]) != prev["sha256"]:
+            return None
+        with open(source, "rb") as f:
+            f.seek(prev["size"] - 1)
+            if f.read(1) != b"\n":
+                return None  # last run ended mid-line: not a clean append
+        return prev["size"]
+
+    # ---------- stages ----------
+    def read(self, source: Path, start: int = 0) -> pd.DataFrame:
+        """Read the source CSV, or only the rows after byte offset `start`."""
+        if start == 0:
+            return pd.read_csv(source)
+        header = pd.read_csv(source, nrows=0).columns
+        with open(source, "rb") as f:
+            f.seek(start)
+            tail = f.read()
+        return pd.read_csv(io.BytesIO(tail), header=None, names=header)
+
+    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rename columns and coerce types (row-wise, so it works on deltas too)."""
+        df = df.rename(columns={k: v for k, v in COLUMN_MAP.items() if k in df.columns})
+
+        # Convert date columns
+        for col in df.columns:
+            if "date" in col.lower():
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+
+        for col in NUM_COLS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+
+        # Ensure diet tags column exists
+        if "product_diet_tags" not in df.columns:
+            df["product_diet_tags"] = ""
+        return df
+
+    def split(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask, True for test rows. Hash of `split_key` when configured
+        (stable as rows are added), else the old seeded random row split."""
+        c = self.ingestion_config
+        if c.split_key and c.split_key in df.columns:
+            return hash_split(df[c.split_key], c.test_size)
+        is_test = np.zeros(len(df), dtype=bool)
+        if len(df) >= 2:
+            _, test_idx = train_test_split(np.arange(len(df)), test_size=c.test_size, random_state=c.random_state)
+            is_test[test_idx] = True
+        return is_test
+
+    def _write_split(self, df: pd.DataFrame, start: int = 0, csv: bool = True):
+        """Row-index manifests for the split, plus train/test CSVs unless streaming."""
+        c = self.ingestion_config
+        is_test = self.split(df)
+        write_split_index(is_test, c.splits_dir, start=start, append=start > 0,
+                          meta={"key": c.split_key, "test_size": c.test_size})
+        if csv:
+            self._write_csv(df.loc[~is_test], c.train_data_path, append=start > 0)
+            self._write_csv(df.loc[is_test], c.test_data_path, append=start > 0)
+
+    def persist(self, df: pd.DataFrame, previous: pd.DataFrame = None):
+        """Write the columnar snapshot and normalized tables; `previous` is the
+        already-persisted inventory when `df` is only the new rows."""
+        raw_path = Path(self.ingestion_config.raw_data_path)
+        inventory = apply_schema(align_inventory_columns(df))
+        if previous is not None:
+            inventory = apply_schema(pd.concat([previous, inventory], ignore_index=True))
+
+        # Columnar snapshot of data.csv in the app schema (read by load_inventory)
+        snapshot_dir = Path(self.ingestion_config.snapshot_dir)
+        manifest = write_snapshot(inventory, snapshot_dir, source=raw_path, columns=_EXPECTED_COLS)
+        logging.info(f"Saved inventory snapshot {manifest['version']} to {snapshot_dir}")
+
+        # Products / users / transactions split of the same data
+        tables_dir = Path(self.ingestion_config.tables_dir)
+        versions = write_tables(normalize(inventory), tables_dir, source=raw_path)
+        logging.info(f"Saved normalized tables {versions} to {tables_dir}")
+
+    # ---------- orchestration ----------
+    def _write_csv(self, df: pd.DataFrame, path, append: bool = False):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False, header=not append, mode="a" if append else "w")
+
+    def _read_cleaned(self) -> pd.DataFrame:
+        df = pd.read_csv(self.ingestion_config.raw_data_path)
+        for col in df.columns:
+            if "date" in col.lower():
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+        return df
+
     def initiate_data_ingestion(self):
+        if self.ingestion_config.chunksize:
+            return self.initiate_streaming_ingestion()
         logging.info("Entered the data ingestion method")
         try:
+            config = self.ingestion_config
             # Dataset path
-            dataset_path = PROJECT_ROOT / "notebook" / "processed_smart_grocery_dataset.csv"
+            dataset_path = Path(config.source_path)
             if not dataset_path.exists():
                 raise FileNotFoundError(f"Dataset not found at {dataset_path}")
             logging.info(f"Dataset found at {dataset_path}")
 
-            # Read dataset
-            df = pd.read_csv(dataset_path)
-            logging.info("Read the dataset as dataframe")
-
-            # Column mapping
-            COLUMN_MAP = {
-                "User_ID": "user_id",
-                "Product_ID": "Product_ID",
-                "Product_Name": "Product_Name",
-                "Category": "Category",
-                "Subcategory": "Subcategory",
-                "unit": "Unit",
-                "unit_price_inr": "unit_price_inr",
-                "quantity_purchased": "quantity_purchased",
-                "discount_applied": "discount_applied",
-                "total_spent": "total_spent",
-                "storage_type": "storage_type",
-                "expiration_date": "Expiry_Date",
-                "days_to_expiry": "days_to_expiry",
-                "quantity_on_hand": "quantity_on_hand",
-                "reorder_level": "reorder_level",
-                "reorder_quantity": "reorder_quantity",
-                "payment_method": "payment_method",
-                "store_type": "store_type",
-                "calories": "calories",
-                "protein_g": "protein_g",
-                "fat_g": "fat_g",
-                "carbs_g": "carbs_g",
-                "fiber_g": "fiber_g",
-                "sugar_g": "sugar_g",
-                "sodium_mg": "sodium_mg",
-                "product_diet_tags": "product_diet_tags",
-                "recipe_id": "recipe_id",
-                "recipe_name": "recipe_name",
-                "recipe_cuisine": "recipe_cuisine",
-                "recipe_cook_time": "recipe_cook_time",
-                "ingredient_product_ids": "ingredient_product_ids",
-                "ingredient_qtys": "ingredient_qtys",
-                "recipe_instructions": "recipe_instructions",
-                "user_monthly_spend": "user_monthly_spend",
-                "category_spend_share": "category_spend_share"
-            }
-            df.rename(columns={k: v for k, v in COLUMN_MAP.items() if k in df.columns}, inplace=True)
-
-            # Convert date columns
-            for col in df.columns:
-                if "date" in col.lower():
-                    df[col] = pd.to_datetime(df[col], errors="coerce")
-
-            # Ensure numeric fields
-            num_cols = [
-                "unit_price_inr", "quantity_purchased", "discount_applied", "total_spent",
-                "quantity_on_hand", "reorder_level", "reorder_quantity",
-                "calories", "protein_g", "fat_g", "carbs_g", "fiber_g", "sugar_g", "sodium_mg",
-                "user_monthly_spend", "category_spend_share"
-            ]
-            for col in num_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-            # Ensure diet tags column exists
-            if "product_diet_tags" not in df.columns:
-                df["product_diet_tags"] = ""
-
-            # -------------------------------
-            # Save raw dataset
-            # -------------------------------
-            raw_path = Path(self.ingestion_config.raw_data_path)
-            raw_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_csv(raw_path, index=False, header=True)
-            logging.info(f"Saved cleaned dataset to {raw_path}")
-
-            # -------------------------------
-            # Train-test split
-            # -------------------------------
-            logging.info("Train-test split initiated")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
-
-            # Save train/test datasets
-            train_path = Path(self.ingestion_config.train_data_path)
-            test_path = Path(self.ingestion_config.test_data_path)
-            train_path.parent.mkdir(parents=True, exist_ok=True)
-            test_path.parent.mkdir(parents=True, exist_ok=True)
-
-            train_set.to_csv(train_path, index=False, header=True)
-            test_set.to_csv(test_path, index=False, header=True)
-            logging.info(f"Train dataset saved to {train_path}")
-            logging.info(f"Test dataset saved to {test_path}")
+            raw_path = Path(config.raw_data_path)
+            train_path = Path(config.train_data_path)
+            test_path = Path(config.test_data_path)
+
+            state = self._load_state()
+            digest = file_digest(dataset_path)
+            fps = self.stage_fingerprints(digest)
+            offset = self._appended_from(dataset_path, state)
+
+            if offset is not None:
+                # -------------------------------
+                # Delta: only the appended rows go through the stages
+                # -------------------------------
+                logging.info(f"Source grew since last run: processing rows after byte {offset}")
+                previous = read_snapshot(config.snapshot_dir)
+                delta = self.clean(self.read(dataset_path, start=offset))
+                self._write_csv(delta, raw_path, append=True)
+                self._write_split(delta, start=read_split_manifest(config.splits_dir)["n_rows"])
+                if previous is None:
+                    self.persist(self._read_cleaned())  # no usable snapshot to extend
+                else:
+                    self.persist(delta, previous=previous)
+                logging.info(f"Appended {len(delta)} rows")
+            else:
+                df = None
+                if self._is_current("clean", fps, state):
+                    logging.info("read/clean: source unchanged, skipped")
+                else:
+                    df = self.clean(self.read(dataset_path))
+                    logging.info("Read the dataset as dataframe")
+                    self._write_csv(df, raw_path)
+                    logging.info(f"Saved cleaned dataset to {raw_path}")
+
+                if self._is_current("split", fps, state):
+                    logging.info("split: inputs unchanged, skipped")
+                else:
+                    df = self._read_cleaned() if df is None else df
+                    logging.info("Train-test split initiated")
+                    self._write_split(df)
+                    logging.info(f"Train dataset saved to {train_path}")
+                    logging.info(f"Test dataset saved to {test_path}")
 
+                if self._is_current("persist", fps, state):
+                    logging.info("persist: inputs unchanged, skipped")
+                else:
+                    df = self._read_cleaned() if df is None else df
+                    self.persist(df)
+
+            self._record_run(dataset_path, digest, fps)
             logging.info("Data ingestion completed successfully")
             return train_path, test_path
 
@@ -140,11 +334,97 @@ class DataIngestion:
             logging.error(f"Error in data ingestion: {e}")
             raise e
 
+    def _record_run(self, dataset_path: Path, digest: str, fps: dict):
+        self._save_state({
+            "source": {"path": str(dataset_path), "size": dataset_path.stat().st_size, "sha256": digest},
+            "versions": STAGE_VERSIONS,
+            "config": _hash(self._config()),
+            "stages": fps,
+        })
+
+    # ---------- out-of-core mode ----------
+    def _scan_layout(self, dataset_path: Path):
+        """First pass: row count and the snapshot storage type of every column."""
+        n_rows, dtypes, categories = 0, {}, {}
+        for chunk in pd.read_csv(dataset_path, chunksize=self.ingestion_config.chunksize):
+            inventory = apply_schema(align_inventory_columns(self.clean(chunk)))
+            n_rows += len(inventory)
+            for col in _EXPECTED_COLS:
+                s = inventory[col]
+                if isinstance(s.dtype, pd.CategoricalDtype) or s.dtype == object or pd.api.types.is_string_dtype(s):
+                    categories.setdefault(col, set()).update(s.dropna().astype(str).unique())
+                elif col in dtypes:
+                    dtypes[col] = np.result_type(dtypes[col], s.dtype)
+                else:
+                    dtypes[col] = s.dtype
+        layout = {}
+        for col in _EXPECTED_COLS:
+            layout[col] = sorted(categories[col]) if col in categories else str(dtypes[col])
+        return n_rows, layout
+
+    def initiate_streaming_ingestion(self):
+        """
+        Chunked ingestion for sources larger than memory: one pass to size the
+        snapshot, one pass that cleans each chunk, appends it to data.csv,
+        writes it into the memory-mapped snapshot and the normalized tables
+        (see tables.TablesWriter) and records its split as row positions (no
+        train/test copies of the data).
+        """
+        logging.info("Entered the streaming data ingestion method")
+        try:
+            config = self.ingestion_config
+            dataset_path = Path(config.source_path)
+            if not dataset_path.exists():
+                raise FileNotFoundError(f"Dataset not found at {dataset_path}")
+
+            n_rows, layout = self._scan_layout(dataset_path)
+            logging.info(f"Scanned {n_rows} rows in chunks of {config.chunksize}")
+
+            raw_path = Path(config.raw_data_path)
+            writer = SnapshotWriter(config.snapshot_dir, layout, n_rows)
+            tables = TablesWriter(config.tables_dir, layout, n_rows)
+            start = 0
+            for chunk in pd.read_csv(dataset_path, chunksize=config.chunksize):
+                df = self.clean(chunk)
+                self._write_csv(df, raw_path, append=start > 0)
+                self._write_split(df, start=start, csv=False)
+                inventory = apply_schema(align_inventory_columns(df))
+                writer.append(inventory)
+                tables.append(inventory)
+                start += len(df)
+            manifest = writer.close(source=raw_path)
+            logging.info(f"Saved inventory snapshot {manifest['version']} to {config.snapshot_dir}")
+            versions = tables.close(source=raw_path)
+            logging.info(f"Saved normalized tables {versions} to {config.tables_dir}")
+
+            digest = file_digest(dataset_path)
+            self._record_run(dataset_path, digest, self.stage_fingerprints(digest))
+            splits_dir = Path(config.splits_dir)
+            logging.info(f"Split row indices saved to {splits_dir}")
+            return splits_dir / "train.idx", splits_dir / "test.idx"
+
+        except Exception as e:
+            logging.error(f"Error in streaming data ingestion: {e}")
+            raise e
+
 class IngestionConfig:
+    source_path = str(PROJECT_ROOT / "notebook" / "processed_smart_grocery_dataset.csv")
     raw_data_path = "artifacts/data.csv"
     train_data_path = "artifacts/train.csv"
     test_data_path = "artifacts/test.csv"
+    snapshot_dir = "artifacts/snapshot"
+    tables_dir = "artifacts/tables"
+    splits_dir = "artifacts/splits"
+    state_path = "artifacts/ingestion_state.json"
+    test_size = 0.2
+    random_state = 42
+    # rows hashed to train/test by this key (None: seeded random row split)
+    split_key = "Product_ID"
+    # set to a row count to ingest out-of-core in chunks of that size
+    chunksize = None
 
-ingestion_config = IngestionConfig()
-ingestor = DataIngestion(ingestion_config)
-train_path, test_path = ingestor.initiate_data_ingestion()
+if __name__ == "__main__":
+    configure_logging()
+    ingestion_config = IngestionConfig()
+    ingestor = DataIngestion(ingestion_config)
+    train_path, test_path = ingestor.initiate_data_ingestion()
@@ -0,0 +1,239 @@
+# src/components/durable_store.py
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.components.inventory_store import InventoryStore, as_changes
+from src.components.shared_inventory import data_version
+from src.components.snapshot import read_snapshot, write_snapshot
+
+LOG_NAME = "wal.log"
+CHECKPOINT_NAME = "checkpoint.json"
+INVENTORY_DIRNAME = "inventory"
+SHOPPING_LIST_NAME = "shopping_lists.json"
+CHECKPOINT_EVERY = 1000  # log records between automatic checkpoints
+DEFAULT_LIST = "default"
+
+
+def _encode(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":"), default=str)
+    return f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n".encode("utf-8")
+
+
+def _decode(line: bytes) -> Optional[dict]:
+    """The record on one log line, or None if it is torn or corrupt."""
+    try:
+        text = line.decode("utf-8")
+        crc, payload = text.rstrip("\n").split(" ", 1)
+        if not text.endswith("\n") or int(crc, 16) != zlib.crc32(payload.encode("utf-8")):
+            return None
+        return json.loads(payload)
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+class DurableStore:
+    """
+    Inventory (an InventoryStore over the products table) and named shopping
+    lists, persisted as the last checkpoint plus a write-ahead log of the
+    changes made since. Every change is one appended, fsync'd log record;
+    opening the store loads the checkpoint (a memory-mapped snapshot) and
+    replays the log, stopping at a torn or corrupt tail left by a crash.
+    `checkpoint()` folds the log into a new checkpoint and empties it.
+
+    A checkpoint belongs to the base data it was taken on: if data.csv has
+    been re-ingested since, the store restarts from the new products table
+    and only the log (changes after the checkpoint) is replayed on top.
+    Methods are safe to call from several sessions' threads.
+    """
+
+    def __init__(self, store_dir, base: pd.DataFrame, checkpoint_every: int = CHECKPOINT_EVERY,
+                 sync: bool = True):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.base = base
+        self.checkpoint_every = checkpoint_every
+        self.sync = sync
+        self._seq = 0
+        self._since_checkpoint = 0
+        self._lock = threading.RLock()
+        self._recover()
+        self._log = open(self.store_dir / LOG_NAME, "ab")
+
+    # ---------- recovery ----------
+    def _read_checkpoint(self) -> Optional[dict]:
+        path = self.store_dir / CHECKPOINT_NAME
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _recover(self) -> None:
+        cp = self._read_checkpoint()
+        frame, shopping = self.base, {}
+        if cp is not None:
+            self._seq = cp["seq"]
+            if cp.get("base_version") == data_version(self.base):
+                saved = read_snapshot(self.store_dir / cp["inventory"])
+                if saved is None:
+                    logging.warning(f"Inventory store: checkpoint {cp['inventory']} unreadable, starting from base")
+                else:
+                    frame = saved
+            else:
+                logging.info("Inventory store: base data changed, checkpointed edits superseded")
+            shopping = json.loads((self.store_dir / cp["shopping_lists"]).read_text(encoding="utf-8"))
+        self.inventory = InventoryStore(frame)
+        self._shopping: Dict[str, List[Dict[str, Any]]] = shopping
+
+        log_path = self.store_dir / LOG_NAME
+        good_bytes = 0
+        if log_path.exists():
+            with open(log_path, "rb") as f:
+                for line in f:
+                    record = _decode(line)
+                    if record is None:
+                        break
+                    good_bytes += len(line)
+                    if record["seq"] > self._seq:
+                        self._apply(record)
+                        self._seq = record["seq"]
+                        self._since_checkpoint += 1
+            if good_bytes < log_path.stat().st_size:
+                logging.warning(f"Inventory store: dropping torn log tail after {good_bytes} bytes")
+                with open(log_path, "r+b") as f:
+                    f.truncate(good_bytes)
+
+    def _apply(self, record: dict) -> None:
+        op = record["op"]
+        if op == "update_stock":
+            changes = list(zip(record["ids"], record["deltas"]))
+            try:
+                self.inventory.bulk_update_stock(changes)
+            except KeyError:
+                # some product is missing from a re-ingested base: apply the rest
+                for change in changes:
+                    try:
+                        self.inventory.update_stock(*change)
+                    except KeyError:
+                        pass
+        elif op == "add_product":
+            self.inventory.add_product(dict(record["product"]))
+        elif op == "list_splice":
+            self._shopping.setdefault(record["list"], [])[record["start"]:] = copy.deepcopy(record["items"])
+        elif op == "list_set":
+            self._shopping[record["list"]][record["index"]] = copy.deepcopy(record["item"])
+        elif op == "list_remove":
+            self._shopping[record["list"]].pop(record["index"])
+
+    # ---------- log ----------
+    def _write(self, op: str, **fields) -> None:
+        self._seq += 1
+        self._log.write(_encode({"seq": self._seq, "op": op, **fields}))
+        self._log.flush()
+        if self.sync:
+            os.fsync(self._log.fileno())
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    # ---------- inventory ----------
+    def update_stock(self, product_id: str, delta: float) -> "DurableStore":
+        return self.bulk_update_stock([(product_id, delta)])
+
+    def bulk_update_stock(self, changes) -> "DurableStore":
+        ids, deltas = as_changes(changes)
+        with self._lock:
+            self.inventory.bulk_update_stock(list(zip(ids, deltas)))  # raises before anything is logged
+            self._write("update_stock", ids=ids.tolist(), deltas=deltas.tolist())
+        return self
+
+    def add_product(self, product: Dict[str, Any]) -> "DurableStore":
+        logged = dict(product)  # before the store fills in missing columns
+        with self._lock:
+            self.inventory.add_product(product)
+            self._write("add_product", product=logged)
+        return self
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            return self.inventory.frame()
+
+    # ---------- shopping list ----------
+    def shopping_list(self, name: str = DEFAULT_LIST) -> List[Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._shopping.get(name, []))
+
+    def sync_shopping_list(self, items: List[Dict[str, Any]], name: str = DEFAULT_LIST) -> "DurableStore":
+        """
+        Persist `items` (the session's shopping list) by logging only how it
+        differs from the stored list: one changed or removed item, or the
+        tail after the first difference (covers appends).
+        """
+        with self._lock:
+            self._sync_list(self._shopping.setdefault(name, []), list(items or []), name)
+        return self
+
+    def _sync_list(self, old: list, new: list, name: str) -> None:
+        p = 0
+        while p < min(len(old), len(new)) and old[p] == new[p]:
+            p += 1
+        if p == len(old) == len(new):
+            return
+        if len(new) == len(old) - 1 and old[p + 1:] == new[p:]:
+            old.pop(p)
+            self._write("list_remove", list=name, index=p)
+        elif len(new) == len(old) and old[p + 1:] == new[p + 1:]:
+            old[p] = copy.deepcopy(new[p])
+            self._write("list_set", list=name, index=p, item=new[p])
+        else:
+            old[p:] = copy.deepcopy(new[p:])
+            self._write("list_splice", list=name, start=p, items=new[p:])
+
+    # ---------- checkpoints ----------
+    def checkpoint(self) -> dict:
+        """Snapshot the current state, then empty the log."""
+        with self._lock:
+            frame = self.inventory.frame()
+            for c in frame.columns:
+                if c in self.base.columns and frame[c].dtype == object and pd.api.types.is_numeric_dtype(self.base[c]):
+                    frame = frame.assign(**{c: pd.to_numeric(frame[c], errors="coerce")})
+            # Each checkpoint gets its own files, so checkpoint.json (flipped
+            # last) never points at state newer than its seq.
+            inventory_dir = f"{INVENTORY_DIRNAME}-{self._seq:012d}"
+            shopping_file = f"{SHOPPING_LIST_NAME}-{self._seq:012d}"
+            write_snapshot(frame, self.store_dir / inventory_dir)
+            (self.store_dir / shopping_file).write_text(json.dumps(self._shopping, default=str), encoding="utf-8")
+
+            cp = {"seq": self._seq, "base_version": data_version(self.base), "inventory": inventory_dir,
+                  "shopping_lists": shopping_file, "created": datetime.now().isoformat(timespec="seconds"),
+                  "n_rows": len(frame)}
+            tmp = self.store_dir / (CHECKPOINT_NAME + ".tmp")
+            tmp.write_text(json.dumps(cp, indent=2), encoding="utf-8")
+            os.replace(tmp, self.store_dir / CHECKPOINT_NAME)
+
+            # Records up to cp["seq"] are now in the checkpoint; replay skips
+            # them even if we crash before the log is emptied.
+            self._log.close()
+            self._log = open(self.store_dir / LOG_NAME, "wb")
+            self._since_checkpoint = 0
+            for old in self.store_dir.glob(f"{INVENTORY_DIRNAME}-*"):
+                if old.name != inventory_dir:
+                    shutil.rmtree(old, ignore_errors=True)
+            for old in self.store_dir.glob(f"{SHOPPING_LIST_NAME}-*"):
+                if old.name != shopping_file:
+                    old.unlink()
+            return cp
+
+    def close(self) -> None:
+        self._log.close()
@@ -0,0 +1,52 @@
+# src/components/expiry_index.py
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+
+
+class ExpiryIndex:
+    """
+    Expiration dates parsed once and sorted, so window queries are two binary
+    searches. Queries return row positions (ascending, i.e. in frame order)
+    for use with `df.iloc`. Rows with a missing/unparseable date never match.
+    """
+
+    def __init__(self, expiration_date: pd.Series):
+        days = pd.to_datetime(expiration_date, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        days = days.astype("datetime64[D]")  # compare calendar days, like to_date()
+        valid = ~np.isnat(days)
+        positions = np.flatnonzero(valid)
+        order = np.argsort(days[valid], kind="stable")
+        self._days = days[valid][order]
+        self._positions = positions[order]
+
+    def __len__(self):
+        return len(self._days)
+
+    def window(self, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+        """Positions with start <= expiry <= end (either bound may be None)."""
+        lo = 0 if start is None else np.searchsorted(self._days, np.datetime64(start, "D"), side="left")
+        hi = len(self._days) if end is None else np.searchsorted(self._days, np.datetime64(end, "D"), side="right")
+        return np.sort(self._positions[lo:hi])
+
+    def within(self, days: int, today: Optional[date] = None) -> np.ndarray:
+        """Positions expiring between today and today + days, inclusive."""
+        today = today or date.today()
+        return self.window(today, pd.Timestamp(today) + pd.Timedelta(days=days))
+
+    def expired(self, today: Optional[date] = None) -> np.ndarray:
+        """Positions whose expiry is before today."""
+        today = today or date.today()
+        return self.window(None, pd.Timestamp(today) - pd.Timedelta(days=1))
+
+
+def expiry_index(df: pd.DataFrame) -> ExpiryIndex:
+    """
+    ExpiryIndex for `df["expiration_date"]`, built on first use and cached for
+    as long as the frame object is alive.
+    """
+    return cached_per_frame(df, "expiry_index", lambda d: ExpiryIndex(d["expiration_date"]))
@@ -0,0 +1,243 @@
+# src/components/feature_store.py
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+from src.components.shared_inventory import data_version
+
+# Bump when the engineered columns or their definitions change
+FEATURE_SET_VERSION = 1
+FEATURE_DIR = "artifacts/features"
+ENGINEERED = ["Days_to_Expiry", "Stock_Value", "Category_Share"]
+# Inputs of the engineered columns, coerced to numbers even if stored as text.
+# unit_price_inr is also the price models' target: the matrix carries it, so
+# models pick their features explicitly (see model_trainer._NOT_FEATURES)
+_REQUIRED_NUMERIC = ["unit_price_inr", "quantity_on_hand"]
+
+# store key -> (columns, float32 matrix), loaded once per process
+_LOADED: Dict[str, tuple] = {}
+
+
+def days_to_expiry(expiration_date: pd.Series, today: Optional[date] = None) -> np.ndarray:
+    """Whole days from `today` to each expiration date (NaN if missing/unparseable)."""
+    days = pd.to_datetime(expiration_date, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    days = days.astype("datetime64[D]")
+    out = (days - np.datetime64(today or date.today(), "D")).astype(np.float64)
+    out[np.isnat(days)] = np.nan
+    return out
+
+
+def _inputs(df: pd.DataFrame, today: Optional[date] = None):
+    """Per-row (Days_to_Expiry, unit price, quantity) with missing price/quantity as 0."""
+    n = len(df)
+    if "expiration_date" in df.columns:
+        dte = days_to_expiry(df["expiration_date"], today)
+    else:
+        dte = np.full(n, np.nan)
+    price = pd.to_numeric(df.get("unit_price_inr", 0), errors="coerce")
+    qty = pd.to_numeric(df.get("quantity_on_hand", 0), errors="coerce")
+    price = np.nan_to_num(np.broadcast_to(np.asarray(price, dtype=np.float64), (n,)))
+    qty = np.nan_to_num(np.broadcast_to(np.asarray(qty, dtype=np.float64), (n,)))
+    return dte, price, qty
+
+
+def engineer(df: pd.DataFrame, today: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """
+    Engineered columns of inventory.compute_features, vectorized:
+      - Days_to_Expiry: expiration_date - today, in days
+      - Stock_Value: unit_price_inr * quantity_on_hand (missing -> 0)
+      - Category_Share: share of stock value within each Category
+    """
+    n = len(df)
+    dte, price, qty = _inputs(df, today)
+    value = price * qty
+
+    share = np.zeros(n)
+    if "Category" in df.columns and n:
+        codes, _ = pd.factorize(df["Category"])
+        grouped = codes >= 0
+        totals = np.bincount(codes[grouped], weights=value[grouped])
+        denom = np.zeros(n)
+        denom[grouped] = totals[codes[grouped]]
+        np.divide(value, denom, out=share, where=denom != 0)
+    return {"Days_to_Expiry": dte, "Stock_Value": value, "Category_Share": share}
+
+
+def _matrix(df: pd.DataFrame, today: date):
+    """(columns, float32 matrix): the frame's numeric columns followed by the engineered ones."""
+    numeric = [c for c in df.columns
+               if (c in _REQUIRED_NUMERIC or pd.api.types.is_numeric_dtype(df[c])) and c not in ENGINEERED]
+    columns = numeric + ENGINEERED
+    mat = np.empty((len(df), len(columns)), dtype=np.float32)
+    for j, c in enumerate(numeric):
+        mat[:, j] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    for j, values in enumerate(engineer(df, today).values(), start=len(numeric)):
+        mat[:, j] = values
+    return columns, mat
+
+
+def _store_key(df: pd.DataFrame, version: str, today: date) -> str:
+    # Also fingerprint the rows, in case a reordered frame keeps the attrs
+    rows = pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes()
+    h = hashlib.sha256(json.dumps([version, FEATURE_SET_VERSION, today.isoformat(), list(df.columns)]).encode())
+    h.update(rows)
+    return h.hexdigest()[:16]
+
+
+def _prune(store_dir: Path, today: date) -> None:
+    """Drop stored matrices computed for an earlier day or feature-set version."""
+    for meta_path in store_dir.glob("*/meta.json"):
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if meta.get("as_of") != today.isoformat() or meta.get("feature_set_version") != FEATURE_SET_VERSION:
+            shutil.rmtree(meta_path.parent, ignore_errors=True)
+
+
+def _load_or_build(df: pd.DataFrame, version: str, today: date, store_dir: Path):
+    key = _store_key(df, version, today)
+    if key in _LOADED:
+        return _LOADED[key]
+    entry = store_dir / key
+    if (entry / "meta.json").exists():
+        meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        loaded = (meta["columns"], np.load(entry / "features.npy", mmap_mode="r"))
+    else:
+        columns, mat = _matrix(df, today)
+        _prune(store_dir, today)
+        entry.mkdir(parents=True, exist_ok=True)
+        np.save(entry / "features.npy", mat, allow_pickle=False)
+        tmp = entry / "meta.json.tmp"
+        tmp.write_text(json.dumps({
+            "columns": columns, "data_version": version, "feature_set_version": FEATURE_SET_VERSION,
+            "as_of": today.isoformat(), "n_rows": len(df),
+        }, indent=2), encoding="utf-8")
+        os.replace(tmp, entry / "meta.json")
+        loaded = (columns, np.load(entry / "features.npy", mmap_mode="r"))
+    _LOADED[key] = loaded
+    return loaded
+
+
+def feature_frame(df: pd.DataFrame, today: Optional[date] = None, store_dir: str = FEATURE_DIR) -> pd.DataFrame:
+    """
+    Float32 feature matrix of `df` (numeric columns plus ENGINEERED) as a
+    read-only DataFrame on df's index. Whole snapshot tables are stored
+    under store_dir keyed by data version, feature-set version and date and
+    memory-mapped on later calls, in this or any other process; anything
+    else (row subsets, a session's edited inventory) is computed once per
+    frame object.
+    """
+    today = today or date.today()
+    version = data_version(df)
+    if version is None or len(df) != df.attrs.get("data_rows"):
+        columns, mat = cached_per_frame(df, f"features:{today.isoformat()}", lambda d: _matrix(d, today))
+    else:
+        columns, mat = _load_or_build(df, version, today, Path(store_dir))
+    return pd.DataFrame(mat, columns=columns, index=df.index, copy=False)
+
+
+# ---------- Incremental maintenance ----------
+class IncrementalFeatures:
+    """
+    The engineered columns of one frame, kept current under stock edits and
+    appended rows without recomputing the frame. Per-row inputs change only
+    for the touched rows and the per-Category stock-value sums are adjusted
+    by the difference, so an edit costs O(changed rows + affected
+    categories); Category_Share is value / its category's sum, gathered on read.
+    """
+
+    def __init__(self, df: pd.DataFrame, today: Optional[date] = None):
+        self.today = today or date.today()
+        self._dte, self._price, self._qty = (a.copy() for a in _inputs(df, self.today))
+        self._value = self._price * self._qty
+        if "Category" in df.columns:
+            codes, uniques = pd.factorize(df["Category"])
+        else:
+            codes, uniques = np.full(len(df), -1), []
+        self._codes = codes.astype(np.int64)
+        self._category_code = {c: i for i, c in enumerate(uniques)}
+        grouped = self._codes >= 0
+        self._sums = np.bincount(self._codes[grouped], weights=self._value[grouped],
+                                 minlength=len(self._category_code))
+
+    def __len__(self):
+        return len(self._value)
+
+    def set_quantity(self, positions, quantities) -> None:
+        """New quantity_on_hand for the rows at `positions`."""
+        positions = np.asarray(positions, dtype=np.int64)
+        qty = np.nan_to_num(np.asarray(quantities, dtype=np.float64))
+        old = self._value[positions]
+        self._qty[positions] = qty
+        self._value[positions] = self._price[positions] * qty
+        codes = self._codes[positions]
+        grouped = codes >= 0
+        np.add.at(self._sums, codes[grouped], (self._value[positions] - old)[grouped])
+
+    def _category_codes(self, categories) -> np.ndarray:
+        """Code of each category (-1 if missing), adding unseen ones with an empty sum."""
+        codes = []
+        for c in categories:
+            if pd.isna(c):
+                codes.append(-1)
+                continue
+            if c not in self._category_code:
+                self._category_code[c] = len(self._category_code)
+                self._sums = np.append(self._sums, 0.0)
+            codes.append(self._category_code[c])
+        return np.asarray(codes, dtype=np.int64)
+
+    def set_category(self, positions, categories) -> None:
+        """New Category for the rows at `positions` (one value, or one per row)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        codes = self._category_codes(np.broadcast_to(np.asarray(categories, dtype=object), positions.shape))
+        old = self._codes[positions]
+        value = self._value[positions]
+        np.subtract.at(self._sums, old[old >= 0], value[old >= 0])
+        np.add.at(self._sums, codes[codes >= 0], value[codes >= 0])
+        self._codes[positions] = codes
+
+    def append(self, rows: pd.DataFrame) -> None:
+        """Rows added at the end of the frame (e.g. InventoryOverlay.add_product)."""
+        dte, price, qty = _inputs(rows, self.today)
+        categories = rows["Category"] if "Category" in rows.columns else pd.Series([None] * len(rows))
+        codes = self._category_codes(categories)
+        value = price * qty
+        self._dte = np.concatenate([self._dte, dte])
+        self._price = np.concatenate([self._price, price])
+        self._qty = np.concatenate([self._qty, qty])
+        self._value = np.concatenate([self._value, value])
+        self._codes = np.concatenate([self._codes, codes])
+        grouped = codes >= 0
+        np.add.at(self._sums, codes[grouped], value[grouped])
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        denom = np.where(self._codes >= 0, self._sums[np.maximum(self._codes, 0)], 0.0)
+        share = np.zeros(len(self._value))
+        np.divide(self._value, denom, out=share, where=denom != 0)
+        return {"Days_to_Expiry": self._dte.copy(), "Stock_Value": self._value.copy(), "Category_Share": share}
+
+    def frame(self, index=None) -> pd.DataFrame:
+        return pd.DataFrame(self.columns(), index=index)
+
+    def discrepancies(self, df: pd.DataFrame) -> Dict[str, float]:
+        """Largest absolute difference per column against a full recompute of `df`."""
+        full, live = engineer(df, self.today), self.columns()
+        out = {}
+        for c in ENGINEERED:
+            diff = np.abs(full[c] - live[c])
+            diff[np.isnan(full[c]) != np.isnan(live[c])] = np.inf
+            out[c] = float(np.nanmax(diff, initial=0.0))
+        return out
+
+    def is_consistent(self, df: pd.DataFrame, atol: float = 1e-6) -> bool:
+        return all(diff <= atol for diff in self.discrepancies(df).values())
@@ -0,0 +1,283 @@
+# src/components/forest_export.py
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.components.model_registry import REGISTRY_DIR, latest_version
+
+COMPACT_DIR = "compact"
+_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+LAYOUT = "breadth_first"  # CompactForest.predict relies on right == left + 1
+
+# path -> CompactForest, loaded once per process
+_LOADED: Dict[str, "CompactForest"] = {}
+
+
+class CompactForest:
+    """
+    A regression forest flattened into contiguous arrays: node i of the
+    ensemble splits on `feature[i]` at `threshold[i]`, children are
+    `left[i]` / `right[i]` (-1 for leaves), `value[i]` is the node's mean
+    target, and `roots[t]` is tree t's root node. Each tree is stored
+    breadth-first, so the children of a node are adjacent: right == left + 1.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, features: List[str]):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.features = list(features)
+        self._walk = None  # (feature, left) as intp, built on first predict
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, a).nbytes for a in _ARRAYS)
+
+    def predict(self, X, block_pairs: int = 65536) -> np.ndarray:
+        """
+        Mean prediction over trees for every row of X. A block of trees is
+        walked over all rows at once, one depth level per step: the next node
+        is left + (x > threshold), and (row, tree) pairs that reached a leaf
+        drop out of the working set. Blocks hold about block_pairs pairs, so
+        a large batch walks few trees at a time and their nodes stay in cache.
+        """
+        if self._walk is None:
+            self._walk = (np.asarray(self.feature, dtype=np.intp), np.asarray(self.left, dtype=np.intp))
+        feature, left = self._walk
+        X = np.asarray(X, dtype=np.float32)  # sklearn trees compare float32 inputs
+        n = len(X)
+        columns = np.ascontiguousarray(X.T).ravel()  # x[row, f] at f * n + row
+        rows = np.arange(n, dtype=np.intp)
+        roots = np.asarray(self.roots, dtype=np.intp)
+        per_block = max(1, block_pairs // max(n, 1))
+        total = np.zeros(n, dtype=np.float64)
+        for start in range(0, len(roots), per_block):
+            block = roots[start:start + per_block]
+            node = np.repeat(block, n)                                   # pair -> current node
+            pair_row = np.tile(rows, len(block))
+            active = np.flatnonzero(left[node] >= 0)
+            while len(active):
+                cur = node[active]
+                go_right = columns[feature[cur] * n + pair_row[active]] > self.threshold[cur]
+                nxt = left[cur] + go_right
+                node[active] = nxt
+                active = active[left[nxt] >= 0]
+            total += self.value[node].reshape(len(block), n).sum(axis=0)
+        return total / self.n_trees
+
+
+def _tree_depths(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    depth = np.zeros(len(left), dtype=np.int32)
+    for i in range(len(left)):  # children always come after their parent
+        if left[i] >= 0:
+            depth[left[i]] = depth[right[i]] = depth[i] + 1
+    return depth
+
+
+def _prune_tree(tree, max_depth: Optional[int]):
+    """Node arrays of one sklearn tree, cut at max_depth (cut nodes become leaves)."""
+    left = tree.children_left.astype(np.int64)
+    right = tree.children_right.astype(np.int64)
+    feature = tree.feature.astype(np.int64)
+    threshold = tree.threshold.astype(np.float64)
+    value = tree.value[:, 0, 0].astype(np.float64)
+    if max_depth is None:
+        keep = np.ones(len(left), dtype=bool)
+    else:
+        depth = _tree_depths(left, right)
+        keep = depth <= max_depth
+        cut = depth == max_depth
+        left, right = np.where(cut, -1, left), np.where(cut, -1, right)
+    new_id = np.cumsum(keep) - 1
+    left = np.where(left >= 0, new_id[np.maximum(left, 0)], -1)[keep]
+    right = np.where(right >= 0, new_id[np.maximum(right, 0)], -1)[keep]
+    leaf = left < 0
+    feature = np.where(leaf, 0, feature[keep])
+    threshold = np.where(leaf, np.inf, threshold[keep])
+    return _breadth_first(feature, threshold, left, right, value[keep])
+
+
+def _breadth_first(feature, threshold, left, right, value):
+    """Renumber a tree's nodes breadth-first so that every right child is left + 1."""
+    levels, frontier = [np.zeros(1, dtype=np.int64)], np.zeros(1, dtype=np.int64)
+    while len(frontier):
+        inner = frontier[left[frontier] >= 0]
+        frontier = np.stack([left[inner], right[inner]], axis=1).ravel()
+        levels.append(frontier)
+    order = np.concatenate(levels)
+    new_id = np.empty_like(order)
+    new_id[order] = np.arange(len(order))
+    left, right = left[order], right[order]
+    left = np.where(left >= 0, new_id[np.maximum(left, 0)], -1)
+    right = np.where(right >= 0, new_id[np.maximum(right, 0)], -1)
+    return feature[order], threshold[order], left, right, value[order]
+
+
+def export_forest(model, features: List[str], float32: bool = True, max_nodes: Optional[int] = None,
+                  max_trees: Optional[int] = None) -> CompactForest:
+    """
+    Flatten a fitted RandomForestRegressor (or any sklearn tree ensemble with
+    `estimators_`) into a CompactForest. float32 halves the threshold/value
+    arrays. `max_trees` keeps the first trees only; `max_nodes` is a size
+    budget met by cutting all trees at the deepest depth that fits.
+    """
+    if not hasattr(model, "estimators_") or not hasattr(model.estimators_[0], "tree_"):
+        raise TypeError(f"{type(model).__name__} is not a fitted forest of decision trees")
+    trees = [est.tree_ for est in model.estimators_[:max_trees]]
+    max_depth = None
+    if max_nodes is not None:
+        depths = [_tree_depths(t.children_left, t.children_right) for t in trees]
+        max_depth = max(int(d.max()) for d in depths)
+        while max_depth > 0 and sum(int((d <= max_depth).sum()) for d in depths) > max_nodes:
+            max_depth -= 1
+
+    parts, roots, offset = [], [], 0
+    for tree in trees:
+        f, th, l, r, v = _prune_tree(tree, max_depth)
+        l = np.where(l >= 0, l + offset, -1)
+        r = np.where(r >= 0, r + offset, -1)
+        parts.append((f, th, l, r, v))
+        roots.append(offset)
+        offset += len(f)
+
+    real = np.float32 if float32 else np.float64
+    index = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+    feat_type = np.int16 if len(features) < np.iinfo(np.int16).max else np.int32
+    return CompactForest(
+        feature=np.concatenate([p[0] for p in parts]).astype(feat_type),
+        threshold=np.concatenate([p[1] for p in parts]).astype(real),
+        left=np.concatenate([p[2] for p in parts]).astype(index),
+        right=np.concatenate([p[3] for p in parts]).astype(index),
+        value=np.concatenate([p[4] for p in parts]).astype(real),
+        roots=np.asarray(roots, dtype=index),
+        features=features,
+    )
+
+
+def save_compact(forest: CompactForest, path) -> Path:
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(path / f"{name}.npy", getattr(forest, name), allow_pickle=False)
+    (path / "meta.json").write_text(json.dumps({
+        "features": forest.features, "n_trees": forest.n_trees, "n_nodes": forest.n_nodes, "layout": LAYOUT,
+        "dtypes": {name: str(getattr(forest, name).dtype) for name in _ARRAYS},
+    }, indent=2), encoding="utf-8")
+    _LOADED.pop(str(path.resolve()), None)
+    return path
+
+
+def load_compact(path) -> Optional[CompactForest]:
+    """
+    Memory-mapped CompactForest from `path`, cached per process; None if
+    absent or written with an older node layout (re-export it).
+    """
+    path = Path(path)
+    key = str(path.resolve())
+    if key in _LOADED:
+        return _LOADED[key]
+    if not (path / "meta.json").exists():
+        return None
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("layout") != LAYOUT:
+        return None
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+    forest = CompactForest(features=meta["features"], **arrays)
+    _LOADED[key] = forest
+    return forest
+
+
+def export_registered(name: str, version: Optional[str] = None, registry_dir: str = REGISTRY_DIR,
+                      **export_kwargs) -> Path:
+    """Export a registered forest to <version dir>/compact (read by compact_path)."""
+    version = version or latest_version(name, registry_dir)
+    version_dir = Path(registry_dir) / name / version
+    model = joblib.load(version_dir / "model.joblib")
+    meta = json.loads((version_dir / "meta.json").read_text(encoding="utf-8"))
+    return save_compact(export_forest(model, meta["features"], **export_kwargs), version_dir / COMPACT_DIR)
+
+
+def compact_path(name: str, version: Optional[str] = None, registry_dir: str = REGISTRY_DIR) -> Optional[Path]:
+    version = version or latest_version(name, registry_dir)
+    return None if version is None else Path(registry_dir) / name / version / COMPACT_DIR
+
+
+# ---------- Benchmark ----------
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def _timed_load(load):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = load()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, seconds, peak
+
+
+def benchmark(model_path, compact_dir, X, repeats: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    sklearn (joblib.load + predict) vs CompactForest (memory-mapped load +
+    predict) on X: load time, heap allocated while loading, on-disk size,
+    rows/sec, and the largest prediction difference.
+    """
+    X = pd.DataFrame(np.asarray(X, dtype=np.float32))
+    model, sk_load, sk_heap = _timed_load(lambda: joblib.load(model_path))
+    _LOADED.pop(str(Path(compact_dir).resolve()), None)
+    forest, cf_load, cf_heap = _timed_load(lambda: load_compact(compact_dir))
+    X.columns = forest.features
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1  # compare single-core throughput
+
+    def rate(fn):
+        best = min(_time(fn) for _ in range(repeats))
+        return len(X) / best if best > 0 else float("inf")
+
+    sk_pred, cf_pred = model.predict(X), forest.predict(X)
+    return {
+        "sklearn": {"load_s": sk_load, "load_heap_bytes": sk_heap,
+                    "disk_bytes": os.path.getsize(model_path), "rows_per_s": rate(lambda: model.predict(X))},
+        "compact": {"load_s": cf_load, "load_heap_bytes": cf_heap,
+                    "disk_bytes": _dir_bytes(compact_dir), "rows_per_s": rate(lambda: forest.predict(X)),
+                    "max_abs_diff": float(np.max(np.abs(sk_pred - cf_pred))) if len(X) else 0.0},
+    }
+
+
+def _time(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    # Export the latest registered inventory price model and compare it with sklearn
+    from src.components.state import load_tables
+    from src.model_training.inventory import PRICE_FEATURES, PRICE_MODEL_NAME, compute_features
+
+    version = latest_version(PRICE_MODEL_NAME)
+    if version is None:
+        raise SystemExit("No registered price model: run train_inventory_model(..., register=True) first")
+    out = export_registered(PRICE_MODEL_NAME, version)
+    feats = compute_features(load_tables().products)[PRICE_FEATURES].fillna(0).to_numpy()
+    report = benchmark(Path(REGISTRY_DIR) / PRICE_MODEL_NAME / version / "model.joblib", out, feats)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,23 @@
+# src/components/frame_cache.py
+import weakref
+from typing import Any, Callable, Dict, Tuple
+
+import pandas as pd
+
+# (id(frame), name) -> (weakref to frame, row count, value)
+_CACHE: Dict[Tuple[int, str], tuple] = {}
+
+
+def cached_per_frame(df: pd.DataFrame, name: str, build: Callable[[pd.DataFrame], Any]) -> Any:
+    """
+    Return `build(df)`, computed once per frame object and kept for as long as
+    the frame is alive. Frames are treated as immutable: derive a new frame
+    (copy, overlay, concat) instead of editing one that has been indexed.
+    """
+    key = (id(df), name)
+    cached = _CACHE.get(key)
+    if cached is not None and cached[0]() is df and cached[1] == len(df):
+        return cached[2]
+    value = build(df)
+    _CACHE[key] = (weakref.ref(df, lambda _, k=key: _CACHE.pop(k, None)), len(df), value)
+    return value
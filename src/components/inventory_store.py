@@ -0,0 +1,204 @@
+# src/components/inventory_store.py
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+
+Changes = Union[pd.DataFrame, Iterable[Tuple[str, float]]]
+
+
+class ProductIndex:
+    """
+    Hash index from Product_ID (compared as strings, like the old
+    `astype(str) ==` scan) to the row positions holding it.
+    """
+
+    def __init__(self, product_id: pd.Series):
+        codes, uniques = pd.factorize(product_id.astype(str))
+        self.ids = pd.Index(uniques)
+        self.codes = codes
+        order = np.argsort(codes, kind="stable")
+        self._order = order
+        self._starts = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    def lookup(self, ids) -> np.ndarray:
+        """Code of each id (-1 if unknown)."""
+        return self.ids.get_indexer(pd.Index(np.asarray(ids, dtype=object)).astype(str))
+
+    def rows(self, codes) -> np.ndarray:
+        """Row positions of every product in `codes` (distinct, all >= 0)."""
+        codes = np.asarray(codes, dtype=np.int64)
+        starts, lens = self._starts[codes], self._starts[codes + 1] - self._starts[codes]
+        within = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+        return self._order[np.repeat(starts, lens) + within]
+
+    def first(self, codes) -> np.ndarray:
+        """Position of the first row of each product in `codes` (all >= 0)."""
+        return self._order[self._starts[np.asarray(codes, dtype=np.int64)]]
+
+    def positions(self, product_id) -> np.ndarray:
+        code = self.ids.get_indexer([str(product_id)])[0]
+        if code < 0:
+            return np.array([], dtype=np.int64)
+        return self._order[self._starts[code]:self._starts[code + 1]]
+
+
+def product_index(df: pd.DataFrame) -> ProductIndex:
+    """ProductIndex for `df["Product_ID"]`, cached for as long as the frame is alive."""
+    return cached_per_frame(df, "product_index", lambda d: ProductIndex(d["Product_ID"]))
+
+
+def as_changes(changes: Changes) -> Tuple[np.ndarray, np.ndarray]:
+    """(product ids, deltas) from a (product_id, delta) iterable or a frame with those columns."""
+    if isinstance(changes, pd.DataFrame):
+        ids, deltas = changes["product_id"].to_numpy(), changes["delta"].to_numpy()
+    else:
+        pairs = list(changes)
+        ids = np.array([str(p) for p, _ in pairs], dtype=object)
+        deltas = np.array([d for _, d in pairs])
+    return ids.astype(str).astype(object), np.asarray(deltas, dtype=np.float64)
+
+
+def apply_deltas(quantity: np.ndarray, row_codes: np.ndarray, change_codes: np.ndarray,
+                 deltas: np.ndarray) -> np.ndarray:
+    """
+    New quantities after applying each product's deltas in order, clipping at
+    zero after every step, without looping over changes. For one product
+    with prefix sums S_1..S_T that is max(q0 + S_T, S_T - min_j S_j).
+    `row_codes` maps rows to products, `change_codes` maps changes to products.
+    Untouched rows keep their value; a missing quantity counts as 0.
+    """
+    out = np.array(quantity, dtype=np.float64)
+    if len(change_codes) == 0:
+        return out
+    order = np.argsort(change_codes, kind="stable")
+    codes, d = change_codes[order], deltas[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    prefix = np.cumsum(d)
+    offset = np.repeat(np.r_[0.0, prefix[starts[1:] - 1]], np.diff(np.r_[starts, len(d)]))
+    prefix -= offset  # per-product prefix sums
+    ends = np.r_[starts[1:], len(d)] - 1
+    groups = codes[starts]  # sorted distinct products
+    total = prefix[ends]
+    floor = total - np.minimum.reduceat(prefix, starts)
+
+    g = np.minimum(np.searchsorted(groups, row_codes), len(groups) - 1)
+    hit = groups[g] == row_codes
+    out[hit] = np.maximum(np.nan_to_num(out[hit]) + total[g[hit]], floor[g[hit]])
+    return out
+
+
+class InventoryStore:
+    """
+    A mutable inventory with a Product_ID hash index. Stock changes are
+    written in place; added products go to an append buffer that is merged
+    into the table in batches of `batch_size` (or when the frame is read).
+    Same semantics as inventory.update_stock / add_product: quantities clip
+    at zero after each change, unknown ids raise KeyError.
+    """
+
+    def __init__(self, df: pd.DataFrame, batch_size: int = 1024):
+        self.batch_size = batch_size
+        self._table = df.copy()
+        self._qty = self._quantities(self._table)
+        self._qty_dtype = self._table["quantity_on_hand"].dtype if "quantity_on_hand" in self._table.columns else None
+        self._index = ProductIndex(self._table["Product_ID"]) if "Product_ID" in self._table.columns else None
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_ids: Dict[str, List[int]] = {}  # Product_ID -> buffer positions
+        self._frame: Optional[pd.DataFrame] = None
+        self._stock_changed = False
+        self._rows_added = False
+
+    @staticmethod
+    def _quantities(df: pd.DataFrame) -> np.ndarray:
+        if "quantity_on_hand" not in df.columns:
+            return np.zeros(len(df))
+        return pd.to_numeric(df["quantity_on_hand"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def __len__(self):
+        return len(self._qty) + len(self._buffer)
+
+    # ---------- edits ----------
+    def add_product(self, product: Dict[str, Any]) -> "InventoryStore":
+        for c in self._table.columns:
+            if c not in product:
+                product[c] = pd.NA
+        self._buffer_ids.setdefault(str(product.get("Product_ID")), []).append(len(self._buffer))
+        self._buffer.append(product)
+        self._frame = None
+        self._rows_added = True
+        if len(self._buffer) >= self.batch_size:
+            self.compact()
+        return self
+
+    def update_stock(self, product_id: str, delta: float) -> "InventoryStore":
+        return self.bulk_update_stock([(product_id, delta)])
+
+    def bulk_update_stock(self, changes: Changes) -> "InventoryStore":
+        """
+        Apply many (product_id, delta) changes at once, in order. All ids are
+        checked first: an unknown id raises KeyError and nothing is applied.
+        """
+        if "Product_ID" not in self._table.columns and not self._buffer:
+            raise KeyError("Product_ID column missing")
+        ids, deltas = as_changes(changes)
+        codes = self._index.lookup(ids) if self._index is not None else np.full(len(ids), -1)
+        buffered = np.array([pid in self._buffer_ids for pid in ids], dtype=bool)
+        missing = (codes < 0) & ~buffered
+        if missing.any():
+            raise KeyError(f"Product ID {ids[np.argmax(missing)]} not found")
+
+        known = codes >= 0
+        if known.any():
+            rows = self._index.rows(np.unique(codes[known]))
+            self._qty[rows] = apply_deltas(self._qty[rows], self._index.codes[rows], codes[known], deltas[known])
+            self._stock_changed = True
+        for pid, delta in zip(ids[buffered], deltas[buffered]):
+            for i in self._buffer_ids[pid]:
+                row = self._buffer[i]
+                q = pd.to_numeric(row.get("quantity_on_hand"), errors="coerce")
+                row["quantity_on_hand"] = max((0.0 if pd.isna(q) else float(q)) + float(delta), 0.0)
+        self._frame = None
+        return self
+
+    def compact(self) -> None:
+        """Merge the append buffer into the table and re-index it."""
+        if not self._buffer:
+            return
+        table = self._table.copy(deep=False)
+        if "quantity_on_hand" in table.columns or self._stock_changed:
+            table["quantity_on_hand"] = self._qty
+        new = pd.DataFrame(self._buffer)
+        self._table = pd.concat([table, new], ignore_index=True)
+        self._qty = self._quantities(self._table)
+        self._index = ProductIndex(self._table["Product_ID"])
+        self._buffer, self._buffer_ids = [], {}
+
+    # ---------- reads ----------
+    def _quantity_column(self) -> np.ndarray:
+        # keep a compact integer dtype (see state._SCHEMA) while the values allow it
+        qty = self._qty.copy()
+        kind = getattr(self._qty_dtype, "kind", None)
+        if kind in ("i", "u") and np.array_equal(qty, np.round(qty)):
+            info = np.iinfo(self._qty_dtype)
+            if qty.size == 0 or (qty.min() >= info.min and qty.max() <= info.max):
+                return qty.astype(self._qty_dtype)
+        return qty
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Current inventory as a new frame object after every change (so caches
+        keyed on the frame, see frame_cache, never see stale values).
+        """
+        if self._frame is None:
+            self.compact()
+            out = self._table.copy(deep=False)
+            if "quantity_on_hand" in out.columns or self._stock_changed:
+                out["quantity_on_hand"] = self._quantity_column()
+            if self._stock_changed or self._rows_added:
+                # edited data is no longer the versioned snapshot (see feature_store)
+                out.attrs = {k: v for k, v in out.attrs.items() if k not in ("data_version", "data_rows")}
+            self._frame = out
+        return self._frame
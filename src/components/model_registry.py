@@ -0,0 +1,114 @@
+# src/components/model_registry.py
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+REGISTRY_DIR = "artifacts/models"
+MODEL_FILE = "model.joblib"
+META_FILE = "meta.json"
+LATEST_FILE = "latest.json"
+
+# (registry dir, name, version) -> (model, meta), loaded once per process
+_LOADED: Dict[Tuple[str, str, str], tuple] = {}
+
+
+def _versions(model_dir: Path) -> List[str]:
+    if not model_dir.exists():
+        return []
+    return sorted(p.name for p in model_dir.iterdir() if p.is_dir() and p.name.startswith("v"))
+
+
+def register_model(name: str, model: Any, features: List[str], metrics: Dict[str, Any],
+                   target: str = "unit_price_inr", fill_values: Optional[Dict[str, float]] = None,
+                   data_version: Optional[str] = None, registry_dir: str = REGISTRY_DIR) -> str:
+    """
+    Store a fitted model as the next version of `name` together with its
+    feature schema and metrics, and point `latest` at it. Returns the version.
+    The model is dumped uncompressed so its arrays can be memory-mapped on load.
+    """
+    model_dir = Path(registry_dir) / name
+    existing = _versions(model_dir)
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    version_dir = model_dir / version
+    version_dir.mkdir(parents=True, exist_ok=False)
+
+    joblib.dump(model, version_dir / MODEL_FILE)
+    meta = {
+        "name": name,
+        "version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "model_class": type(model).__name__,
+        "features": list(features),
+        "target": target,
+        "fill_values": fill_values or {},
+        "metrics": metrics,
+        "data_version": data_version,
+    }
+    (version_dir / META_FILE).write_text(json.dumps(meta, indent=2, default=float), encoding="utf-8")
+
+    # Flip `latest` last, atomically, so readers never see a half-written version
+    tmp = model_dir / (LATEST_FILE + ".tmp")
+    tmp.write_text(json.dumps({"version": version}), encoding="utf-8")
+    os.replace(tmp, model_dir / LATEST_FILE)
+    return version
+
+
+def latest_version(name: str, registry_dir: str = REGISTRY_DIR) -> Optional[str]:
+    path = Path(registry_dir) / name / LATEST_FILE
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_model(name: str, version: Optional[str] = None, registry_dir: str = REGISTRY_DIR):
+    """
+    Return (model, meta) for `version` (default: latest), or None if nothing
+    is registered. Model arrays are memory-mapped and the result is cached
+    per process, so repeated calls are a dict lookup.
+    """
+    version = version or latest_version(name, registry_dir)
+    if version is None:
+        return None
+    key = (str(Path(registry_dir).resolve()), name, version)
+    if key in _LOADED:
+        return _LOADED[key]
+
+    version_dir = Path(registry_dir) / name / version
+    if not (version_dir / MODEL_FILE).exists():
+        return None
+    model = joblib.load(version_dir / MODEL_FILE, mmap_mode="r")
+    meta = json.loads((version_dir / META_FILE).read_text(encoding="utf-8"))
+    _LOADED[key] = (model, meta)
+    return model, meta
+
+
+def load_meta(name: str, version: Optional[str] = None, registry_dir: str = REGISTRY_DIR) -> Optional[Dict[str, Any]]:
+    """Metadata of `version` (default: latest) without loading the model, or None if not registered."""
+    version = version or latest_version(name, registry_dir)
+    if version is None:
+        return None
+    key = (str(Path(registry_dir).resolve()), name, version)
+    if key in _LOADED:
+        return _LOADED[key][1]
+    meta_path = Path(registry_dir) / name / version / META_FILE
+    if not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+
+def list_models(name: str, registry_dir: str = REGISTRY_DIR) -> List[Dict[str, Any]]:
+    """Metadata of every registered version of `name`, oldest first."""
+    model_dir = Path(registry_dir) / name
+    out = []
+    for version in _versions(model_dir):
+        meta_path = model_dir / version / META_FILE
+        if meta_path.exists():
+            out.append(json.loads(meta_path.read_text(encoding="utf-8")))
+    return out
@@ -1,21 +1,132 @@
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from src.components.feature_store import ENGINEERED, feature_frame
+from src.components.model_registry import REGISTRY_DIR, register_model
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODEL_NAME = "numeric_price"  # any engine; the one used is in the version's metrics
+TARGET = "unit_price_inr"
+# never features: the target itself and columns derived from it (total_spent = price x quantity)
+_NOT_FEATURES = [TARGET, "total_spent"] + ENGINEERED
+
+
+# ---------- Training engines ----------
+def _random_forest(**params) -> RandomForestRegressor:
+    return RandomForestRegressor(**{"random_state": 42, **params})
+
+
+def _hist_gradient_boosting(**params) -> HistGradientBoostingRegressor:
+    # Features are binned into at most 255 uint8 bins once, before the first
+    # iteration; early stopping holds out 10% of the training rows.
+    return HistGradientBoostingRegressor(**{
+        "max_iter": 500,
+        "learning_rate": 0.1,
+        "max_bins": 255,
+        "early_stopping": True,
+        "validation_fraction": 0.1,
+        "n_iter_no_change": 10,
+        "random_state": 42,
+        **params,
+    })
+
+
+# engine name -> estimator factory (keyword arguments override the defaults)
+ENGINES: Dict[str, Callable[..., Any]] = {
+    "rf": _random_forest,
+    "hgb": _hist_gradient_boosting,
+}
+
 
-def train_model(df: pd.DataFrame):
-    if df.empty or "unit_price_inr" not in df.columns:
+def regression_metrics(y_true, y_pred) -> Dict[str, float]:
+    return {
+        "MAE": float(mean_absolute_error(y_true, y_pred)),
+        "RMSE": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "R2": float(r2_score(y_true, y_pred)),
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB (None without getrusage)."""
+    if resource is None:
         return None
-    df = df.copy()
-    X = df.select_dtypes(include=[np.number]).fillna(0)
-    y = pd.to_numeric(df["unit_price_inr"], errors="coerce").fillna(0)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak * 1024 / 1e6  # bytes on macOS, KiB elsewhere
+
+
+def fit_engine(engine: str, X_train: pd.DataFrame, y_train, X_test: pd.DataFrame, y_test,
+               measure_memory: bool = False, **params) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Fit one engine and score it against a predict-the-training-mean baseline.
+    Returns (model, result) where result holds "baseline" and `engine`
+    metrics (MAE/RMSE/R2), the test predictions under "y_pred" and the
+    fit+predict wall time, so engines can be compared per dataset size.
+    With measure_memory=True it also holds the process's peak RSS after the
+    fit ("peak_rss_mb", native tree buffers included) and how much the fit
+    raised it ("peak_mem_mb"; 0 if it stayed under an earlier peak), both
+    None where getrusage is unavailable. Features are cast to float32 (the
+    trees' native dtype) up front, so neither engine makes its own float32 copy.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {sorted(ENGINES)}")
+    X_train = X_train.astype(np.float32)
+    X_test = X_test.astype(np.float32)
+
+    before = _peak_rss_mb() if measure_memory else None
+    t0 = time.perf_counter()
+    model = ENGINES[engine](**params)
+    model.fit(X_train, y_train)
+    y_hat = model.predict(X_test)
+    wall = time.perf_counter() - t0
+    after = _peak_rss_mb() if measure_memory else None
+
+    baseline = np.full(shape=np.shape(y_test), fill_value=float(np.mean(y_train)))
+    result = {
+        "engine": engine,
+        "baseline": regression_metrics(y_test, baseline),
+        engine: regression_metrics(y_test, y_hat),
+        "y_pred": y_hat,
+        "wall_s": wall,
+    }
+    if measure_memory:
+        result["peak_rss_mb"] = after
+        result["peak_mem_mb"] = None if after is None else after - before
+    if engine == "hgb":
+        result["n_iter"] = int(model.n_iter_)
+    return model, result
+
+
+# -------------------------------
+def train_model(df: pd.DataFrame, register: bool = False, registry_dir: str = REGISTRY_DIR,
+                engine: str = "rf", **params):
+    if df.empty or TARGET not in df.columns:
+        return None
+    feats = feature_frame(df)
+    X = feats[[c for c in feats.columns if c not in _NOT_FEATURES]].fillna(0)
+    y = feats[TARGET].fillna(0)
     if len(X) < 10:
         return None
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(random_state=42)
-    model.fit(X_train, y_train)
-    preds = model.predict(X_test)
-    rmse = np.sqrt(mean_squared_error(y_test, preds))
-    r2 = r2_score(y_test, preds)
-    return {"rmse": rmse, "r2": r2, "n_samples": len(df)}
+    model, run = fit_engine(engine, X_train, y_train, X_test, y_test, **params)
+    rmse, r2 = run[engine]["RMSE"], run[engine]["R2"]
+    result = {"rmse": rmse, "r2": r2, "n_samples": len(df)}
+    result.update({k: v for k, v in run.items() if k != "y_pred"})
+    if register:
+        result["version"] = register_model(
+            MODEL_NAME, model, list(X.columns),
+            metrics={"rmse": float(rmse), "r2": float(r2), "n_samples": len(df), "engine": engine,
+                     "baseline": run["baseline"], engine: run[engine]},
+            data_version=df.attrs.get("data_version"), registry_dir=registry_dir,
+        )
+    return result
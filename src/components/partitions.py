@@ -0,0 +1,157 @@
+# src/components/partitions.py
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+from src.components.shared_inventory import data_version
+from src.components.tables import STOCK_COLS
+
+PARTITIONS_DIRNAME = "partitions"
+MANIFEST_NAME = "partitions.json"
+
+# partitions dir -> (transactions version, PartitionDirectory), loaded once per process
+_LOADED: Dict[str, tuple] = {}
+
+
+class PartitionDirectory:
+    """
+    Transaction rows grouped by user_key: the rows of user k are
+    `order[offsets[k]:offsets[k + 1]]` (in their original order), so looking
+    up one user's partition costs O(that user's rows), not O(all rows).
+    Rows with an unknown user (user_key -1) belong to no partition.
+    """
+
+    def __init__(self, order: np.ndarray, offsets: np.ndarray):
+        self.order = order
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, user_key: np.ndarray, n_users: int) -> "PartitionDirectory":
+        user_key = np.asarray(user_key)
+        known = np.flatnonzero(user_key >= 0)
+        order = known[np.argsort(user_key[known], kind="stable")]
+        counts = np.bincount(user_key[known], minlength=n_users)
+        offsets = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(order.astype(np.int64), offsets)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.offsets) - 1
+
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def rows(self, user_key: int) -> np.ndarray:
+        if not 0 <= user_key < self.n_users:
+            return np.array([], dtype=np.int64)
+        return self.order[self.offsets[user_key]:self.offsets[user_key + 1]]
+
+
+def write_partitions(directory: PartitionDirectory, partitions_dir, version: Optional[str]) -> None:
+    partitions_dir = Path(partitions_dir)
+    partitions_dir.mkdir(parents=True, exist_ok=True)
+    np.save(partitions_dir / "order.npy", directory.order, allow_pickle=False)
+    np.save(partitions_dir / "offsets.npy", directory.offsets, allow_pickle=False)
+    tmp = partitions_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps({"transactions_version": version, "n_users": directory.n_users,
+                               "n_rows": int(len(directory.order))}, indent=2), encoding="utf-8")
+    os.replace(tmp, partitions_dir / MANIFEST_NAME)
+
+
+def read_partitions(partitions_dir, version: Optional[str]) -> Optional[PartitionDirectory]:
+    """Memory-mapped directory, or None if missing or built for other transactions."""
+    partitions_dir = Path(partitions_dir)
+    try:
+        manifest = json.loads((partitions_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if version is None or manifest.get("transactions_version") != version:
+        return None
+    return PartitionDirectory(np.load(partitions_dir / "order.npy", mmap_mode="r"),
+                              np.load(partitions_dir / "offsets.npy", mmap_mode="r"))
+
+
+def partition_directory(transactions: pd.DataFrame, n_users: int, partitions_dir=None) -> PartitionDirectory:
+    """
+    PartitionDirectory of `transactions` by user_key: read from partitions_dir
+    when it matches the transactions' data_version, else built (and written
+    there). Cached per process.
+    """
+    version = data_version(transactions)
+    if partitions_dir is None or version is None:
+        return cached_per_frame(transactions, "partitions",
+                                lambda t: PartitionDirectory.build(t["user_key"].to_numpy(), n_users))
+    key = str(Path(partitions_dir).resolve())
+    loaded = _LOADED.get(key)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+    directory = read_partitions(partitions_dir, version)
+    if directory is None:
+        directory = PartitionDirectory.build(transactions["user_key"].to_numpy(), n_users)
+        try:
+            write_partitions(directory, partitions_dir, version)
+        except OSError:
+            pass  # read-only deployment: keep it in memory
+    _LOADED[key] = (version, directory)
+    return directory
+
+
+def user_transactions(transactions: pd.DataFrame, directory: PartitionDirectory, user_key: int) -> pd.DataFrame:
+    """One user's purchase rows."""
+    return transactions.iloc[directory.rows(user_key)]
+
+
+def user_latest_rows(transactions: pd.DataFrame, directory: PartitionDirectory, user_key: int,
+                     n_products: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (product_keys, rows): the sorted product_keys (< n_products) this user
+    has bought and the transaction row of their latest purchase of each, in
+    tables.normalize's order (purchase_date, NaT last, then log order).
+    """
+    rows = directory.rows(user_key)
+    keys = transactions["product_key"].to_numpy()[rows]
+    known = (keys >= 0) & (keys < n_products)
+    rows, keys = rows[known], keys[known]
+    dates = pd.to_datetime(transactions["purchase_date"].iloc[rows], errors="coerce").to_numpy(dtype="datetime64[ns]")
+    when = np.where(np.isnat(dates), np.iinfo(np.int64).max, dates.view(np.int64))
+    order = np.lexsort((rows, when, keys))
+    keys, rows = keys[order], rows[order]
+    last = np.append(keys[1:] != keys[:-1], True)
+    return keys[last], rows[last]
+
+
+def user_product_keys(transactions: pd.DataFrame, directory: PartitionDirectory, user_key: int,
+                      n_products: int) -> np.ndarray:
+    """Sorted product_keys (< n_products) this user has bought."""
+    keys = transactions["product_key"].to_numpy()[directory.rows(user_key)]
+    return np.unique(keys[(keys >= 0) & (keys < n_products)])
+
+
+def user_products(products: pd.DataFrame, transactions: pd.DataFrame, directory: PartitionDirectory,
+                  user_key: int) -> pd.DataFrame:
+    """
+    The products this user has bought (rows of `products`, whose row
+    position is product_key, in product_key order and relabelled 0..n-1),
+    with the stock columns (tables.STOCK_COLS) taken from the user's own
+    latest purchase of each product rather than anyone's. Tagged with a
+    per-user data_version so it is never mistaken for the whole table or
+    another user's view.
+    """
+    def build(p: pd.DataFrame) -> pd.DataFrame:
+        keys, rows = user_latest_rows(transactions, directory, user_key, len(p))
+        view = p.iloc[keys].reset_index(drop=True)
+        for col in STOCK_COLS:
+            if col in view.columns and col in transactions.columns:
+                view[col] = transactions[col].iloc[rows].reset_index(drop=True)
+        view.attrs = {k: v for k, v in p.attrs.items() if k != "data_rows"}
+        if data_version(p) is not None:
+            view.attrs["data_version"] = f"{data_version(p)}:user{user_key}"
+        return view
+
+    return cached_per_frame(products, f"user_products:{user_key}", build)
@@ -0,0 +1,238 @@
+# src/components/recipes.py
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.components.frame_cache import cached_per_frame
+from src.components.shared_inventory import data_version
+
+RECIPES_DIRNAME = "recipes"
+MANIFEST_NAME = "recipes.json"
+# unit -> (dimension, size in the dimension's base unit)
+UNITS = {
+    "mg": ("mass", 0.001), "g": ("mass", 1.0), "kg": ("mass", 1000.0),
+    "ml": ("volume", 1.0), "l": ("volume", 1000.0),
+    "pc": ("count", 1.0), "pcs": ("count", 1.0),
+}
+# unit each dimension is sold and priced in (unit_price_inr of a g / mL product is per kg / L)
+PURCHASE_UNITS = {"mass": "kg", "volume": "L", "count": "pcs"}
+_NOT_SPECIFIED = "Not Specified"
+
+# recipes dir -> (versions, RecipeMatrix), loaded once per process
+_LOADED: Dict[str, tuple] = {}
+
+
+def _unit_factor(from_units: pd.Series, to_units: pd.Series) -> np.ndarray:
+    """Multiplier from each `from` unit to the matching `to` unit (1 if unknown or incompatible)."""
+    src = from_units.astype(str).str.lower().to_numpy()
+    dst = to_units.astype(object).astype(str).str.lower().to_numpy()
+    dim = {u: d for u, (d, _) in UNITS.items()}
+    size = {u: f for u, (_, f) in UNITS.items()}
+    src_dim, dst_dim = pd.Series(src).map(dim), pd.Series(dst).map(dim)
+    ratio = (pd.Series(src).map(size) / pd.Series(dst).map(size)).to_numpy()
+    return np.where(src_dim.notna() & (src_dim == dst_dim), ratio, 1.0)
+
+
+def purchase_quantities(qty, units) -> tuple:
+    """
+    (qty, unit) arrays with each quantity converted to its dimension's
+    PURCHASE_UNITS (e.g. 250 g -> 0.25 kg), so qty x unit_price_inr is its
+    cost. Unknown units are kept as they are.
+    """
+    units = pd.Series(units, dtype=object).astype(str)
+    dim = {u: d for u, (d, _) in UNITS.items()}
+    size = {u: f for u, (_, f) in UNITS.items()}
+    target = units.str.lower().map(dim).map(PURCHASE_UNITS)
+    factor = (units.str.lower().map(size) / target.str.lower().map(size)).fillna(1.0).to_numpy()
+    return np.asarray(qty, dtype=np.float64) * factor, target.fillna(units).to_numpy(dtype=object)
+
+
+def _exploded(values: pd.Series, name: str) -> pd.DataFrame:
+    """One row per ';'-separated item: (row, pos, name)."""
+    items = values.fillna("").astype(str).str.split(";").explode()
+    return pd.DataFrame({"row": items.index.to_numpy(), "pos": items.groupby(level=0).cumcount().to_numpy(),
+                         name: items.str.strip().to_numpy()})
+
+
+class RecipeMatrix:
+    """
+    Recipes (rows) x products (columns) sparse matrix of the quantity each
+    recipe needs, in the product's own unit (the unit of quantity_on_hand).
+    Columns are the products table in product_key order, followed by
+    ingredient ids that are not in it. Queries over every recipe cost
+    O(non-zeros), whatever the catalog size.
+    """
+
+    def __init__(self, recipes: pd.DataFrame, product_ids: pd.Index, required: sparse.csr_matrix,
+                 units: np.ndarray):
+        self.recipes = recipes          # recipe_id, recipe_name, recipe_cuisine (one row per recipe)
+        self.product_ids = product_ids  # Product_ID of each column
+        self.required = required
+        self.units = units              # unit of each column
+
+    @classmethod
+    def build(cls, transactions: pd.DataFrame, products: pd.DataFrame) -> "RecipeMatrix":
+        """Parse ingredient_product_ids ("P00020;P00596") and ingredient_qtys ("0.29 kg;175 g") of every recipe."""
+        cols = ["recipe_id", "recipe_name", "recipe_cuisine", "ingredient_product_ids", "ingredient_qtys"]
+        raw = transactions[[c for c in cols if c in transactions.columns]].astype(object)
+        raw = raw[raw["recipe_id"].notna() & (raw["recipe_id"].astype(str) != _NOT_SPECIFIED)]
+        raw = raw.drop_duplicates("recipe_id").reset_index(drop=True)
+        recipes = raw[[c for c in cols[:3] if c in raw.columns]].astype(str)
+
+        # i-th id goes with the i-th quantity
+        pairs = _exploded(raw["ingredient_product_ids"], "Product_ID").merge(
+            _exploded(raw["ingredient_qtys"], "qty"), on=["row", "pos"], how="left")
+        pairs["qty"] = pairs["qty"].fillna("")
+        pairs = pairs[pairs["Product_ID"].ne("") & pairs["Product_ID"].ne(_NOT_SPECIFIED)]
+        parsed = pairs["qty"].str.extract(r"^\s*([0-9]*\.?[0-9]+)\s*([A-Za-z]*)")
+
+        known = pd.Index(products["Product_ID"].astype(str))
+        extra = pd.Index(pairs["Product_ID"].unique()).difference(known)
+        product_ids = known.append(extra)
+        col = product_ids.get_indexer(pairs["Product_ID"])
+        units = np.concatenate([products["unit"].astype(object).astype(str).to_numpy()
+                                if "unit" in products.columns else np.full(len(known), ""),
+                                np.full(len(extra), "", dtype=object)]).astype(object)
+        # unparseable quantity: one of the product's units
+        amount = pd.to_numeric(parsed[0], errors="coerce").fillna(1.0).to_numpy()
+        amount = amount * _unit_factor(parsed[1].fillna(""), pd.Series(units[col]))
+        for c, u in zip(col[units[col] == ""], parsed[1].fillna("").to_numpy()[units[col] == ""]):
+            units[c] = u  # ingredient missing from the products table: keep the recipe's unit
+
+        required = sparse.csr_matrix((amount, (pairs["row"].to_numpy(), col)),
+                                     shape=(len(raw), len(product_ids)))
+        required.sum_duplicates()
+        return cls(recipes, product_ids, required, units)
+
+    def __len__(self):
+        return self.required.shape[0]
+
+    # ---------- queries ----------
+    def stock(self, inventory: pd.DataFrame) -> np.ndarray:
+        """quantity_on_hand of each column's product in `inventory` (0 if absent)."""
+        def build(df: pd.DataFrame) -> np.ndarray:
+            from src.components.inventory_store import product_index
+
+            if df.empty or "Product_ID" not in df.columns:
+                return np.zeros(len(self.product_ids))
+            index = product_index(df)
+            qty = np.nan_to_num(pd.to_numeric(df["quantity_on_hand"], errors="coerce")
+                                .to_numpy(dtype=np.float64, na_value=np.nan))
+            per_product = np.bincount(index.codes, weights=qty, minlength=len(index.ids))
+            codes = index.lookup(self.product_ids)
+            return np.where(codes >= 0, per_product[np.maximum(codes, 0)], 0.0)
+
+        return cached_per_frame(inventory, f"recipe_stock:{id(self)}", build)
+
+    def coverage(self, inventory: pd.DataFrame) -> pd.DataFrame:
+        """
+        Every recipe, ranked: n_ingredients, n_missing (ingredients short of
+        what the recipe needs) and coverage (mean over its ingredients of
+        min(stock / needed, 1); 1.0 means cookable now). Best coverage first.
+        """
+        def build(df: pd.DataFrame) -> pd.DataFrame:
+            R = self.required
+            stock = self.stock(df)
+            have = np.minimum(R.data, stock[R.indices])
+            frac = np.divide(have, R.data, out=np.ones_like(have), where=R.data > 0)
+            short = (R.data - have > 1e-9).astype(np.float64)
+            ones = np.ones(R.shape[1])
+            n_ingredients = np.diff(R.indptr)
+            covered = sparse.csr_matrix((frac, R.indices, R.indptr), shape=R.shape) @ ones
+            n_missing = sparse.csr_matrix((short, R.indices, R.indptr), shape=R.shape) @ ones
+            out = self.recipes.assign(
+                n_ingredients=n_ingredients,
+                n_missing=n_missing.astype(np.int64),
+                coverage=np.divide(covered, n_ingredients, out=np.zeros(len(self)), where=n_ingredients > 0),
+            )
+            return out.sort_values(["coverage", "n_missing", "n_ingredients"], ascending=[False, True, False],
+                                   kind="stable")
+
+        return cached_per_frame(inventory, f"recipe_coverage:{id(self)}", build)
+
+    def missing(self, inventory: pd.DataFrame, recipe_ids: Iterable[str],
+                products: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        What to buy to cook all of `recipe_ids`: one row per short product
+        with missing_qty (their combined need minus stock, in the product's
+        unit, whole pieces rounded up) and the product's columns from
+        `products` (row position == product_key) when it is listed there.
+        """
+        rows = pd.Index(self.recipes["recipe_id"]).get_indexer(list(recipe_ids))
+        rows = rows[rows >= 0]
+        need = np.asarray(self.required[rows].sum(axis=0)).ravel()
+        short = np.maximum(need - self.stock(inventory), 0.0)
+        cols = np.flatnonzero(short > 1e-9)
+        qty = short[cols]
+        pcs = np.isin(pd.Series(self.units[cols], dtype=object).str.lower().to_numpy(), ["pc", "pcs"])
+        qty = np.where(pcs, np.ceil(qty), np.round(qty, 2))
+
+        if products is not None and len(products):
+            listed = cols < len(products)
+            out = products.iloc[cols[listed]].reset_index(drop=True)
+            extra = pd.DataFrame({"Product_ID": self.product_ids[cols[~listed]],
+                                  "Product_Name": self.product_ids[cols[~listed]],
+                                  "unit": self.units[cols[~listed]]})
+            out = pd.concat([out, extra], ignore_index=True)
+            qty = np.concatenate([qty[listed], qty[~listed]])
+        else:
+            out = pd.DataFrame({"Product_ID": self.product_ids[cols], "unit": self.units[cols]})
+        out["missing_qty"] = qty
+        return out
+
+
+# ---------- persistence ----------
+def write_recipes(matrix: RecipeMatrix, recipes_dir, versions: list) -> None:
+    recipes_dir = Path(recipes_dir)
+    recipes_dir.mkdir(parents=True, exist_ok=True)
+    sparse.save_npz(recipes_dir / "required.npz", matrix.required, compressed=False)
+    tmp = recipes_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps({
+        "versions": versions, "recipes": matrix.recipes.to_dict(orient="list"),
+        "product_ids": matrix.product_ids.tolist(), "units": matrix.units.tolist(),
+    }), encoding="utf-8")
+    os.replace(tmp, recipes_dir / MANIFEST_NAME)
+
+
+def read_recipes(recipes_dir, versions: list) -> Optional[RecipeMatrix]:
+    """Stored matrix, or None if missing or parsed from other data."""
+    recipes_dir = Path(recipes_dir)
+    try:
+        manifest = json.loads((recipes_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        if None in versions or manifest.get("versions") != versions:
+            return None
+        required = sparse.load_npz(recipes_dir / "required.npz").tocsr()
+    except (OSError, ValueError):
+        return None
+    return RecipeMatrix(pd.DataFrame(manifest["recipes"]), pd.Index(manifest["product_ids"]), required,
+                        np.array(manifest["units"], dtype=object))
+
+
+def recipe_matrix(transactions: pd.DataFrame, products: pd.DataFrame, recipes_dir=None) -> RecipeMatrix:
+    """
+    RecipeMatrix of the purchase log's recipes, parsed once per data version
+    of the transactions and products tables and stored in recipes_dir.
+    Cached per process.
+    """
+    versions = [data_version(transactions), data_version(products)]
+    if recipes_dir is None or None in versions:
+        return cached_per_frame(transactions, f"recipes:{id(products)}",
+                                lambda t: RecipeMatrix.build(t, products))
+    key = str(Path(recipes_dir).resolve())
+    loaded = _LOADED.get(key)
+    if loaded is not None and loaded[0] == versions:
+        return loaded[1]
+    matrix = read_recipes(recipes_dir, versions)
+    if matrix is None:
+        matrix = RecipeMatrix.build(transactions, products)
+        try:
+            write_recipes(matrix, recipes_dir, versions)
+        except OSError:
+            pass  # read-only deployment: keep it in memory
+    _LOADED[key] = (versions, matrix)
+    return matrix
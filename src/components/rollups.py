@@ -0,0 +1,157 @@
+# src/components/rollups.py
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+from src.components.shared_inventory import data_version
+
+ROLLUPS_DIRNAME = "rollups"
+_KEEP_FILES = 64  # persisted rollups kept (one per data version / user scope)
+
+
+def _numbers(rows: pd.DataFrame, col: str) -> np.ndarray:
+    values = pd.to_numeric(rows[col], errors="coerce") if col in rows.columns else pd.Series(0.0, index=rows.index)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class Rollups:
+    """
+    Dashboard aggregates of an inventory frame and its purchase log:
+    distinct product names, low-stock count, inventory value, quantity on
+    hand per Category and quantity purchased per month. Inventory sums can
+    be adjusted row by row (`apply_rows`), so edits never need a full pass.
+    """
+
+    def __init__(self, unique_products: int = 0, low_stock: int = 0, inventory_value: float = 0.0,
+                 category_qty: Optional[Dict[str, float]] = None,
+                 monthly_purchases: Optional[Dict[str, float]] = None):
+        self.unique_products = unique_products
+        self.low_stock = low_stock
+        self.inventory_value = inventory_value
+        self.category_qty = dict(category_qty or {})
+        self.monthly_purchases = dict(monthly_purchases or {})
+
+    def copy(self) -> "Rollups":
+        return copy.deepcopy(self)
+
+    def apply_rows(self, rows: pd.DataFrame, sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) the inventory contribution of `rows`."""
+        if rows.empty:
+            return
+        qty = _numbers(rows, "quantity_on_hand")
+        price = np.nan_to_num(_numbers(rows, "unit_price_inr"))
+        reorder = np.nan_to_num(_numbers(rows, "reorder_level"))
+        self.inventory_value += sign * float((price * np.nan_to_num(qty)).sum())
+        self.low_stock += sign * int((np.nan_to_num(qty) < reorder).sum())
+        if "Category" in rows.columns:
+            sums = pd.Series(np.nan_to_num(qty), index=rows.index).groupby(rows["Category"].astype(object)).sum()
+            for cat, q in sums.items():
+                self.category_qty[str(cat)] = self.category_qty.get(str(cat), 0.0) + sign * float(q)
+
+    def add_purchases(self, transactions: pd.DataFrame) -> None:
+        """Add purchase rows to the monthly quantity series."""
+        if transactions.empty or "purchase_date" not in transactions.columns:
+            return
+        months = pd.to_datetime(transactions["purchase_date"], errors="coerce").to_numpy(dtype="datetime64[M]")
+        qty = np.nan_to_num(_numbers(transactions, "quantity_purchased"))
+        valid = ~np.isnat(months)
+        sums = pd.Series(qty[valid]).groupby(months[valid]).sum()
+        for month, q in sums.items():
+            key = str(np.datetime64(month, "M"))
+            self.monthly_purchases[key] = self.monthly_purchases.get(key, 0.0) + float(q)
+
+    # ---------- views ----------
+    def category_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"Category": list(self.category_qty), "quantity_on_hand": list(self.category_qty.values())})
+
+    def monthly_frame(self) -> pd.DataFrame:
+        months = sorted(self.monthly_purchases)
+        return pd.DataFrame({"purchase_date": months,
+                             "quantity_purchased": [self.monthly_purchases[m] for m in months]})
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Rollups":
+        return cls(**{k: d[k] for k in ("unique_products", "low_stock", "inventory_value",
+                                        "category_qty", "monthly_purchases")})
+
+
+def compute_rollups(inventory: pd.DataFrame, transactions: pd.DataFrame) -> Rollups:
+    r = Rollups()
+    if "Product_Name" in inventory.columns:
+        r.unique_products = int(inventory["Product_Name"].nunique())
+    else:
+        r.unique_products = len(inventory)
+    r.apply_rows(inventory)
+    r.add_purchases(transactions)
+    return r
+
+
+def _key(inventory: pd.DataFrame, transactions: pd.DataFrame) -> Optional[str]:
+    versions = [data_version(inventory), data_version(transactions)]
+    if None in versions:
+        return None
+    token = json.dumps(versions + [len(inventory), len(transactions)])
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:16]
+
+
+def load_rollups(inventory: pd.DataFrame, transactions: pd.DataFrame, rollups_dir=None) -> Rollups:
+    """
+    Rollups of a versioned inventory / purchase log pair, computed once per
+    data version and persisted under rollups_dir; unversioned frames (e.g.
+    inventory with persisted edits) are computed once per frame object.
+    """
+    key = _key(inventory, transactions)
+    if key is None or rollups_dir is None:
+        return cached_per_frame(inventory, f"rollups:{id(transactions)}:{len(transactions)}",
+                                lambda inv: compute_rollups(inv, transactions))
+
+    def build(inv: pd.DataFrame) -> Rollups:
+        path = Path(rollups_dir) / f"{key}.json"
+        try:
+            return Rollups.from_dict(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, KeyError):
+            pass
+        r = compute_rollups(inv, transactions)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(r.to_dict()), encoding="utf-8")
+            os.replace(tmp, path)
+            for old in sorted(path.parent.glob("*.json"), key=lambda p: p.stat().st_mtime)[:-_KEEP_FILES]:
+                old.unlink()
+        except OSError:
+            pass  # read-only deployment: keep it in memory
+        return r
+
+    return cached_per_frame(inventory, f"rollups:{key}", build)
+
+
+def with_edits(rollups: Rollups, base: pd.DataFrame, merged: pd.DataFrame, positions, n_appended: int) -> Rollups:
+    """
+    Rollups of `merged` (= `base` with the rows at `positions` changed and
+    `n_appended` rows added at the end), from the rollups of `base` in
+    O(changed rows).
+    """
+    r = rollups.copy()
+    positions = np.asarray(sorted(positions), dtype=np.int64)
+    if len(positions):
+        r.apply_rows(base.iloc[positions], -1)
+        r.apply_rows(merged.iloc[positions], 1)
+    if n_appended:
+        added = merged.iloc[len(merged) - n_appended:]
+        r.apply_rows(added)
+        if "Product_Name" in merged.columns:
+            known = cached_per_frame(base, "product_names", lambda b: pd.Index(b["Product_Name"].dropna().astype(str).unique()))
+            names = added["Product_Name"].dropna().astype(str).unique()
+            r.unique_products += int((~pd.Index(names).isin(known)).sum())
+    return r
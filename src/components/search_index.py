@@ -0,0 +1,101 @@
+# src/components/search_index.py
+from collections import defaultdict
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+
+# Searched fields, most relevant first (used to break score ties)
+SEARCH_FIELDS = ["Product_Name", "Brand", "Category"]
+_N = 3  # trigram postings
+
+
+def _ngrams(s: str) -> set:
+    return {s[i:i + _N] for i in range(len(s) - _N + 1)}
+
+
+class _FieldIndex:
+    """Trigram postings over the distinct lowercased values of one column."""
+
+    def __init__(self, s: pd.Series):
+        codes, uniques = pd.factorize(s, use_na_sentinel=False)
+        # lowercase per distinct value, then merge values that only differed in case
+        lowered = pd.Index([str(u).lower() for u in uniques])
+        lcodes, self.texts = pd.factorize(lowered)
+        codes = lcodes[codes] if len(codes) else codes
+        self.texts = [str(t) for t in self.texts]
+
+        postings = defaultdict(list)
+        for uid, t in enumerate(self.texts):
+            for g in _ngrams(t):
+                postings[g].append(uid)
+        self.postings = {g: np.asarray(ids) for g, ids in postings.items()}
+
+        # rows grouped by distinct value: rows of value u are order[starts[u]:starts[u + 1]]
+        self.order = np.argsort(codes, kind="stable")
+        self.starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.texts)))])
+
+    def matching_values(self, q: str) -> List[int]:
+        if len(q) < _N:
+            # too short for trigrams: the distinct values are few, scan them
+            return [uid for uid, t in enumerate(self.texts) if q in t]
+        candidates = None
+        for g in _ngrams(q):
+            ids = self.postings.get(g)
+            if ids is None:
+                return []
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return []
+        # trigram hits can be false positives ("abcxbcd" vs "abcd"): verify
+        return [uid for uid in candidates.tolist() if q in self.texts[uid]]
+
+    def rows(self, uid: int) -> np.ndarray:
+        return self.order[self.starts[uid]:self.starts[uid + 1]]
+
+
+def _match_score(text: str, q: str) -> int:
+    if text == q:
+        return 3
+    if text.startswith(q):
+        return 2
+    if (" " + q) in text:
+        return 1  # prefix of a later word
+    return 0
+
+
+class SearchIndex:
+    """
+    Substring search over SEARCH_FIELDS. Results are row positions ranked by
+    match quality (exact > prefix > word prefix > substring), then by field
+    (Product_Name > Brand > Category), then by row order.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.fields = [(col, _FieldIndex(df[col])) for col in SEARCH_FIELDS if col in df.columns]
+
+    def search(self, text: str, limit: Optional[int] = None) -> np.ndarray:
+        q = text.lower()
+        n_fields = len(self.fields)
+        rows, scores = [], []
+        for rank, (_, field) in enumerate(self.fields):
+            for uid in field.matching_values(q):
+                r = field.rows(uid)
+                rows.append(r)
+                scores.append(np.full(len(r), _match_score(field.texts[uid], q) * n_fields + (n_fields - rank)))
+        if not rows:
+            return np.array([], dtype=np.intp)
+        rows, scores = np.concatenate(rows), np.concatenate(scores)
+        # best score per row, then rank
+        order = np.lexsort((rows, -scores))
+        rows = rows[order]
+        _, first = np.unique(rows, return_index=True)
+        ranked = rows[np.sort(first)]
+        return ranked if limit is None else ranked[:limit]
+
+
+def search_index(df: pd.DataFrame) -> SearchIndex:
+    """SearchIndex for `df`, built on first use and cached per frame."""
+    return cached_per_frame(df, "search_index", SearchIndex)
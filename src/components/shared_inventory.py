@@ -0,0 +1,231 @@
+# src/components/shared_inventory.py
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def data_version(df: pd.DataFrame) -> Optional[str]:
+    return df.attrs.get("data_version")
+
+
+class InventoryOverlay:
+    """
+    Per-session edits on top of the process-wide, read-only inventory.
+
+    The base frame is shared by every session (see state.load_inventory);
+    the overlay only stores the cells this session changed and the rows it
+    added. `frame()` merges them lazily and caches the result until the next
+    edit, so a session without edits costs nothing beyond the shared base.
+    """
+
+    def __init__(self, base: pd.DataFrame):
+        self.base = base
+        self.version = data_version(base)
+        self._updates: Dict[str, Dict[int, Any]] = {}  # column -> {base row position: value}
+        self._appended: List[Dict[str, Any]] = []
+        self._ops: List[tuple] = []  # edit log, replayed when the base changes
+        self._merged: Optional[pd.DataFrame] = None
+        self._features = None  # feature_store.IncrementalFeatures, built on first features()
+
+    # ---------- edits ----------
+    def add_product(self, product: Dict[str, Any]) -> "InventoryOverlay":
+        """Append a product row; columns not given are NA in the merged frame."""
+        self._appended.append(dict(product))
+        self._ops.append(("add_product", dict(product)))
+        if self._features is not None:
+            self._features.append(pd.DataFrame([product]))
+        self._merged = None
+        return self
+
+    def update_stock(self, product_id: str, delta: float) -> "InventoryOverlay":
+        """Same semantics as inventory.update_stock, recorded in the overlay."""
+        return self.bulk_update_stock([(product_id, delta)])
+
+    def bulk_update_stock(self, changes) -> "InventoryOverlay":
+        """
+        Apply many (product_id, delta) changes in order, in one vectorized
+        step over the base rows (see inventory_store.apply_deltas). Unknown
+        ids raise KeyError before anything is applied.
+        """
+        from src.components.inventory_store import apply_deltas, as_changes, product_index
+
+        if "Product_ID" not in self.base.columns:
+            raise KeyError("Product_ID column missing")
+        ids, deltas = as_changes(changes)
+        index = product_index(self.base)
+        codes = index.lookup(ids)
+        appended_ids = {str(r.get("Product_ID")) for r in self._appended}
+        extra = np.array([pid in appended_ids for pid in ids], dtype=bool)
+        missing = (codes < 0) & ~extra
+        if missing.any():
+            raise KeyError(f"Product ID {ids[np.argmax(missing)]} not found")
+
+        changed_pos, changed_qty = [], []
+        known = codes >= 0
+        if known.any():
+            changes_q = self._updates.setdefault("quantity_on_hand", {})
+            rows = index.rows(np.unique(codes[known]))
+            current = pd.to_numeric(self.base["quantity_on_hand"].iloc[rows], errors="coerce").to_numpy(dtype=float)
+            current = np.array([changes_q.get(p, q) for p, q in zip(rows.tolist(), current)], dtype=float)
+            new = apply_deltas(current, index.codes[rows], codes[known], deltas[known])
+            changes_q.update(zip(rows.tolist(), new.tolist()))
+            changed_pos, changed_qty = rows.tolist(), new.tolist()
+        for pid, delta in zip(ids[extra], deltas[extra]):
+            for i, row in enumerate(self._appended):
+                if str(row.get("Product_ID")) == pid:
+                    row["quantity_on_hand"] = max(_as_float(row.get("quantity_on_hand")) + float(delta), 0.0)
+                    changed_pos.append(len(self.base) + i)
+                    changed_qty.append(row["quantity_on_hand"])
+
+        self._ops.extend(("update_stock", pid, float(delta)) for pid, delta in zip(ids, deltas))
+        self._merged = None
+        if self._features is not None and changed_pos:
+            self._features.set_quantity(changed_pos, changed_qty)
+        return self
+
+    def set_category(self, product_id: str, category) -> "InventoryOverlay":
+        """Move every row of `product_id` to `category`; an unknown id raises KeyError."""
+        from src.components.inventory_store import product_index
+
+        if "Product_ID" not in self.base.columns:
+            raise KeyError("Product_ID column missing")
+        rows = product_index(self.base).positions(product_id).tolist()
+        extra = [i for i, row in enumerate(self._appended) if str(row.get("Product_ID")) == str(product_id)]
+        if not rows and not extra:
+            raise KeyError(f"Product ID {product_id} not found")
+        self._updates.setdefault("Category", {}).update((p, category) for p in rows)
+        for i in extra:
+            self._appended[i]["Category"] = category
+        self._ops.append(("set_category", str(product_id), category))
+        self._merged = None
+        if self._features is not None:
+            self._features.set_category(rows + [len(self.base) + i for i in extra], category)
+        return self
+
+    # ---------- reads ----------
+    def frame(self) -> pd.DataFrame:
+        """Base with this session's edits applied (the base itself if there are none)."""
+        if self._merged is not None:
+            return self._merged
+        out = self.base
+        if self._updates:
+            # shallow copy: only the edited columns get their own storage
+            out = out.copy(deep=False)
+            for col, changes in self._updates.items():
+                out[col] = _patched(out[col], changes)
+            # edited data is no longer the versioned base (see feature_store)
+            out.attrs = {k: v for k, v in self.base.attrs.items() if k != "data_version"}
+        if self._appended:
+            out = pd.concat([out, pd.DataFrame(self._appended)], ignore_index=True)
+            out = out[list(self.base.columns) + [c for c in out.columns if c not in self.base.columns]]
+        self._merged = out
+        return out
+
+    def features(self) -> pd.DataFrame:
+        """
+        Engineered feature columns (feature_store.ENGINEERED) of frame(). Built
+        once from the merged frame, then kept current by each edit instead of
+        being recomputed.
+        """
+        from src.components.feature_store import IncrementalFeatures
+
+        if self._features is None:
+            self._features = IncrementalFeatures(self.frame())
+        return self._features.frame(index=self.frame().index)
+
+    def rollups(self, transactions: pd.DataFrame, rollups_dir=None):
+        """
+        Dashboard rollups (see rollups.py) of frame() and `transactions`: the
+        base's are computed once per data version, this session's edits are
+        applied on top as a delta over the edited and appended rows only.
+        """
+        from src.components.frame_cache import cached_per_frame
+        from src.components.rollups import load_rollups, with_edits
+
+        base_rollups = load_rollups(self.base, transactions, rollups_dir)
+        if not self._updates and not self._appended:
+            return base_rollups
+        return cached_per_frame(self.frame(), f"rollups:{id(base_rollups)}",
+                                lambda merged: with_edits(base_rollups, self.base, merged, self.edited_positions(),
+                                                          self.n_appended))
+
+    def replay_edits(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        `rows` (e.g. one user's view of the base, with their own stock) with
+        this session's edits replayed on them by Product_ID: stock changes on
+        their own quantity_on_hand, in order and clipping at zero as
+        update_stock does, and category changes. Rows the session didn't
+        change are returned as they are.
+        """
+        from src.components.inventory_store import apply_deltas, as_changes, product_index
+
+        if rows.empty or "Product_ID" not in rows.columns or not self._updates:
+            return rows
+        index = product_index(rows)
+        out = rows.copy(deep=False)
+        changes = [op[1:] for op in self._ops if op[0] == "update_stock"]
+        if changes:
+            ids, deltas = as_changes(changes)
+            codes = index.lookup(ids)
+            known = codes >= 0
+            qty = pd.to_numeric(rows["quantity_on_hand"], errors="coerce").to_numpy(dtype=np.float64,
+                                                                                      na_value=np.nan)
+            out["quantity_on_hand"] = apply_deltas(qty, index.codes, codes[known], deltas[known])
+        categories = {}
+        for op in self._ops:
+            if op[0] == "set_category":
+                categories.update((p, op[2]) for p in index.positions(op[1]).tolist())
+        if categories and "Category" in out.columns:
+            out["Category"] = _patched(out["Category"], categories)
+        out.attrs = {k: v for k, v in rows.attrs.items() if k != "data_version"}
+        return out
+
+    def edited_positions(self) -> np.ndarray:
+        """Base row positions this session changed, sorted."""
+        positions = set().union(*(changes.keys() for changes in self._updates.values()))
+        return np.array(sorted(positions), dtype=np.int64)
+
+    @property
+    def n_appended(self) -> int:
+        return len(self._appended)
+
+    def rebase(self, base: pd.DataFrame) -> "InventoryOverlay":
+        """Move the overlay onto a new shared base, replaying its edits if the data changed."""
+        if base is self.base:
+            return self
+        if self.version is not None and data_version(base) == self.version:
+            # same data, new frame object: row positions are still valid
+            self.base, self._merged = base, None
+            return self
+        ops = self._ops
+        self.__init__(base)
+        for name, *args in ops:  # op names are the edit methods
+            try:
+                getattr(self, name)(*args)
+            except KeyError:
+                # product not in this base: skipped here, kept for the next rebase
+                pass
+        self._ops = list(ops)
+        return self
+
+
+def _patched(s: pd.Series, changes: Dict[int, Any]) -> np.ndarray:
+    """Copy of column `s` with {row position: value} applied, upcasting ints if needed."""
+    if not pd.api.types.is_numeric_dtype(s):
+        values = s.astype(object).to_numpy(copy=True)
+        values[list(changes.keys())] = list(changes.values())
+        return values
+    new = np.asarray(list(changes.values()))
+    values = pd.to_numeric(s, errors="coerce").to_numpy()
+    if values.dtype.kind in "iu" and not np.array_equal(new, new.astype(values.dtype)):
+        values = values.astype("float64")
+    else:
+        values = values.copy()
+    values[list(changes.keys())] = new
+    return values
+
+
+def _as_float(x) -> float:
+    x = pd.to_numeric(x, errors="coerce")
+    return 0.0 if pd.isna(x) else float(x)
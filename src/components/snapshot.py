@@ -0,0 +1,234 @@
+# src/components/snapshot.py
+import json
+import os
+import time
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so old snapshots are treated as stale
+SNAPSHOT_FORMAT = 2
+MANIFEST_NAME = "manifest.json"
+
+# Loaded snapshots, keyed by snapshot dir -> (manifest mtime, manifest, frame)
+_CACHE: Dict[str, tuple] = {}
+
+
+def _source_stat(source: Optional[Path]) -> Optional[dict]:
+    if source is None or not Path(source).exists():
+        return None
+    st = os.stat(source)
+    return {"path": Path(source).name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _column_kind(name: str, s: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(s) or "date" in name.lower():
+        return "datetime"
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        return "numeric"
+    return "category"
+
+
+def _codes_dtype(n_categories: int):
+    if n_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if n_categories < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def _encode_column(name: str, s: pd.Series):
+    """Return (kind, array, categories) for one column."""
+    kind = _column_kind(name, s)
+    if kind == "datetime":
+        arr = pd.to_datetime(s, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        return kind, arr, None
+    if kind == "numeric":
+        if not isinstance(s.dtype, np.dtype):
+            s = s.astype("float64")  # nullable ints/bools -> NaN-aware floats
+        return kind, s.to_numpy(), None
+    # dictionary-encode strings: int codes on disk, labels in the manifest
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cat = s.cat.remove_unused_categories()
+        cat = cat.cat.rename_categories([str(c) for c in cat.cat.categories])
+        codes, categories = cat.cat.codes.to_numpy(), list(cat.cat.categories)
+    else:
+        codes, uniques = pd.factorize(s.where(s.isna(), s.astype(str)), sort=True)
+        categories = [str(u) for u in uniques]
+    return kind, codes.astype(_codes_dtype(len(categories))), categories
+
+
+def write_snapshot(df: pd.DataFrame, snapshot_dir, source=None, columns: Optional[List[str]] = None) -> dict:
+    """
+    Write `df` as one .npy file per column plus a manifest.
+    `source` is the CSV the snapshot mirrors; its size/mtime are recorded so
+    readers can tell when the snapshot is stale.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    columns = list(columns) if columns is not None else list(df.columns)
+
+    # Column files are never overwritten in place: a reader may have the
+    # previous generation memory-mapped, and truncating a mapped file crashes it.
+    generation = f"{time.time_ns():x}"
+    schema = []
+    for i, col in enumerate(columns):
+        s = df[col] if col in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+        kind, arr, categories = _encode_column(col, s)
+        file_name = f"{generation}-{i:03d}.npy"
+        np.save(snapshot_dir / file_name, np.ascontiguousarray(arr), allow_pickle=False)
+        entry = {"name": col, "kind": kind, "dtype": str(arr.dtype), "file": file_name}
+        if categories is not None:
+            entry["categories"] = categories
+        schema.append(entry)
+
+    return _finish_snapshot(snapshot_dir, schema, len(df), source)
+
+
+def _finish_snapshot(snapshot_dir: Path, schema: list, n_rows: int, source=None) -> dict:
+    source_stat = _source_stat(source)
+    content = [{k: v for k, v in e.items() if k != "file"} for e in schema]
+    token = json.dumps([SNAPSHOT_FORMAT, n_rows, content, source_stat], sort_keys=True, default=str)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "n_rows": int(n_rows),
+        "columns": schema,
+        "source": source_stat,
+        "version": hashlib.sha1(token.encode("utf-8")).hexdigest()[:16],
+    }
+    # Manifest goes last (and atomically): a snapshot without one is "missing"
+    tmp = snapshot_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, snapshot_dir / MANIFEST_NAME)
+    _CACHE.pop(str(snapshot_dir.resolve()), None)
+
+    # Drop older generations (existing mappings keep the unlinked data alive)
+    live = {e["file"] for e in schema}
+    for old in snapshot_dir.glob("*.npy"):
+        if old.name not in live:
+            try:
+                old.unlink()
+            except OSError:
+                pass  # still mapped on a platform that forbids deleting it
+    return manifest
+
+
+class SnapshotWriter:
+    """
+    Build a snapshot chunk by chunk when the whole frame doesn't fit in memory.
+    `layout` fixes each column's storage up front (from a first pass over the
+    data): {column: numpy dtype} for numeric/datetime columns, or
+    {column: [categories]} for dictionary-encoded ones. Chunks are written
+    straight into preallocated memory-mapped .npy files.
+    """
+
+    def __init__(self, snapshot_dir, layout: dict, n_rows: int):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.n_rows = n_rows
+        self.pos = 0
+        generation = f"{time.time_ns():x}"
+        self.schema, self._arrays, self._dtypes = [], {}, {}
+        for i, (col, spec) in enumerate(layout.items()):
+            if isinstance(spec, list):
+                kind, dtype = "category", np.dtype(_codes_dtype(len(spec)))
+                self._dtypes[col] = pd.CategoricalDtype(pd.Index(spec))
+            else:
+                dtype = np.dtype(spec)
+                kind = "datetime" if dtype.kind == "M" else "numeric"
+            file_name = f"{generation}-{i:03d}.npy"
+            self._arrays[col] = np.lib.format.open_memmap(
+                self.snapshot_dir / file_name, mode="w+", dtype=dtype, shape=(n_rows,)
+            )
+            entry = {"name": col, "kind": kind, "dtype": str(dtype), "file": file_name}
+            if kind == "category":
+                entry["categories"] = list(spec)
+            self.schema.append(entry)
+
+    def append(self, chunk: pd.DataFrame):
+        end = self.pos + len(chunk)
+        if end > self.n_rows:
+            raise ValueError(f"Snapshot sized for {self.n_rows} rows, got {end}")
+        for col, arr in self._arrays.items():
+            s = chunk[col] if col in chunk.columns else pd.Series(pd.NA, index=chunk.index, dtype=object)
+            if col in self._dtypes:
+                values = pd.Categorical(s.where(s.isna(), s.astype(str)), dtype=self._dtypes[col]).codes
+            elif arr.dtype.kind == "M":
+                values = pd.to_datetime(s, errors="coerce").to_numpy(dtype=arr.dtype)
+            else:
+                values = pd.to_numeric(s, errors="coerce").to_numpy(dtype=arr.dtype)
+            arr[self.pos:end] = values
+        self.pos = end
+
+    def close(self, source=None) -> dict:
+        if self.pos != self.n_rows:
+            raise ValueError(f"Snapshot expected {self.n_rows} rows, got {self.pos}")
+        for arr in self._arrays.values():
+            arr.flush()
+        self._arrays = {}
+        return _finish_snapshot(self.snapshot_dir, self.schema, self.n_rows, source)
+
+
+def read_manifest(snapshot_dir) -> Optional[dict]:
+    path = Path(snapshot_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale(manifest: Optional[dict], source=None) -> bool:
+    """A snapshot is stale if missing, from another format, or its source CSV changed."""
+    if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT:
+        return True
+    if source is None:
+        return False
+    current = _source_stat(source)
+    return current is not None and current != manifest.get("source")
+
+
+def _decode_column(snapshot_dir: Path, entry: dict):
+    arr = np.load(snapshot_dir / entry["file"], mmap_mode="r", allow_pickle=False)
+    if entry["kind"] == "category":
+        dtype = pd.CategoricalDtype(pd.Index(entry["categories"]))
+        return pd.Categorical.from_codes(arr, dtype=dtype, validate=False)
+    return arr
+
+
+def read_snapshot(snapshot_dir, source=None) -> Optional[pd.DataFrame]:
+    """
+    Return the snapshot as a DataFrame whose columns are memory-mapped views
+    of the .npy files, or None if the snapshot is missing or stale.
+    The frame is cached per process and shared between callers: treat it as
+    read-only and copy before mutating.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest_path = snapshot_dir / MANIFEST_NAME
+    key = str(snapshot_dir.resolve())
+
+    # Fast path: two stat() calls, no manifest parse, no column reads
+    cached = _CACHE.get(key)
+    if cached is not None and manifest_path.exists():
+        manifest_stat, manifest, df = cached
+        if manifest_stat == os.stat(manifest_path).st_mtime_ns and not is_stale(manifest, source):
+            return df
+
+    manifest = read_manifest(snapshot_dir)
+    if is_stale(manifest, source):
+        return None
+    try:
+        data = {e["name"]: _decode_column(snapshot_dir, e) for e in manifest["columns"]}
+    except (OSError, ValueError, KeyError):
+        return None
+    df = pd.DataFrame(data, index=pd.RangeIndex(manifest["n_rows"]), copy=False)
+    df.attrs["data_version"] = manifest["version"]
+    df.attrs["data_rows"] = manifest["n_rows"]  # tells the full table from row subsets
+    _CACHE[key] = (os.stat(manifest_path).st_mtime_ns, manifest, df)
+    return df
@@ -0,0 +1,76 @@
+# src/components/splits.py
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "splits.json"
+SPLIT_NAMES = ("train", "test")
+_BUCKETS = 10_000
+
+
+def hash_split(keys: pd.Series, test_size: float = 0.2) -> np.ndarray:
+    """
+    True for rows that belong to the test split. The assignment depends only
+    on the key value (a fixed-seed hash of its string form), so a key stays
+    on the same side no matter which rows are added later or how the data is
+    chunked.
+    """
+    h = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+    return (h % _BUCKETS) < int(round(test_size * _BUCKETS))
+
+
+def write_split_index(is_test: np.ndarray, splits_dir, start: int = 0, append: bool = False,
+                      meta: Optional[dict] = None) -> dict:
+    """
+    Record the row positions (offset by `start`, i.e. positions in data.csv /
+    the snapshot) of each split as little-endian int64 files instead of
+    copying the rows. With append=True the positions are added to the
+    existing files, so chunked and incremental ingestion can call this per batch.
+    """
+    splits_dir = Path(splits_dir)
+    splits_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_split_manifest(splits_dir) if append else None
+    if manifest is None:
+        manifest = {"n_rows": 0, "counts": {name: 0 for name in SPLIT_NAMES}}
+        for name in SPLIT_NAMES:
+            (splits_dir / f"{name}.idx").write_bytes(b"")
+
+    positions = np.arange(start, start + len(is_test), dtype="<i8")
+    for name, mask in (("train", ~is_test), ("test", is_test)):
+        with open(splits_dir / f"{name}.idx", "ab") as f:
+            positions[mask].tofile(f)
+        manifest["counts"][name] += int(mask.sum())
+    manifest["n_rows"] = max(manifest["n_rows"], start + len(is_test))
+    manifest.update(meta or {})
+
+    tmp = splits_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(splits_dir / MANIFEST_NAME)
+    return manifest
+
+
+def read_split_manifest(splits_dir) -> Optional[dict]:
+    path = Path(splits_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def read_split_index(splits_dir) -> Dict[str, np.ndarray]:
+    """Memory-mapped row positions per split, for df.iloc / np.take."""
+    splits_dir = Path(splits_dir)
+    manifest = read_split_manifest(splits_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No split manifest in {splits_dir}")
+    out = {}
+    for name in SPLIT_NAMES:
+        n = manifest["counts"][name]
+        out[name] = (np.memmap(splits_dir / f"{name}.idx", dtype="<i8", mode="r", shape=(n,))
+                     if n else np.array([], dtype="<i8"))
+    return out
@@ -1,7 +1,23 @@
 # state.py
+import uuid
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from src.components.budget_forecast import FORECAST_DIRNAME, budget_forecast
+from src.components.durable_store import DurableStore
+from src.components.frame_cache import cached_per_frame
+from src.components.partitions import (
+    PARTITIONS_DIRNAME, partition_directory, user_product_keys, user_products, user_transactions,
+)
+from src.components.recipes import RECIPES_DIRNAME, recipe_matrix
+from src.components.rollups import ROLLUPS_DIRNAME, load_rollups, with_edits
+from src.components.shared_inventory import InventoryOverlay, data_version
+from src.components.snapshot import read_snapshot, write_snapshot
+from src.components.tables import Tables, normalize, read_tables, write_tables
+from src.model_training.shopping_list import ShoppingList
+
 # Your dataset schema (exact column names)
 _EXPECTED_COLS = [
     "User_ID","user_diet","preferred_cuisines","monthly_budget","purchase_date",
@@ -13,26 +29,342 @@ _EXPECTED_COLS = [
     "ingredient_product_ids","ingredient_qtys","recipe_instructions","user_monthly_spend","category_spend_share"
 ]
 
+# Compact storage type per column: low-cardinality strings as categoricals,
+# numerics downcast to the narrowest type that holds the data's range.
+_SCHEMA = {
+    "User_ID": "category", "user_diet": "category", "preferred_cuisines": "category",
+    "monthly_budget": "int32", "purchase_date": "datetime64[ns]",
+    "Product_ID": "category", "Product_Name": "category", "Brand": "category",
+    "Category": "category", "Subcategory": "category", "unit": "category",
+    "unit_price_inr": "float32", "quantity_purchased": "float32", "discount_applied": "float32",
+    "total_spent": "float32", "storage_type": "category", "expiration_date": "datetime64[ns]",
+    "days_to_expiry": "int16", "quantity_on_hand": "int32", "reorder_level": "int16",
+    "reorder_quantity": "int16", "payment_method": "category", "store_type": "category",
+    "calories": "float32", "protein_g": "float32", "fat_g": "float32", "carbs_g": "float32",
+    "fiber_g": "float32", "sugar_g": "float32", "sodium_mg": "float32",
+    "product_diet_tags": "category", "recipe_id": "category", "recipe_name": "category",
+    "recipe_cuisine": "category", "recipe_cook_time": "int16",
+    "ingredient_product_ids": "category", "ingredient_qtys": "category",
+    "recipe_instructions": "category", "user_monthly_spend": "float32",
+    "category_spend_share": "float32",
+}
+
+# Names written by data_ingestion.py -> names the app expects
+_COLUMN_ALIASES = {
+    "user_id": "User_ID",
+    "monthly_budget_inr": "monthly_budget",
+    "Unit": "unit",
+    "total_spent_inr": "total_spent",
+    "Expiry_Date": "expiration_date",
+    "recipe_cook_time_min": "recipe_cook_time",
+    "user_monthly_spend_inr": "user_monthly_spend",
+}
+
+SNAPSHOT_DIRNAME = "snapshot"
+TABLES_DIRNAME = "tables"
+STORE_DIRNAME = "store"
+
+# artifacts dir -> DurableStore shared by every session of the process
+_STORES = {}
+
+
+def _cast_column(s: pd.Series, dtype: str) -> pd.Series:
+    if dtype == "category":
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return s
+        return s.where(s.isna(), s.astype(str)).astype("category")
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(s, errors="coerce").astype(dtype)
+    num = pd.to_numeric(s, errors="coerce")
+    if dtype.startswith("int"):
+        info = np.iinfo(dtype)
+        if num.isna().any():
+            # ints with gaps keep NaN as float32 rather than a nullable extension type
+            return num.astype("float32")
+        if len(num) and (num.min() < info.min or num.max() > info.max or (num % 1 != 0).any()):
+            return num  # doesn't fit: keep pandas' inferred type
+    return num.astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Return `df` with the compact dtypes from _SCHEMA applied to the columns it has."""
+    out = df.copy(deep=False)
+    for col, dtype in _SCHEMA.items():
+        if col in out.columns:
+            out[col] = _cast_column(out[col], dtype)
+    return out
+
+
+def memory_report(df: pd.DataFrame, before: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Per-column memory footprint (deep, in bytes). Pass the frame as it was
+    before apply_schema as `before` to get the savings side by side.
+    """
+    report = pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "bytes": df.memory_usage(deep=True, index=False),
+    })
+    if before is not None:
+        report["dtype_before"] = before.dtypes.astype(str).reindex(report.index)
+        report["bytes_before"] = before.memory_usage(deep=True, index=False).reindex(report.index)
+        report["saved_pct"] = (100 * (1 - report["bytes"] / report["bytes_before"])).round(1)
+    report.loc["TOTAL"] = report.sum(numeric_only=True)
+    if before is not None:
+        report.loc["TOTAL", "saved_pct"] = round(
+            100 * (1 - report.loc["TOTAL", "bytes"] / report.loc["TOTAL", "bytes_before"]), 1
+        )
+    return report
+
+
+def align_inventory_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename known aliases, add missing expected columns as NA, keep schema order."""
+    renames = {k: v for k, v in _COLUMN_ALIASES.items() if k in df.columns and v not in df.columns}
+    df = df.rename(columns=renames)
+    for c in _EXPECTED_COLS:
+        if c not in df.columns:
+            df[c] = pd.NA
+    return df[_EXPECTED_COLS]
+
+
+def load_inventory(artifacts_dir="artifacts") -> pd.DataFrame:
+    """
+    Load the inventory from the columnar snapshot next to data.csv.
+    Falls back to parsing the CSV (and refreshing the snapshot) only when the
+    snapshot is missing or older than the CSV. The returned frame is shared
+    per process; copy it before mutating.
+    """
+    artifacts = Path(artifacts_dir)
+    data_path = artifacts / "data.csv"
+    snapshot_dir = artifacts / SNAPSHOT_DIRNAME
+
+    df = read_snapshot(snapshot_dir, source=data_path)
+    if df is not None:
+        return df
+    if not data_path.exists():
+        return pd.DataFrame(columns=_EXPECTED_COLS)
+
+    df = apply_schema(align_inventory_columns(pd.read_csv(data_path)))
+    try:
+        write_snapshot(df, snapshot_dir, source=data_path, columns=_EXPECTED_COLS)
+    except OSError:
+        # read-only deployment: serve the parsed CSV, already in snapshot types
+        return df
+    return read_snapshot(snapshot_dir, source=data_path)
+
+
+def load_tables(artifacts_dir="artifacts") -> Tables:
+    """
+    Products / users / transactions split of data.csv (see tables.normalize),
+    memory-mapped from artifacts/tables and rebuilt from the wide snapshot
+    when missing or stale. Shared per process like load_inventory.
+    """
+    artifacts = Path(artifacts_dir)
+    data_path = artifacts / "data.csv"
+    tables_dir = artifacts / TABLES_DIRNAME
+
+    tables = read_tables(tables_dir, source=data_path)
+    if tables is not None:
+        return tables
+    tables = normalize(load_inventory(artifacts_dir))
+    if not data_path.exists():
+        return tables
+    try:
+        write_tables(tables, tables_dir, source=data_path)
+    except OSError:
+        return tables
+    return read_tables(tables_dir, source=data_path)
+
+
+def open_store(artifacts_dir="artifacts"):
+    """
+    The process-wide durable inventory / shopping-list store under
+    artifacts/store, reopened on top of the new products table when data.csv
+    is re-ingested. None if the artifacts directory is not writable.
+    """
+    key = str(Path(artifacts_dir).resolve())
+    products = load_tables(artifacts_dir).products
+    store = _STORES.get(key)
+    if store is not None and data_version(store.base) == data_version(products):
+        return store
+    if store is not None:
+        store.close()
+    try:
+        store = DurableStore(Path(artifacts_dir) / STORE_DIRNAME, products)
+    except OSError:
+        return None
+    _STORES[key] = store
+    return store
+
+
+def load_partitions(artifacts_dir="artifacts"):
+    """Per-user partition directory of the transactions (see partitions.py)."""
+    tables = load_tables(artifacts_dir)
+    return partition_directory(tables.transactions, len(tables.users), Path(artifacts_dir) / PARTITIONS_DIRNAME)
+
+
+def load_budget_forecast(artifacts_dir="artifacts"):
+    """Next-month spend forecast of every user (see budget_forecast.py)."""
+    tables = load_tables(artifacts_dir)
+    return budget_forecast(tables.transactions, len(tables.users), Path(artifacts_dir) / FORECAST_DIRNAME)
+
+
+def load_recipes(artifacts_dir="artifacts"):
+    """Sparse recipe x product requirement matrix parsed from the purchase log (see recipes.py)."""
+    tables = load_tables(artifacts_dir)
+    return recipe_matrix(tables.transactions, tables.products, Path(artifacts_dir) / RECIPES_DIRNAME)
+
+
+def user_key(artifacts_dir="artifacts", user_id=None):
+    """Row position of `user_id` in the users table, or None (whole shop / unknown user)."""
+    if user_id is None:
+        return None
+    users = load_tables(artifacts_dir).users
+    keys = pd.Index(users["User_ID"].astype(str)).get_indexer([str(user_id)])
+    return int(keys[0]) if keys[0] >= 0 else None
+
+
+def _user_base(overlay: InventoryOverlay, key: int, artifacts_dir="artifacts") -> pd.DataFrame:
+    """User `key`'s products in the overlay's base, stock from their own purchases (see user_products)."""
+    return user_products(overlay.base, load_tables(artifacts_dir).transactions, load_partitions(artifacts_dir), key)
+
+
+def _user_view(overlay: InventoryOverlay, key: int, artifacts_dir="artifacts") -> pd.DataFrame:
+    """
+    User `key`'s view of the overlay: the user's products (_user_base) with
+    the session's edits replayed on them (stock changes on the user's own
+    quantities), then the rows the session added.
+    """
+    view = _user_base(overlay, key, artifacts_dir)
+    if not len(overlay.edited_positions()) and not overlay.n_appended:
+        return view
+
+    def build(merged: pd.DataFrame) -> pd.DataFrame:
+        out = overlay.replay_edits(view)
+        if overlay.n_appended:
+            out = pd.concat([out, merged.iloc[len(overlay.base):]], ignore_index=True)
+        out.attrs = {k: v for k, v in view.attrs.items() if k != "data_version"}
+        return out
+
+    return cached_per_frame(overlay.frame(), f"user_view:{key}", build)
+
+
+def session_inventory(st, artifacts_dir="artifacts") -> pd.DataFrame:
+    """
+    This session's view of the inventory (one row per product): the shared
+    durable inventory (the products table plus persisted edits) with the
+    session's overlay edits merged in (lazily, and only when it has any),
+    narrowed to the products of the session's user if one is selected, with
+    the stock columns of their own latest purchases. Edits are kept against
+    the whole inventory, so switching users never drops them.
+    """
+    store = open_store(artifacts_dir)
+    base = store.frame() if store is not None else load_tables(artifacts_dir).products
+    overlay = st.session_state.inventory_overlay
+    overlay.rebase(base)
+    key = user_key(artifacts_dir, st.session_state.get("user_id"))
+    if key is None:
+        return overlay.frame()
+    return _user_view(overlay, key, artifacts_dir)
+
+
+def session_transactions(st, artifacts_dir="artifacts") -> pd.DataFrame:
+    """Purchase log of the session's user (all purchases if no user is selected)."""
+    transactions = load_tables(artifacts_dir).transactions
+    key = user_key(artifacts_dir, st.session_state.get("user_id"))
+    if key is None:
+        return transactions
+    return user_transactions(transactions, load_partitions(artifacts_dir), key)
+
+
+def session_rollups(st, artifacts_dir="artifacts"):
+    """
+    Dashboard rollups of this session's inventory and purchase log, persisted
+    under artifacts/rollups per data version and kept current under the
+    session's edits (see InventoryOverlay.rollups).
+    """
+    view = session_inventory(st, artifacts_dir)
+    transactions = session_transactions(st, artifacts_dir)
+    rollups_dir = Path(artifacts_dir) / ROLLUPS_DIRNAME
+    overlay = st.session_state.inventory_overlay
+    key = user_key(artifacts_dir, st.session_state.get("user_id"))
+    if key is None:
+        return overlay.rollups(transactions, rollups_dir)
+
+    # the user's slice of the base, plus the session's edits that fall in it
+    base_view = _user_base(overlay, key, artifacts_dir)
+    base_rollups = load_rollups(base_view, transactions, rollups_dir)
+    edited, n_appended = overlay.edited_positions(), overlay.n_appended
+    if not len(edited) and not n_appended:
+        return base_rollups
+    keys = user_product_keys(load_tables(artifacts_dir).transactions, load_partitions(artifacts_dir), key,
+                             len(overlay.base))
+    positions = np.flatnonzero(np.isin(keys, edited))
+    return cached_per_frame(view, f"rollups:{id(base_rollups)}",
+                            lambda v: with_edits(base_rollups, base_view, v, positions, n_appended))
+
+
+def shopping_list_name(st) -> str:
+    """Durable list of this session: the selected user's, else one private to the browser session."""
+    user_id = st.session_state.get("user_id")
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"session:{st.session_state.session_id}"
+
+
+def _load_shopping_list(st, artifacts_dir="artifacts"):
+    try:
+        store = open_store(artifacts_dir)
+    except Exception:
+        store = None
+    name = shopping_list_name(st)
+    st.session_state.shopping_list = ShoppingList.from_records(store.shopping_list(name) if store is not None else [])
+    st.session_state.shopping_list_name = name
+
+
+def select_user(st, user_id, artifacts_dir="artifacts"):
+    """
+    Scope the session to `user_id` (None: the whole shop). On a change, the
+    current shopping list is saved under its own name, the new scope's list
+    is loaded and the monthly budget is reset to the user's.
+    """
+    if st.session_state.get("user_id") == user_id:
+        return
+    save_session(st, artifacts_dir)
+    st.session_state.user_id = user_id
+    _load_shopping_list(st, artifacts_dir)
+    # budget defaults to the new user's own
+    key = user_key(artifacts_dir, user_id)
+    budget = float(load_tables(artifacts_dir).users["monthly_budget"].iloc[key]) if key is not None else 0.0
+    st.session_state.budget["monthly_budget"] = budget
+
+
+def save_session(st, artifacts_dir="artifacts"):
+    """Persist this session's shopping list (only its changes are written)."""
+    store = open_store(artifacts_dir)
+    if store is not None:
+        store.sync_shopping_list(ShoppingList.from_records(st.session_state.shopping_list).to_records(),
+                                 st.session_state.get("shopping_list_name") or shopping_list_name(st))
+
+
 def init_session_state(st, artifacts_dir="artifacts"):
     # make expected cols accessible to app
     st.session_state._expected_inventory_cols = _EXPECTED_COLS
 
-    # Inventory DataFrame
+    # User the session is scoped to (None: the whole shop), see select_user
+    if "user_id" not in st.session_state:
+        st.session_state.user_id = None
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+    # Inventory: shared read-only products table + this session's edits
+    if "inventory_overlay" not in st.session_state:
+        try:
+            base = load_tables(artifacts_dir).products
+        except Exception:
+            base = pd.DataFrame(columns=_EXPECTED_COLS)
+        st.session_state.inventory_overlay = InventoryOverlay(base)
     if "inventory" not in st.session_state:
-        artifacts = Path(artifacts_dir)
-        data_path = artifacts / "data.csv"
-        if data_path.exists():
-            try:
-                df = pd.read_csv(data_path)
-                # Ensure expected columns exist. If not, create as NA.
-                for c in _EXPECTED_COLS:
-                    if c not in df.columns:
-                        df[c] = pd.NA
-                st.session_state.inventory = df[_EXPECTED_COLS].copy()
-            except Exception:
-                st.session_state.inventory = pd.DataFrame(columns=_EXPECTED_COLS)
-        else:
-            st.session_state.inventory = pd.DataFrame(columns=_EXPECTED_COLS)
+        st.session_state.inventory = st.session_state.inventory_overlay.frame()
 
     # Dietary preferences
     if "diet_prefs" not in st.session_state:
@@ -44,12 +376,13 @@ def init_session_state(st, artifacts_dir="artifacts"):
             "nut_free": False,
             "keto": False,
             "diabetic_friendly": False,
-            "allergies": []
+            "allergies": [],
+            "allergy_whole_words": False
         }
 
-    # Shopping list (in-memory)
+    # Shopping list (a ShoppingList), restored from the durable store
     if "shopping_list" not in st.session_state:
-        st.session_state.shopping_list = []  # list of dicts
+        _load_shopping_list(st, artifacts_dir)
 
     # Budget
     if "budget" not in st.session_state:
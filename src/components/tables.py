@@ -0,0 +1,157 @@
+# src/components/tables.py
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.snapshot import SnapshotWriter, read_snapshot, write_snapshot
+
+# Attributes that describe the product itself (identical on every purchase row)
+PRODUCT_COLS = [
+    "Product_ID", "Product_Name", "Brand", "Category", "Subcategory", "unit",
+    "product_diet_tags", "calories", "protein_g", "fat_g", "carbs_g", "fiber_g",
+    "sugar_g", "sodium_mg",
+]
+# Current stock state of a product: taken from its most recent purchase
+STOCK_COLS = [
+    "unit_price_inr", "storage_type", "expiration_date", "days_to_expiry",
+    "quantity_on_hand", "reorder_level", "reorder_quantity",
+]
+USER_COLS = ["User_ID", "user_diet", "preferred_cuisines", "monthly_budget"]
+# One row per purchase; products and users are referenced by integer key
+TRANSACTION_COLS = [
+    "user_key", "product_key", "purchase_date", "unit_price_inr", "quantity_purchased",
+    "discount_applied", "total_spent", "storage_type", "expiration_date", "days_to_expiry",
+    "quantity_on_hand", "reorder_level", "reorder_quantity", "payment_method", "store_type",
+    "recipe_id", "recipe_name", "recipe_cuisine", "recipe_cook_time", "ingredient_product_ids",
+    "ingredient_qtys", "recipe_instructions", "user_monthly_spend", "category_spend_share",
+]
+TABLE_NAMES = ("products", "users", "transactions")
+
+
+class Tables(NamedTuple):
+    products: pd.DataFrame      # one row per Product_ID; row position == product_key
+    users: pd.DataFrame         # one row per User_ID; row position == user_key
+    transactions: pd.DataFrame  # purchase log with user_key / product_key
+
+
+def _latest_per(df: pd.DataFrame, key: str, order: np.ndarray, cols: list) -> pd.DataFrame:
+    latest = df.iloc[order].drop_duplicates(key, keep="last")
+    latest = latest.loc[latest[key].notna(), [c for c in cols if c in df.columns]]
+    latest = latest.sort_values(key, kind="stable").reset_index(drop=True)
+    if isinstance(latest[key].dtype, pd.CategoricalDtype):
+        latest[key] = latest[key].cat.remove_unused_categories()
+    return latest
+
+
+def normalize(df: pd.DataFrame) -> Tables:
+    """
+    Split the wide purchase log into product and user dimensions plus a
+    compact transaction table. Product stock columns come from each
+    product's latest purchase; user columns from each user's latest purchase.
+    """
+    df = df.reset_index(drop=True)
+    dates = pd.to_datetime(df["purchase_date"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+    order = np.argsort(dates, kind="stable")  # NaT sorts last
+
+    products = _latest_per(df, "Product_ID", order, PRODUCT_COLS + STOCK_COLS)
+    users = _latest_per(df, "User_ID", order, USER_COLS)
+
+    tx = df.drop(columns=[c for c in PRODUCT_COLS + USER_COLS if c in df.columns])
+    tx.insert(0, "product_key", pd.Index(products["Product_ID"]).get_indexer(df["Product_ID"]).astype(np.int32))
+    tx.insert(0, "user_key", pd.Index(users["User_ID"]).get_indexer(df["User_ID"]).astype(np.int32))
+    transactions = tx[[c for c in TRANSACTION_COLS if c in tx.columns]]
+    return Tables(products, users, transactions)
+
+
+class TablesWriter:
+    """
+    normalize() + write_tables() for a purchase log that arrives in chunks
+    (see data_ingestion's streaming mode). Transactions are written straight
+    into a memory-mapped snapshot; for products and users only the latest row
+    per key seen so far is kept, so memory is bounded by the number of
+    products and users, not purchases. `layout` is the SnapshotWriter layout
+    of the whole log; its Product_ID / User_ID category lists (sorted) fix
+    product_key / user_key up front.
+    """
+
+    def __init__(self, tables_dir, layout: dict, n_rows: int):
+        self.tables_dir = Path(tables_dir)
+        self.keys = {key: pd.Index(layout[key]) for key in ("Product_ID", "User_ID")}
+        tx_layout = {"user_key": "int32", "product_key": "int32"}
+        tx_layout.update((c, layout[c]) for c in TRANSACTION_COLS if c in layout)
+        self._tx = SnapshotWriter(self.tables_dir / "transactions", tx_layout, n_rows)
+        self._latest = {"Product_ID": None, "User_ID": None}
+        self.pos = 0
+
+    def _codes(self, key: str, s: pd.Series) -> np.ndarray:
+        return self.keys[key].get_indexer(s.where(s.isna(), s.astype(str))).astype(np.int32)
+
+    def _keep_latest(self, chunk: pd.DataFrame, key: str, cols: list, when: np.ndarray, row: np.ndarray):
+        part = chunk[[c for c in cols if c in chunk.columns]].assign(_when=when, _row=row)
+        part = part[part[key].notna()]
+        both = part if self._latest[key] is None else pd.concat([self._latest[key], part], ignore_index=True)
+        both = both.sort_values(["_when", "_row"], kind="stable")
+        self._latest[key] = both.drop_duplicates(key, keep="last").reset_index(drop=True)
+
+    def append(self, chunk: pd.DataFrame):
+        chunk = chunk.reset_index(drop=True)
+        dates = pd.to_datetime(chunk["purchase_date"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        # same order as normalize(): by purchase date, NaT last, ties by row position
+        when = np.where(np.isnat(dates), np.iinfo(np.int64).max, dates.view(np.int64))
+        row = np.arange(self.pos, self.pos + len(chunk))
+        self._keep_latest(chunk, "Product_ID", PRODUCT_COLS + STOCK_COLS, when, row)
+        self._keep_latest(chunk, "User_ID", USER_COLS, when, row)
+
+        tx = chunk.drop(columns=[c for c in PRODUCT_COLS + USER_COLS if c in chunk.columns])
+        tx.insert(0, "product_key", self._codes("Product_ID", chunk["Product_ID"]))
+        tx.insert(0, "user_key", self._codes("User_ID", chunk["User_ID"]))
+        self._tx.append(tx)
+        self.pos += len(chunk)
+
+    def _dimension(self, key: str) -> pd.DataFrame:
+        latest = self._latest[key]
+        if latest is None:
+            return pd.DataFrame({key: pd.Series(dtype=object)})
+        latest = latest.drop(columns=["_when", "_row"])
+        rows = self._codes(key, latest[key])
+        if len(rows) != len(self.keys[key]) or (rows < 0).any():
+            raise ValueError(f"{key} values don't match the layout's categories")
+        return latest.iloc[np.argsort(rows)].reset_index(drop=True).infer_objects()
+
+    def close(self, source=None) -> dict:
+        versions = {}
+        for name, key in (("products", "Product_ID"), ("users", "User_ID")):
+            versions[name] = write_snapshot(self._dimension(key), self.tables_dir / name, source=source)["version"]
+        versions["transactions"] = self._tx.close(source=source)["version"]
+        return versions
+
+
+def with_products(transactions: pd.DataFrame, products: pd.DataFrame, columns: Optional[list] = None) -> pd.DataFrame:
+    """Join product attributes (by product_key) onto transaction rows."""
+    columns = columns or ["Product_ID", "Product_Name", "Brand", "Category"]
+    keys = transactions["product_key"].to_numpy()
+    out = transactions.copy(deep=False)
+    for c in columns:
+        values = products[c].iloc[np.where(keys >= 0, keys, 0)].to_numpy()
+        out[c] = pd.Series(values, index=out.index).where(keys >= 0)
+    return out
+
+
+def write_tables(tables: Tables, tables_dir, source=None) -> dict:
+    """Write each table as its own columnar snapshot under `tables_dir`."""
+    tables_dir = Path(tables_dir)
+    return {
+        name: write_snapshot(getattr(tables, name), tables_dir / name, source=source)["version"]
+        for name in TABLE_NAMES
+    }
+
+
+def read_tables(tables_dir, source=None) -> Optional[Tables]:
+    """Memory-mapped tables, or None if any of them is missing or stale."""
+    tables_dir = Path(tables_dir)
+    frames = [read_snapshot(tables_dir / name, source=source) for name in TABLE_NAMES]
+    if any(f is None for f in frames):
+        return None
+    return Tables(*frames)
@@ -0,0 +1,112 @@
+# src/components/treemap.py
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.components.frame_cache import cached_per_frame
+
+TREEMAP_PATH = ("Category", "Brand", "Product_Name")
+TOP_N = 12        # children kept per node before the rest go to "Other"
+MAX_NODES = 400   # node budget for one chart
+OTHER = "Other"
+MISSING = "Unknown"
+SEP = "\x1f"  # joins labels into node ids
+
+
+def _numbers(df: pd.DataFrame, col: str) -> np.ndarray:
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _ids(leaves: pd.DataFrame, depth: int) -> pd.Series:
+    """Id of each leaf's ancestor at `depth` (the labels from the root down, joined)."""
+    ids = leaves["l0"]
+    for d in range(1, depth + 1):
+        ids = ids + SEP + leaves[f"l{d}"]
+    return ids
+
+
+def _bucket_level(leaves: pd.DataFrame, depth: int, top_n: int) -> None:
+    """
+    Keep the top_n largest nodes at `depth` under each parent; relabel the
+    leaves of the others as OTHER at that depth, which cuts their subtrees.
+    Leaves already cut at a shallower depth are left alone.
+    """
+    live = leaves[leaves["cut"] > depth]
+    parent = _ids(live, depth - 1) if depth else pd.Series("", index=live.index)
+    node = live[f"l{depth}"]
+    totals = live.groupby([parent, node], sort=False)["value"].sum().sort_values(ascending=False, kind="stable")
+    rank = totals.groupby(level=0, sort=False).cumcount()
+    losers = rank.index[rank.to_numpy() >= top_n]
+    if len(losers) == 0:
+        return
+    idx = live.index[pd.MultiIndex.from_arrays([parent, node]).isin(losers)]
+    leaves.loc[idx, f"l{depth}"] = OTHER
+    leaves.loc[idx, "cut"] = depth + 1
+
+
+def _nodes(leaves: pd.DataFrame, depth_count: int) -> pd.DataFrame:
+    out = []
+    for depth in range(depth_count):
+        live = leaves[leaves["cut"] > depth]
+        parents = _ids(live, depth - 1) if depth else pd.Series("", index=live.index)
+        g = live.assign(parents=parents).groupby(_ids(live, depth), sort=False).agg(
+            labels=(f"l{depth}", "first"), parents=("parents", "first"),
+            value=("value", "sum"), price_sum=("price_sum", "sum"), price_n=("price_n", "sum"))
+        out.append(g)
+    nodes = pd.concat(out).rename_axis("ids").reset_index()
+    nodes["color"] = nodes["price_sum"] / nodes["price_n"].where(nodes["price_n"] > 0)
+    return nodes.drop(columns=["price_sum", "price_n"])
+
+
+def aggregate_hierarchy(df: pd.DataFrame, path: Sequence[str] = TREEMAP_PATH, value: str = "quantity_on_hand",
+                        color: Optional[str] = "unit_price_inr", top_n: int = TOP_N,
+                        max_nodes: int = MAX_NODES) -> pd.DataFrame:
+    """
+    Treemap nodes of `df` along `path`, one row per distinct node: ids,
+    labels, parents ("" for the roots), value (summed) and color (row mean
+    of the `color` column). Under every node only the top_n children by
+    value are kept and the rest are merged into one "Other" child; top_n is
+    lowered (as little as possible) until the tree fits in max_nodes. Feed the result to
+    `px.treemap(ids=, names=, parents=, values=, color=, branchvalues="total")`.
+    """
+    path = [c for c in path if c in df.columns]
+    if not path or df.empty:
+        return pd.DataFrame(columns=["ids", "labels", "parents", "value", "color"])
+    rows = pd.DataFrame({f"l{d}": df[c].astype(object).where(df[c].notna(), MISSING).astype(str).to_numpy()
+                         for d, c in enumerate(path)})
+    rows["value"] = np.nan_to_num(_numbers(df, value)) if value in df.columns else 1.0
+    price = _numbers(df, color) if color and color in df.columns else np.full(len(df), np.nan)
+    rows["price_sum"] = np.nan_to_num(price)
+    rows["price_n"] = (~np.isnan(price)).astype(np.int64)
+    levels = [f"l{d}" for d in range(len(path))]
+    base = rows.groupby(levels, sort=False).sum().reset_index()
+
+    def build(n: int) -> pd.DataFrame:
+        leaves = base.assign(cut=len(path))
+        for depth in range(len(path)):
+            _bucket_level(leaves, depth, n)
+        return _nodes(leaves, len(path))
+
+    # largest top_n (node count grows with it) whose tree fits the budget
+    top_n = max(int(top_n), 1)
+    nodes = build(top_n)
+    if len(nodes) <= max_nodes or top_n == 1:
+        return nodes
+    lo, hi, best = 1, top_n - 1, None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = build(mid)
+        if len(candidate) <= max_nodes:
+            lo, best = mid + 1, candidate
+        else:
+            hi = mid - 1
+    return best if best is not None else build(1)
+
+
+def treemap_nodes(df: pd.DataFrame, path: Sequence[str] = TREEMAP_PATH, value: str = "quantity_on_hand",
+                  color: Optional[str] = "unit_price_inr", top_n: int = TOP_N,
+                  max_nodes: int = MAX_NODES) -> pd.DataFrame:
+    """aggregate_hierarchy, computed once per frame object and parameters."""
+    key = f"treemap:{tuple(path)}:{value}:{color}:{top_n}:{max_nodes}"
+    return cached_per_frame(df, key, lambda d: aggregate_hierarchy(d, path, value, color, top_n, max_nodes))
@@ -0,0 +1,125 @@
+# src/components/tuning.py
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+from src.components.model_trainer import ENGINES, fit_engine
+
+TUNING_DIR = "artifacts/tuning"
+METRICS = ("MAE", "RMSE", "R2")
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else json.dumps(p, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def candidate_configs(param_grid: Dict[str, list], max_configs: Optional[int] = None,
+                      random_state: int = 42) -> List[Dict[str, Any]]:
+    """Every grid point, or a fixed random sample of max_configs of them."""
+    grid = ParameterGrid(param_grid)
+    if max_configs is None or len(grid) <= max_configs:
+        return list(grid)
+    return list(ParameterSampler(param_grid, n_iter=max_configs, random_state=random_state))
+
+
+def prepare_search(X: pd.DataFrame, y, k: int = 5, random_state: int = 42,
+                   tuning_dir: str = TUNING_DIR) -> Path:
+    """
+    Write X / y and a fold assignment (fold id per row) once into a directory
+    named after their content, so every (config, fold) task memory-maps the
+    same arrays and a repeated search on the same data lands in the same
+    directory and its cached results.
+    """
+    Xa = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    ya = np.ascontiguousarray(np.asarray(y, dtype=np.float64))
+    key = _digest(Xa.tobytes(), ya.tobytes(), list(X.columns), k, random_state)
+    search_dir = Path(tuning_dir) / key
+    if (search_dir / "search.json").exists():
+        return search_dir
+
+    (search_dir / "results").mkdir(parents=True, exist_ok=True)
+    folds = np.random.default_rng(random_state).permutation(len(ya)) % k
+    np.save(search_dir / "X.npy", Xa)
+    np.save(search_dir / "y.npy", ya)
+    np.save(search_dir / "folds.npy", folds.astype(np.int8))
+    tmp = search_dir / "search.json.tmp"
+    tmp.write_text(json.dumps({"features": list(X.columns), "k": k, "n_rows": len(ya)}), encoding="utf-8")
+    os.replace(tmp, search_dir / "search.json")
+    return search_dir
+
+
+def _result_path(search_dir: Path, engine: str, params: Dict[str, Any], fold: int) -> Path:
+    return search_dir / "results" / f"{engine}-{_digest(params)}-f{fold}.json"
+
+
+def _run_fold(search_dir: str, engine: str, params: Dict[str, Any], fold: int) -> Dict[str, Any]:
+    """One (config, fold) fit; runs in a worker process and caches its result."""
+    search_dir = Path(search_dir)
+    meta = json.loads((search_dir / "search.json").read_text(encoding="utf-8"))
+    X = pd.DataFrame(np.load(search_dir / "X.npy", mmap_mode="r"), columns=meta["features"])
+    y = np.load(search_dir / "y.npy", mmap_mode="r")
+    folds = np.load(search_dir / "folds.npy", mmap_mode="r")
+    test = folds == fold
+
+    _, run = fit_engine(engine, X[~test], y[~test], X[test], y[test], **params)
+    out = {"engine": engine, "params": params, "fold": fold, "wall_s": run["wall_s"],
+           "baseline": run["baseline"], "metrics": run[engine]}
+    path = _result_path(search_dir, engine, params, fold)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(out, default=float), encoding="utf-8")
+    os.replace(tmp, path)
+    return out
+
+
+def cross_validate_search(X: pd.DataFrame, y, param_grid: Dict[str, list], engine: str = "rf",
+                          k: int = 5, max_configs: Optional[int] = 20, n_jobs: Optional[int] = None,
+                          random_state: int = 42, tuning_dir: str = TUNING_DIR) -> pd.DataFrame:
+    """
+    k-fold cross-validation of every candidate config on a process pool.
+    (config, fold) results already on disk are reused, so an interrupted or
+    repeated search only fits what is missing. Returns one row per config
+    with mean/std of each metric across folds, best (lowest mean RMSE) first.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {sorted(ENGINES)}")
+    search_dir = prepare_search(X, y, k, random_state, tuning_dir)
+    configs = candidate_configs(param_grid, max_configs, random_state)
+    if engine == "rf":
+        # Parallelism is across tasks; a pool of multi-threaded forests oversubscribes
+        configs = [{**c, "n_jobs": 1} for c in configs]
+
+    results, todo = [], []
+    for params in configs:
+        for fold in range(k):
+            path = _result_path(search_dir, engine, params, fold)
+            if path.exists():
+                results.append(json.loads(path.read_text(encoding="utf-8")))
+            else:
+                todo.append((str(search_dir), engine, params, fold))
+
+    if todo and n_jobs == 1:
+        results.extend(_run_fold(*task) for task in todo)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results.extend(pool.map(_run_fold, *zip(*todo)))
+
+    rows = []
+    for params in configs:
+        key = _digest(params)
+        per_fold = [r["metrics"] for r in results if _digest(r["params"]) == key]
+        row = {"params": params, "n_folds": len(per_fold)}
+        for m in METRICS:
+            values = np.array([f[m] for f in per_fold])
+            row[f"{m}_mean"], row[f"{m}_std"] = float(values.mean()), float(values.std())
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values("RMSE_mean", kind="stable").reset_index(drop=True)
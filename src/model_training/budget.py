@@ -11,3 +11,19 @@ def check_budget_status(b: dict) -> dict:
         "remaining": float(remaining),
         "is_over": remaining < 0
     }
+
+
+def forecast_budget_status(b: dict, forecast, user_key: int, day: int = None) -> dict:
+    """
+    check_budget_status plus the user's projected month-end spend and the
+    probability of going over budget (see budget_forecast.BudgetForecast).
+    """
+    status = check_budget_status(b)
+    status.update(forecast.month_end(
+        user_key,
+        spent_so_far=float(b.get("spent_this_month", 0) or 0),
+        planned=float(b.get("planned_spend", 0) or 0),
+        budget=float(b.get("monthly_budget", 0) or 0),
+        day=day,
+    ))
+    return status
@@ -1,9 +1,17 @@
 # src/model_training/dietary.py
+import re
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
 import pandas as pd
 
+from src.components.frame_cache import cached_per_frame
+
 # Map UI checkboxes to expected tag strings in `product_diet_tags`
 PREF_TO_TAG = {
     "vegetarian": "vegetarian",
+    "vegan": "vegan",
     "gluten_free": "gluten_free",
     "lactose_free": "lactose_free",
     "nut_free": "nut_free",
@@ -25,8 +33,109 @@ def _normalize_tags(cell) -> list:
     tokens = [t.strip().replace("-", "_") for t in s.split(" ") if t]
     return tokens
 
-def suggest_items_any(df: pd.DataFrame, prefs: dict, limit: int = 50) -> pd.DataFrame:
-    """Return items that match ANY of the selected dietary tags."""
+# ---------- Diet-tag bitmask index ----------
+_MAX_TAGS = 64  # one bit per tag in a uint64
+
+
+def build_tag_index(tags: pd.Series) -> Tuple[Dict[str, int], np.ndarray]:
+    """
+    Encode each row's tag set as a uint64 bitmask.
+    Returns (vocab: tag -> bit, masks: one bitmask per row). The vocabulary is
+    PREF_TO_TAG's tags first, then any other tags found in the data.
+    Tokenizing happens once per distinct tag string, not once per row.
+    """
+    codes, uniques = pd.factorize(tags)
+    token_lists = [_normalize_tags(u) for u in uniques]
+
+    vocab: Dict[str, int] = {}
+    for t in list(PREF_TO_TAG.values()) + [t for lst in token_lists for t in lst]:
+        if t not in vocab and len(vocab) < _MAX_TAGS:
+            vocab[t] = len(vocab)
+
+    unique_masks = np.zeros(len(uniques) + 1, dtype=np.uint64)  # last slot: NA rows
+    for i, lst in enumerate(token_lists):
+        for t in lst:
+            if t in vocab:
+                unique_masks[i] |= np.uint64(1) << np.uint64(vocab[t])
+    return vocab, unique_masks[codes]
+
+
+def tag_index(df: pd.DataFrame) -> Tuple[Dict[str, int], np.ndarray]:
+    """build_tag_index over df["product_diet_tags"], cached per frame."""
+    return cached_per_frame(df, "diet_tag_index", lambda d: build_tag_index(d["product_diet_tags"]))
+
+
+def match_tags(df: pd.DataFrame, tags: list, mode: str = "any") -> np.ndarray:
+    """Boolean row mask: rows having any (mode="any") or all (mode="all") of `tags`."""
+    vocab, masks = tag_index(df)
+    wanted = np.uint64(0)
+    for t in tags:
+        if t in vocab:
+            wanted |= np.uint64(1) << np.uint64(vocab[t])
+        elif mode == "all":
+            return np.zeros(len(df), dtype=bool)  # nobody has an unknown tag
+    if mode == "all":
+        return (masks & wanted) == wanted
+    return (masks & wanted) != 0
+
+
+# ---------- Allergy exclusion ----------
+_ALLERGY_COLS = ["Product_Name", "Brand", "Category", "Subcategory"]
+_TEXT_SEP = "\n"  # never part of an allergy term, so matches can't span columns
+
+
+def build_search_text(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lowercased Product_Name/Brand/Category/Subcategory joined into one text per
+    row, factorized: returns (codes per row, distinct texts). Allergy matching
+    runs over the distinct texts only.
+    """
+    cols = [c for c in _ALLERGY_COLS if c in df.columns]
+    if not cols:
+        return np.full(len(df), -1), np.array([], dtype=object)
+    text = df[cols[0]].astype(str)
+    for c in cols[1:]:
+        text = text + _TEXT_SEP + df[c].astype(str)
+    codes, uniques = pd.factorize(text.str.lower())
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def search_text(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """build_search_text(df), cached per frame."""
+    return cached_per_frame(df, "allergy_search_text", build_search_text)
+
+
+@lru_cache(maxsize=256)
+def allergy_pattern(allergies: Tuple[str, ...], whole_words: bool = False) -> "re.Pattern":
+    """
+    One compiled alternation for a set of allergy terms (pass them sorted so
+    the cache sees equal sets as equal). With whole_words, "nut" no longer
+    matches "coconut"; by default any substring counts, as before.
+    """
+    alternation = "|".join(re.escape(a) for a in sorted(allergies, key=len, reverse=True))
+    if whole_words:
+        return re.compile(rf"\b(?:{alternation})\b")
+    return re.compile(alternation)
+
+
+def allergy_mask(df: pd.DataFrame, allergies: list, whole_words: bool = False) -> np.ndarray:
+    """Boolean row mask: True where a product mentions any of `allergies`."""
+    terms = tuple(sorted({a.strip().lower() for a in allergies if a and a.strip()}))
+    if not terms:
+        return np.zeros(len(df), dtype=bool)
+    codes, texts = search_text(df)
+    pattern = allergy_pattern(terms, whole_words)
+    hits = np.fromiter((pattern.search(t) is not None for t in texts), dtype=bool, count=len(texts))
+    hits = np.append(hits, False)  # code -1 (no text) never matches
+    return hits[codes]
+
+
+def suggest_items(df: pd.DataFrame, prefs: dict, limit: int = 50, mode: str = "any") -> pd.DataFrame:
+    """
+    Return items that match ANY (mode="any") or ALL (mode="all") of the selected
+    dietary tags, minus products mentioning an allergy. Set
+    prefs["allergy_whole_words"] to match allergies as whole words only.
+    """
     if df.empty:
         return df
 
@@ -37,27 +146,35 @@ def suggest_items_any(df: pd.DataFrame, prefs: dict, limit: int = 50) -> pd.Data
     if not tags and not prefs.get("allergies"):
         return df.copy().head(limit)
 
-    mask = pd.Series([False] * len(df), index=df.index)
+    # With only allergies selected, start from every product
+    mask = np.full(len(df), not tags, dtype=bool)
 
-    # Match ANY dietary preference
+    # Match dietary preferences with one bitwise op over the precomputed masks
     if tags and "product_diet_tags" in df.columns:
-        tag_lists = df["product_diet_tags"].apply(_normalize_tags)
-        for t in tags:
-            mask |= tag_lists.apply(lambda lst: t in lst)
+        mask |= match_tags(df, tags, mode)
 
-    # Allergy exclusion
+    # Allergy exclusion: one compiled pattern over the distinct product texts
     allergies = [a.strip().lower() for a in prefs.get("allergies", []) if a]
+    safe = np.ones(len(df), dtype=bool)
     if allergies:
-        for col in ["Product_Name", "Brand", "Category", "Subcategory"]:
-            if col in df.columns:
-                mask &= ~df[col].astype(str).str.lower().apply(
-                    lambda s: any(a in s for a in allergies)
-                )
+        safe = ~allergy_mask(df, allergies, whole_words=bool(prefs.get("allergy_whole_words")))
+        mask &= safe
 
     out = df.loc[mask] if tags or allergies else df
 
-    # Fallback: if no match found, still return some items
-    if out.empty and tags:
-        return df.head(limit)
+    # Fallback: if no match found, still return some (allergy-safe) items. Not
+    # for mode="all": no product having every selected tag is the answer.
+    if out.empty and tags and mode != "all":
+        return df.loc[safe].head(limit)
 
     return out.head(limit)
+
+
+def suggest_items_any(df: pd.DataFrame, prefs: dict, limit: int = 50) -> pd.DataFrame:
+    """Return items that match ANY of the selected dietary tags."""
+    return suggest_items(df, prefs, limit, mode="any")
+
+
+def suggest_items_all(df: pd.DataFrame, prefs: dict, limit: int = 50) -> pd.DataFrame:
+    """Return items that match ALL of the selected dietary tags (e.g. vegan AND nut-free)."""
+    return suggest_items(df, prefs, limit, mode="all")
@@ -1,11 +1,14 @@
 import pandas as pd
 
+from src.components.expiry_index import expiry_index
+
 def items_expiring_within(df, days=7):
     if "expiration_date" not in df.columns:
         return pd.DataFrame()
-    df = df.copy()
-    df["expiration_date"] = pd.to_datetime(df["expiration_date"], errors="coerce")
-    return df[df["expiration_date"] <= pd.Timestamp.today() + pd.Timedelta(days=days)]
+    last_day = pd.Timestamp.today() + pd.Timedelta(days=days)
+    out = df.iloc[expiry_index(df).window(None, last_day)].copy()
+    out["expiration_date"] = pd.to_datetime(out["expiration_date"], errors="coerce")
+    return out
 
 def check_item_expiry(df, product_name):
     if "expiration_date" not in df.columns or "Product_Name" not in df.columns:
@@ -1,16 +1,29 @@
 import numpy as np
 import pandas as pd
-from datetime import date, datetime, timedelta
 from typing import Dict, Any, Optional
 
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.ensemble import RandomForestRegressor
+
+from src.components.shared_inventory import InventoryOverlay
+from src.components.inventory_store import InventoryStore
+from src.components.expiry_index import expiry_index
+from src.components.feature_store import ENGINEERED, feature_frame
+from src.components.model_registry import REGISTRY_DIR, latest_version, load_meta, load_model, register_model
+from src.components.forest_export import compact_path, load_compact
+from src.components.model_trainer import fit_engine
+from src.components.tuning import TUNING_DIR, cross_validate_search
+
+PRICE_MODEL_NAME = "inventory_price"  # any engine; the one used is in the version's metrics
+PRICE_FEATURES = ["quantity_on_hand", "Days_to_Expiry", "Category_Share"]
+COMPACT_MAX_ROWS = 512  # above this, sklearn's predict outruns the compact forest
 
 
 # ---------- Basic inventory ops (no Streamlit here) ----------
 def add_product(df: pd.DataFrame, product: Dict[str, Any]) -> pd.DataFrame:
-    """Append a product row; create missing columns with NA."""
+    """Append a product row; create missing columns with NA.
+    Given a session InventoryOverlay or an InventoryStore, the row is recorded there instead."""
+    if isinstance(df, (InventoryOverlay, InventoryStore)):
+        return df.add_product(product)
     df2 = df.copy()
     for c in df2.columns:
         if c not in product:
@@ -19,29 +32,26 @@ def add_product(df: pd.DataFrame, product: Dict[str, Any]) -> pd.DataFrame:
 
 
 def update_stock(df: pd.DataFrame, product_id: str, delta: float) -> pd.DataFrame:
-    df2 = df.copy()
-    if "Product_ID" not in df2.columns:
-        raise KeyError("Product_ID column missing")
-    mask = df2["Product_ID"].astype(str) == str(product_id)
-    if not mask.any():
-        raise KeyError(f"Product ID {product_id} not found")
-    q = pd.to_numeric(df2.loc[mask, "quantity_on_hand"], errors="coerce").fillna(0)
-    df2.loc[mask, "quantity_on_hand"] = (q + float(delta)).clip(lower=0)
-    return df2
+    if isinstance(df, (InventoryOverlay, InventoryStore)):
+        return df.update_stock(product_id, delta)
+    return bulk_update_stock(df, [(product_id, delta)])
 
 
-# ---------- Low-stock / expiry helpers (kept here for app imports) ----------
-def _to_date(x) -> Optional[date]:
-    if pd.isna(x) or x == "":
-        return None
-    try:
-        # accept both date and datetime strings
-        d = pd.to_datetime(x)
-        return d.date() if isinstance(d, (pd.Timestamp, datetime)) else d
-    except Exception:
-        return None
+def bulk_update_stock(df: pd.DataFrame, changes) -> pd.DataFrame:
+    """
+    Apply many (product_id, delta) changes (or a frame with product_id / delta
+    columns) in order, as if update_stock were called for each: quantities
+    clip at zero after every change and an unknown id raises KeyError.
+    Done in one vectorized step; a plain frame is copied once, not per change.
+    """
+    if isinstance(df, (InventoryOverlay, InventoryStore)):
+        return df.bulk_update_stock(changes)
+    if "Product_ID" not in df.columns:
+        raise KeyError("Product_ID column missing")
+    return InventoryStore(df).bulk_update_stock(changes).frame()
 
 
+# ---------- Low-stock / expiry helpers (kept here for app imports) ----------
 def low_stock(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df.copy()
@@ -53,11 +63,7 @@ def low_stock(df: pd.DataFrame) -> pd.DataFrame:
 def expiring_soon(df: pd.DataFrame, days: int = 7) -> pd.DataFrame:
     if df.empty or "expiration_date" not in df.columns:
         return pd.DataFrame(columns=df.columns)
-    today = date.today()
-    df2 = df.copy()
-    df2["_exp"] = df2["expiration_date"].apply(_to_date)
-    mask = df2["_exp"].notna() & (df2["_exp"] >= today) & (df2["_exp"] <= (today + timedelta(days=days)))
-    return df2.loc[mask].drop(columns=["_exp"])
+    return df.iloc[expiry_index(df).within(days)]
 
 
 # ---------- Feature engineering ----------
@@ -67,105 +73,143 @@ def compute_features(df: pd.DataFrame) -> pd.DataFrame:
       - Days_to_Expiry
       - Stock_Value
       - Category_Share
+    Values come from the feature store (float32, computed once per data version),
+    or for a session InventoryOverlay from its incrementally maintained features.
     """
+    if isinstance(df, InventoryOverlay):
+        out = df.frame().copy()
+        for c, values in df.features().items():
+            out[c] = values.to_numpy()
+        return out
     if df.empty:
         return df.copy()
 
     out = df.copy()
-
-    # Days_to_Expiry
-    today = date.today()
-    exp = out.get("expiration_date")
-    if exp is not None:
-        out["Days_to_Expiry"] = exp.apply(_to_date).apply(
-            lambda d: (d - today).days if d is not None else np.nan
-        )
-    else:
-        out["Days_to_Expiry"] = np.nan
-
-    # Stock_Value
-    price = pd.to_numeric(out.get("unit_price_inr", 0), errors="coerce").fillna(0)
-    qty = pd.to_numeric(out.get("quantity_on_hand", 0), errors="coerce").fillna(0)
-    out["Stock_Value"] = price * qty
-
-    # Category_Share (share of stock value within each Category)
-    if "Category" in out.columns:
-        by_cat = out.groupby("Category")["Stock_Value"].transform("sum").replace(0, np.nan)
-        out["Category_Share"] = (out["Stock_Value"] / by_cat).fillna(0.0)
-    else:
-        out["Category_Share"] = 0.0
-
+    feats = feature_frame(df)
+    for c in ENGINEERED:
+        out[c] = feats[c].to_numpy(dtype=np.float64)
     return out
 
 
 # ---------- Modeling ----------
-def train_inventory_model(df_feat: pd.DataFrame) -> Optional[Dict[str, Any]]:
+# RandomForest settings of the original demo model; other engines use their defaults
+ENGINE_PARAMS = {
+    "rf": {"n_estimators": 200, "max_depth": None, "n_jobs": -1},
+}
+# Default search spaces for tune_inventory_model
+PARAM_GRIDS = {
+    "rf": {"n_estimators": [100, 200], "max_depth": [None, 8, 16], "min_samples_leaf": [1, 5, 20],
+           "max_features": [1.0, 0.5]},
+    "hgb": {"learning_rate": [0.03, 0.1, 0.3], "max_leaf_nodes": [15, 31, 63],
+            "min_samples_leaf": [10, 20, 50], "l2_regularization": [0.0, 1.0]},
+}
+
+
+def _price_xy(df_feat: pd.DataFrame):
+    """Feature-store matrix and unit_price_inr target, rows with any missing value dropped."""
+    feats = feature_frame(df_feat)
+    X = feats[PRICE_FEATURES]
+    y = feats["unit_price_inr"] if "unit_price_inr" in feats.columns else pd.Series(np.nan, index=feats.index)
+    mask = y.notna() & X.notna().all(axis=1)
+    return X.loc[mask], y.loc[mask]
+
+
+def train_inventory_model(df_feat: pd.DataFrame, register: bool = False,
+                          registry_dir: str = REGISTRY_DIR, engine: str = "rf",
+                          test_size: float = 0.2, **params) -> Optional[Dict[str, Any]]:
     """
     Simple demo model:
       X -> ['quantity_on_hand', 'Days_to_Expiry', 'Category_Share']
       y -> unit_price_inr (regression)
-    Returns metrics for baseline and RandomForest, plus sample predictions.
+    Returns metrics for baseline and the chosen engine ("rf" RandomForest or
+    "hgb" histogram gradient boosting, see model_trainer.ENGINES) under the
+    engine's name, its wall time (and peak memory with measure_memory=True,
+    see model_trainer.fit_engine), plus sample predictions.
+    With register=True the fitted model is saved to the model registry and
+    the result carries its "version".
     """
     if df_feat.empty:
         return None
-
-    # Prepare features/target
-    y = pd.to_numeric(df_feat.get("unit_price_inr", np.nan), errors="coerce")
-    X = pd.DataFrame({
-        "quantity_on_hand": pd.to_numeric(df_feat.get("quantity_on_hand", np.nan), errors="coerce"),
-        "Days_to_Expiry": pd.to_numeric(df_feat.get("Days_to_Expiry", np.nan), errors="coerce"),
-        "Category_Share": pd.to_numeric(df_feat.get("Category_Share", np.nan), errors="coerce"),
-    })
-
-    mask = y.notna() & X.notna().all(axis=1)
-    X = X.loc[mask]
-    y = y.loc[mask]
-
+    X, y = _price_xy(df_feat)
     if len(X) < 30:
         # not enough data to split reliably
         return None
 
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=min(0.2, max(0.2, 0.2)), random_state=42
+        X, y, test_size=test_size, random_state=42
     )
 
-    # --- Baseline: predict mean of y_train ---
-    baseline_pred = np.full(shape=y_test.shape, fill_value=float(y_train.mean()))
-    baseline_mae = mean_absolute_error(y_test, baseline_pred)
-    # robust RMSE (works on any sklearn version)
-    try:
-        baseline_rmse = mean_squared_error(y_test, baseline_pred, squared=False)
-    except TypeError:
-        baseline_rmse = np.sqrt(mean_squared_error(y_test, baseline_pred))
-    baseline_r2 = r2_score(y_test, baseline_pred)
-
-    # --- RandomForest ---
-    rf = RandomForestRegressor(
-        n_estimators=200,
-        max_depth=None,
-        random_state=42,
-        n_jobs=-1,
-    )
-    rf.fit(X_train, y_train)
-    y_hat = rf.predict(X_test)
-
-    rf_mae = mean_absolute_error(y_test, y_hat)
-    try:
-        rf_rmse = mean_squared_error(y_test, y_hat, squared=False)
-    except TypeError:
-        rf_rmse = np.sqrt(mean_squared_error(y_test, y_hat))
-    rf_r2 = r2_score(y_test, y_hat)
+    model, run = fit_engine(engine, X_train, y_train, X_test, y_test,
+                            **{**ENGINE_PARAMS.get(engine, {}), **params})
 
     pred_samples = pd.DataFrame({
         "quantity_on_hand": X_test["quantity_on_hand"].values,
         "Days_to_Expiry": X_test["Days_to_Expiry"].values,
         "Category_Share": X_test["Category_Share"].values,
         "y_true": y_test.values,
-        "y_pred": y_hat,
+        "y_pred": run.pop("y_pred"),
     }).head(20)
 
-    return {
-        "baseline": {"MAE": float(baseline_mae), "RMSE": float(baseline_rmse), "R2": float(baseline_r2)},
-        "rf": {"MAE": float(rf_mae), "RMSE": float(rf_rmse), "R2": float(rf_r2)},
-        "pred_samples": pred_samples,
-    }
+    result = {**run, "pred_samples": pred_samples}
+    if register:
+        result["version"] = register_model(
+            PRICE_MODEL_NAME, model, PRICE_FEATURES,
+            metrics={"engine": engine, "baseline": run["baseline"], engine: run[engine],
+                     "n_train": int(len(X_train))},
+            fill_values={c: float(X_train[c].median()) for c in PRICE_FEATURES},
+            data_version=df_feat.attrs.get("data_version"),
+            registry_dir=registry_dir,
+        )
+    return result
+
+
+def tune_inventory_model(df_feat: pd.DataFrame, engine: str = "rf", param_grid: Optional[Dict[str, list]] = None,
+                         k: int = 5, max_configs: Optional[int] = 20, n_jobs: Optional[int] = None,
+                         tuning_dir: str = TUNING_DIR) -> Optional[pd.DataFrame]:
+    """
+    k-fold cross-validated search over `param_grid` (default PARAM_GRIDS[engine],
+    at most max_configs sampled configs) on a process pool of n_jobs workers.
+    Completed (config, fold) fits are cached under tuning_dir, so rerunning
+    resumes. Returns per-config mean/std metrics, best first; pass
+    `result["params"][0]` to train_inventory_model(**params) to fit it.
+    """
+    if df_feat.empty:
+        return None
+    X, y = _price_xy(df_feat)
+    if len(X) < 30 * k:
+        return None
+    return cross_validate_search(X, y, param_grid or PARAM_GRIDS[engine], engine=engine, k=k,
+                                 max_configs=max_configs, n_jobs=n_jobs, tuning_dir=tuning_dir)
+
+
+# ---------- Inference ----------
+def predict_prices(frame: pd.DataFrame, version: Optional[str] = None,
+                   registry_dir: str = REGISTRY_DIR, rows=None) -> Optional[np.ndarray]:
+    """
+    Predicted unit_price_inr for every row of `frame` (or only the row
+    positions in `rows`) in one batch, using the registered price model
+    (latest unless `version` is given). Features are read from the feature
+    store for the whole frame, then the requested rows are taken out;
+    missing values get the training medians. Returns None if no model has been registered.
+    If the version has a compact export (forest_export.export_registered),
+    batches of up to COMPACT_MAX_ROWS rows are evaluated on that array form
+    without loading the sklearn forest; larger batches, where sklearn's
+    compiled walk is faster, use the sklearn model.
+    """
+    version = version or latest_version(PRICE_MODEL_NAME, registry_dir)
+    meta = load_meta(PRICE_MODEL_NAME, version, registry_dir)
+    if meta is None or frame.empty or (rows is not None and len(rows) == 0):
+        return None if meta is None else np.array([], dtype=float)
+    X = feature_frame(frame)[meta["features"]]
+    if rows is not None:
+        X = X.iloc[rows]
+    X = X.fillna(meta.get("fill_values", {})).fillna(0.0)
+    if len(X) <= COMPACT_MAX_ROWS:
+        compact = load_compact(compact_path(PRICE_MODEL_NAME, version, registry_dir))
+        if compact is not None:
+            return compact.predict(X.to_numpy())
+    loaded = load_model(PRICE_MODEL_NAME, version, registry_dir)
+    if loaded is None:
+        compact = load_compact(compact_path(PRICE_MODEL_NAME, version, registry_dir))
+        return None if compact is None else compact.predict(X.to_numpy())
+    return loaded[0].predict(X)
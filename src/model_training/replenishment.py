@@ -0,0 +1,127 @@
+# src/model_training/replenishment.py
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from src.components.feature_store import days_to_expiry
+from src.model_training.shopping_list import ShoppingList, add_from_inventory_rows, estimate_unit_prices
+from src.utils import low_stock
+
+EXPIRY_HORIZON_DAYS = 7  # stock expiring within this many days doesn't count as on hand
+TIME_LIMIT_S = 0.2       # MILP time limit; the greedy basket is used if it runs out
+MIP_GAP = 1e-3           # stop once within 0.1% of the optimum
+
+
+def _numbers(df: pd.DataFrame, col: str, default: float = 0.0) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), default)
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(values), default, values)
+
+
+def urgency(rows: pd.DataFrame, horizon: int = EXPIRY_HORIZON_DAYS, today: Optional[date] = None) -> np.ndarray:
+    """
+    How badly each low-stock product needs restocking, in [0, 1]: the share
+    of its reorder_level that is missing, counting stock that expires within
+    `horizon` days as already gone.
+    """
+    qty = np.maximum(_numbers(rows, "quantity_on_hand"), 0.0)
+    level = _numbers(rows, "reorder_level")
+    if "expiration_date" in rows.columns:
+        dte = days_to_expiry(rows["expiration_date"], today)
+        qty = np.where(dte <= horizon, 0.0, qty)  # NaN (no date) keeps its stock
+    return np.clip(np.divide(level - qty, level, out=np.zeros(len(rows)), where=level > 0), 0.0, 1.0)
+
+
+def reorder_lots(rows: pd.DataFrame) -> np.ndarray:
+    """Units bought per restock: reorder_quantity, at least 1."""
+    return np.maximum(_numbers(rows, "reorder_quantity", 1.0), 1.0)
+
+
+def _greedy(value: np.ndarray, cost: np.ndarray, budget: float):
+    """
+    (basket, LP bound, break ratio): items by value-per-rupee while they fit,
+    then any cheaper ones that still fit; the LP relaxation's optimum and the
+    value/cost ratio of the item it takes fractionally.
+    """
+    ratio = np.divide(value, cost, out=np.full(len(value), np.inf), where=cost > 0)
+    order = np.argsort(-ratio, kind="stable")
+    spent = np.cumsum(cost[order])
+    fits = spent <= budget + 1e-9
+    brk = int(np.argmin(fits)) if not fits.all() else len(order)
+    take = np.zeros(len(value), dtype=bool)
+    take[order[:brk]] = True
+    bound = value[take].sum()
+    lam = 0.0
+    if brk < len(order):
+        i = order[brk]
+        lam = value[i] / cost[i]
+        bound += lam * (budget - (spent[brk - 1] if brk else 0.0))
+    left = budget - cost[take].sum()
+    for i in order[brk:]:
+        if cost[i] <= left + 1e-9:
+            take[i], left = True, left - cost[i]
+    return take, bound, lam
+
+
+def choose_basket(value: np.ndarray, cost: np.ndarray, budget: float) -> np.ndarray:
+    """
+    0/1 knapsack: which items to buy to maximise total value with total
+    cost <= budget. Items whose LP reduced cost already decides them
+    (taking / dropping them would cost more than the gap between the LP
+    bound and the greedy basket) are fixed; the rest are solved as one MILP
+    (scipy HiGHS). Falls back to the greedy basket if the solver fails or
+    hits TIME_LIMIT_S.
+    """
+    value, cost = np.asarray(value, dtype=np.float64), np.asarray(cost, dtype=np.float64)
+    if len(value) == 0 or budget <= 0:
+        return (cost <= 0) & (value > 0)
+    if cost.sum() <= budget:
+        return value > 0
+    greedy, bound, lam = _greedy(value, cost, budget)
+    gap = bound - value[greedy].sum()
+    reduced = value - lam * cost
+    fixed_in, core = reduced > gap + 1e-9, np.abs(reduced) <= gap + 1e-9
+    take = fixed_in.copy()
+    if core.any():
+        res = milp(-value[core], constraints=LinearConstraint(cost[None, core], -np.inf,
+                                                              budget - cost[fixed_in].sum()),
+                   integrality=np.ones(int(core.sum())), bounds=Bounds(0, 1),
+                   options={"time_limit": TIME_LIMIT_S, "mip_rel_gap": MIP_GAP})
+        if res.x is None:
+            return greedy
+        take[core] = res.x > 0.5
+    return take if value[take].sum() >= value[greedy].sum() else greedy
+
+
+def plan_restock(df: pd.DataFrame, budget: float, horizon: int = EXPIRY_HORIZON_DAYS,
+                 today: Optional[date] = None) -> pd.DataFrame:
+    """
+    Restock basket for every low-stock product (see utils.low_stock), one
+    reorder of reorder_quantity units each at unit_price_inr per unit
+    (estimated by the price model when missing), chosen to maximise total urgency within
+    `budget` (e.g. check_budget_status(...)["remaining"]). Returns the
+    low-stock rows with urgency, restock_qty, cost (= unit_price_inr x
+    restock_qty) and selected, most urgent first.
+    """
+    rows = low_stock(df)
+    if rows.empty:
+        return rows.assign(urgency=pd.Series(dtype=float), cost=pd.Series(dtype=float),
+                           selected=pd.Series(dtype=bool))
+    value = urgency(rows, horizon, today)
+    lot = reorder_lots(rows)
+    cost = estimate_unit_prices(rows, df) * lot
+    take = choose_basket(value, cost, float(budget))
+    out = rows.assign(urgency=value, restock_qty=lot, cost=cost, selected=take)
+    return out.sort_values(["selected", "urgency"], ascending=[False, False], kind="stable")
+
+
+def fill_shopping_list(shopping_list, plan: pd.DataFrame, inventory: Optional[pd.DataFrame] = None) -> ShoppingList:
+    """Add the selected products of `plan` (from plan_restock(inventory, ...)), restock_qty units each,
+    to the shopping list in one batch."""
+    chosen = plan[plan["selected"]] if "selected" in plan.columns else plan
+    qty = chosen["restock_qty"].to_numpy() if "restock_qty" in chosen.columns else reorder_lots(chosen)
+    return add_from_inventory_rows(shopping_list, chosen, qty=qty, note="restock", inventory=inventory)
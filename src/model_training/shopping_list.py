@@ -1,48 +1,219 @@
 # src/model_training/shopping_list.py
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
 import pandas as pd
 
+from src.components.inventory_store import product_index
+from src.model_training.inventory import predict_prices
+
 def _price(row) -> float:
-    """Safely extract a numeric price from row."""
+    """Safely extract a numeric price from row (rounded to paise: prices may be float32)."""
     try:
-        return float(row.get("unit_price_inr", 0) or 0)
+        return round(float(row.get("unit_price_inr", 0) or 0), 2)
     except Exception:
         return 0.0
 
-def add_from_inventory_row(shopping_list: list, row: pd.Series, qty: float, unit: str):
-    """Add an inventory item to the shopping list, computing est_price automatically."""
+def estimate_unit_prices(rows: pd.DataFrame, inventory: Optional[pd.DataFrame] = None) -> np.ndarray:
+    """Listed unit_price_inr per row; rows without a usable price get the
+    registered price model's estimate, predicted for all of them in one batch.
+    Pass the `inventory` the rows come from so their features (Category_Share)
+    are computed over the whole inventory; rows are matched by Product_ID."""
+    listed = pd.to_numeric(rows.get("unit_price_inr", pd.Series(np.nan, index=rows.index)), errors="coerce")
+    prices = np.array(listed, dtype=float)
+    missing = ~(prices > 0)
+    if not missing.any():
+        return np.round(prices, 2)
+    predicted = np.zeros(int(missing.sum()))
+    found = np.zeros(len(predicted), dtype=bool)
+    if inventory is not None and not inventory.empty and {"Product_ID"} <= set(rows.columns) & set(inventory.columns):
+        index = product_index(inventory)
+        codes = index.lookup(rows["Product_ID"].to_numpy()[missing])
+        found = codes >= 0
+        if found.any():
+            pred = predict_prices(inventory, rows=index.first(codes[found]))
+            predicted[found] = pred if pred is not None else 0.0
+    if not found.all():
+        # not in the inventory: features of these rows on their own
+        pred = predict_prices(rows.loc[missing].loc[~found])
+        predicted[~found] = pred if pred is not None else 0.0
+    prices[missing] = predicted
+    return np.round(prices, 2)
+
+COLUMNS = ["name", "brand", "qty", "unit", "unit_price_inr", "est_price", "note"]
+_TEXT = ("name", "brand", "unit", "note", "product_id")
+_NUMBERS = ("qty", "unit_price_inr", "est_price")
+
+
+class ShoppingList:
+    """
+    Shopping list stored column-wise in growable NumPy arrays. Lines are
+    indexed by (product, unit): adding a product that is already on the
+    list adds to that line's qty instead of creating a duplicate. The sum of
+    est_price is kept up to date on every change, so `total` is O(1).
+    """
+
+    def __init__(self, capacity: int = 16):
+        self._n = 0
+        self._cols = {c: np.empty(capacity, dtype=object) for c in _TEXT}
+        self._cols.update({c: np.zeros(capacity) for c in _NUMBERS})
+        self._index: Dict[tuple, int] = {}
+        self._total = 0.0
+
+    @classmethod
+    def from_records(cls, items: Optional[Iterable[Dict[str, Any]]]) -> "ShoppingList":
+        """Build from a list of item dicts (the previous representation)."""
+        if isinstance(items, ShoppingList):
+            return items
+        out = cls()
+        for item in items or []:
+            out.add(item.get("name", ""), item.get("brand", ""), item.get("qty", 0), item.get("unit", ""),
+                    item.get("unit_price_inr", 0), product_id=item.get("product_id"), note=item.get("note", ""))
+        return out
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    @staticmethod
+    def _key(name, brand, unit, product_id) -> tuple:
+        product = str(product_id) if product_id is not None and not pd.isna(product_id) else (str(name), str(brand))
+        return (product, str(unit))
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._cols["qty"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for c, arr in self._cols.items():
+            grown = np.empty(capacity, dtype=arr.dtype) if arr.dtype == object else np.zeros(capacity)
+            grown[:self._n] = arr[:self._n]
+            self._cols[c] = grown
+
+    # ---------- edits ----------
+    def add(self, name: str, brand: str, qty: float, unit: str, unit_price: float,
+            product_id: Optional[str] = None, note: str = "") -> int:
+        """Add qty of a product; returns the line position it landed on."""
+        unit_price = float(unit_price or 0)
+        key = self._key(name, brand, unit, product_id)
+        pos = self._index.get(key)
+        if pos is None:
+            self._grow(self._n + 1)
+            pos = self._n
+            self._n += 1
+            self._index[key] = pos
+            for c, v in (("name", name), ("brand", brand), ("unit", unit), ("note", note),
+                         ("product_id", product_id)):
+                self._cols[c][pos] = v
+            self._cols["unit_price_inr"][pos] = unit_price
+            self._cols["qty"][pos] = 0.0
+            self._cols["est_price"][pos] = 0.0
+        self.set_qty(pos, self._cols["qty"][pos] + float(qty))
+        return pos
+
+    def set_qty(self, index: int, qty: float) -> None:
+        est = self._cols["unit_price_inr"][index] * float(qty)
+        self._total += est - self._cols["est_price"][index]
+        self._cols["qty"][index] = float(qty)
+        self._cols["est_price"][index] = est
+
+    def remove(self, index: int) -> None:
+        self._total -= self._cols["est_price"][index]
+        for arr in self._cols.values():
+            arr[index:self._n - 1] = arr[index + 1:self._n]
+        self._n -= 1
+        self._cols["est_price"][self._n] = 0.0
+        self._index = {k: (p if p < index else p - 1) for k, p in self._index.items() if p != index}
+        if self._n == 0:
+            self._total = 0.0  # drop accumulated rounding
+
+    # ---------- reads ----------
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of one column."""
+        view = self._cols[name][:self._n]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame view over the column arrays (no copy of the data)."""
+        data = {c: pd.Series(self.column(c), dtype=object if c in _TEXT else None, copy=False) for c in COLUMNS}
+        return pd.DataFrame(data, copy=False)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Item dicts, e.g. for persisting (see state.save_session)."""
+        out = []
+        for i in range(self._n):
+            item = {c: self._cols[c][i] for c in COLUMNS}
+            item.update({c: float(item[c]) for c in _NUMBERS})
+            item["product_id"] = self._cols["product_id"][i]
+            out.append(item)
+        return out
+
+
+def _as_list(shopping_list) -> ShoppingList:
+    return ShoppingList.from_records(shopping_list)
+
+
+def _row_value(row, col: str):
+    return row.get(col) if col in row else None
+
+
+def add_from_inventory_row(shopping_list, row: pd.Series, qty: float, unit: str,
+                           inventory: Optional[pd.DataFrame] = None) -> ShoppingList:
+    """Add an inventory item to the shopping list, computing est_price automatically.
+    Adding a product already on the list (same unit) increases its qty."""
     name = str(row.get("Product_Name", "")) if "Product_Name" in row else ""
     brand = str(row.get("Brand", "")) if "Brand" in row else ""
     unit_price = _price(row)
-    est = unit_price * float(qty)
-
-    item = {
-        "name": name,
-        "brand": brand,
-        "qty": float(qty),
-        "unit": unit,
-        "unit_price_inr": unit_price,
-        "est_price": est,
-        "note": ""
-    }
-
-    shopping_list = shopping_list or []   # ensure it's a list
-    shopping_list.append(item)
+    if not unit_price > 0:  # missing (NaN) or zero price: ask the model
+        unit_price = float(estimate_unit_prices(row.to_frame().T, inventory)[0])
+
+    shopping_list = _as_list(shopping_list)
+    shopping_list.add(name, brand, float(qty), unit, unit_price, product_id=_row_value(row, "Product_ID"))
     return shopping_list
 
-def as_dataframe(shopping_list: list) -> pd.DataFrame:
-    """Convert shopping list (list of dicts) into a clean DataFrame."""
+def add_from_inventory_rows(shopping_list, rows: pd.DataFrame, qty=1.0, unit=None, note="",
+                            inventory: Optional[pd.DataFrame] = None) -> ShoppingList:
+    """Add many inventory rows at once; prices are estimated in one batch (see estimate_unit_prices).
+    `qty`/`unit`/`note` may be scalars or per-row sequences (unit defaults to the row's unit)."""
+    shopping_list = _as_list(shopping_list)
+    if rows.empty:
+        return shopping_list
+    n = len(rows)
+    prices = estimate_unit_prices(rows, inventory)
+    qtys = np.broadcast_to(np.asarray(qty, dtype=float), (n,))
+    if unit is None:
+        units = rows["unit"].astype(str).tolist() if "unit" in rows.columns else ["pcs"] * n
+    else:
+        units = [unit] * n if isinstance(unit, str) else list(unit)
+    names = rows["Product_Name"].astype(str).tolist() if "Product_Name" in rows.columns else [""] * n
+    brands = rows["Brand"].astype(str).tolist() if "Brand" in rows.columns else [""] * n
+    ids = rows["Product_ID"].tolist() if "Product_ID" in rows.columns else [None] * n
+    notes = [note] * n if isinstance(note, str) else list(note)
+    for name, brand, q, u, p, pid, nt in zip(names, brands, qtys.tolist(), units, prices.tolist(), ids, notes):
+        shopping_list.add(name, brand, q, u, p, product_id=pid, note=nt)
+    return shopping_list
+
+def as_dataframe(shopping_list) -> pd.DataFrame:
+    """Shopping list as a DataFrame (a view over a ShoppingList's columns)."""
+    if isinstance(shopping_list, ShoppingList):
+        return shopping_list.to_frame()
     if not shopping_list:
-        return pd.DataFrame(columns=["name","brand","qty","unit","unit_price_inr","est_price","note"])
-    
+        return pd.DataFrame(columns=COLUMNS)
+
     df = pd.DataFrame(shopping_list)
-    cols = ["name","brand","qty","unit","unit_price_inr","est_price","note"]
-    for c in cols:
+    for c in COLUMNS:
         if c not in df.columns:
             df[c] = pd.NA
-    return df[cols]
+    return df[COLUMNS]
 
-def estimate_total(shopping_list: list) -> float:
-    """Estimate total cost of shopping list."""
+def estimate_total(shopping_list) -> float:
+    """Estimate total cost of shopping list (O(1) for a ShoppingList)."""
+    if isinstance(shopping_list, ShoppingList):
+        return shopping_list.total
     if not shopping_list:
         return 0.0
     try:
@@ -50,9 +221,12 @@ def estimate_total(shopping_list: list) -> float:
     except Exception:
         return 0.0
 
-def update_qty(shopping_list: list, index: int, new_qty: float):
+def update_qty(shopping_list, index: int, new_qty: float):
     """Update quantity of an item at index."""
     if 0 <= index < len(shopping_list):
+        if isinstance(shopping_list, ShoppingList):
+            shopping_list.set_qty(index, new_qty)
+            return shopping_list
         item = shopping_list[index]
         item["qty"] = float(new_qty)
         unit_price = float(item.get("unit_price_inr", 0) or 0)
@@ -60,8 +234,11 @@ def update_qty(shopping_list: list, index: int, new_qty: float):
         shopping_list[index] = item
     return shopping_list
 
-def remove_item(shopping_list: list, index: int):
+def remove_item(shopping_list, index: int):
     """Remove an item from shopping list by index."""
     if 0 <= index < len(shopping_list):
-        shopping_list.pop(index)
+        if isinstance(shopping_list, ShoppingList):
+            shopping_list.remove(index)
+        else:
+            shopping_list.pop(index)
     return shopping_list
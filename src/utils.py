@@ -1,8 +1,10 @@
 # utils.py
 import pandas as pd
-from datetime import date, timedelta
 from typing import Optional
 
+from src.components.expiry_index import expiry_index
+from src.components.search_index import search_index
+
 def to_date(s: Optional[str]):
     if pd.isna(s) or s == "":
         return None
@@ -22,28 +24,15 @@ def low_stock(df: pd.DataFrame):
 def expiring_soon(df: pd.DataFrame, days: int = 7):
     if df.empty or "expiration_date" not in df.columns:
         return pd.DataFrame(columns=df.columns)
-    df2 = df.copy()
-    today = date.today()
-    df2["_exp"] = df2["expiration_date"].apply(to_date)
-    mask = df2["_exp"].notna() & (df2["_exp"] >= today) & (df2["_exp"] <= (today + timedelta(days=days)))
-    return df2.loc[mask].drop(columns=["_exp"])
+    return df.iloc[expiry_index(df).within(days)]
 
 def expired(df: pd.DataFrame):
     if df.empty or "expiration_date" not in df.columns:
         return pd.DataFrame(columns=df.columns)
-    df2 = df.copy()
-    today = date.today()
-    df2["_exp"] = df2["expiration_date"].apply(to_date)
-    mask = df2["_exp"].notna() & (df2["_exp"] < today)
-    return df2.loc[mask].drop(columns=["_exp"])
+    return df.iloc[expiry_index(df).expired()]
 
-def search_inventory(df: pd.DataFrame, text: str):
+def search_inventory(df: pd.DataFrame, text: str, limit: Optional[int] = None):
+    """Rows whose Product_Name, Brand or Category contains `text`, best matches first."""
     if df.empty or not text:
         return df.copy()
-    s = text.lower()
-    mask = df.get("Product_Name", pd.Series([], dtype=str)).astype(str).str.lower().str.contains(s)
-    if "Category" in df.columns:
-        mask = mask | df["Category"].astype(str).str.lower().str.contains(s)
-    if "Brand" in df.columns:
-        mask = mask | df["Brand"].astype(str).str.lower().str.contains(s)
-    return df.loc[mask].copy()
+    return df.iloc[search_index(df).search(text, limit=limit)]
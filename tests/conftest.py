@@ -0,0 +1,19 @@
+# tests/conftest.py
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    """A fresh artifacts/ holding only the repo's data.csv, as the working directory's."""
+    (tmp_path / "artifacts").mkdir()
+    shutil.copy(ROOT / "artifacts" / "data.csv", tmp_path / "artifacts" / "data.csv")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "artifacts"
@@ -0,0 +1,35 @@
+# tests/test_app.py
+import pytest
+
+from tests.conftest import ROOT
+
+testing = pytest.importorskip("streamlit.testing.v1")
+
+
+def _app():
+    return testing.AppTest.from_file(str(ROOT / "app.py"), default_timeout=120).run()
+
+
+def _page(at, name: str, user: str = "All users"):
+    at.selectbox(key="user_choice").select(user).run()
+    at.sidebar.radio[0].set_value(name).run()
+    assert not at.exception
+    return at
+
+
+def _widget(widgets, label: str):
+    return next(w for w in widgets if w.label == label)
+
+
+@pytest.mark.parametrize("user", ["All users", "U0003"])
+def test_dietary_suggestion_added_to_shopping_list(artifacts, user):
+    at = _page(_app(), "Dietary Preferences", user)
+    _widget(at.selectbox, "Choose a product").select_index(1).run()
+    _widget(at.button, "Add suggestion to Shopping List").click().run()
+    assert not at.exception
+    assert len(at.session_state["shopping_list"]) == 1
+
+
+@pytest.mark.parametrize("page", ["Dashboard", "Inventory", "Recipes", "Shopping List", "Budget", "Expiry Alerts"])
+def test_pages_render_with_user_selected(artifacts, page):
+    _page(_app(), page, "U0003")
@@ -0,0 +1,66 @@
+# tests/test_feature_store.py
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.components.feature_store import ENGINEERED, engineer
+from src.components.shared_inventory import InventoryOverlay
+
+
+def _inventory() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Product_ID": ["P1", "P2", "P3", "P4", "P5"],
+        "Category": pd.Categorical(["dairy", "dairy", "grains", "grains", None]),
+        "unit_price_inr": [50.0, 20.0, 80.0, np.nan, 10.0],
+        "quantity_on_hand": [4.0, 10.0, 1.0, 3.0, 7.0],
+        "expiration_date": pd.to_datetime(["2024-01-10", None, "2024-03-01", "2024-02-01", "2024-01-05"]),
+    })
+
+
+def _assert_consistent(overlay: InventoryOverlay):
+    merged = overlay.frame()
+    assert overlay._features.is_consistent(merged)
+    live, full = overlay.features(), engineer(merged, overlay._features.today)
+    for c in ENGINEERED:
+        np.testing.assert_allclose(live[c].to_numpy(), full[c], atol=1e-9)
+
+
+def test_incremental_features_match_a_full_recompute_after_each_edit():
+    overlay = InventoryOverlay(_inventory())
+    overlay.features()  # maintained incrementally from here on
+    edits = [
+        lambda o: o.update_stock("P1", -3),
+        lambda o: o.bulk_update_stock([("P2", 5), ("P3", -10), ("P2", -1)]),
+        lambda o: o.add_product({"Product_ID": "P6", "Category": "frozen", "unit_price_inr": 30.0,
+                                 "quantity_on_hand": 2.0, "expiration_date": "2024-01-20"}),
+        lambda o: o.add_product({"Product_ID": "P7", "Category": "dairy", "unit_price_inr": 5.0,
+                                 "quantity_on_hand": 6.0}),
+        lambda o: o.set_category("P2", "grains"),       # base row moves category
+        lambda o: o.set_category("P5", "dairy"),        # uncategorised base row gets one
+        lambda o: o.set_category("P7", "bakery"),       # appended row moves to a new category
+        lambda o: o.update_stock("P7", 4),
+        lambda o: o.set_category("P3", None),           # row leaves its category
+        lambda o: o.update_stock("P2", 100),
+    ]
+    for apply in edits:
+        apply(overlay)
+        _assert_consistent(overlay)
+    categories = overlay.frame()["Category"].fillna("-").tolist()
+    assert categories == ["dairy", "grains", "-", "grains", "dairy", "frozen", "bakery"]
+
+
+def test_edits_are_replayed_consistently_after_rebase():
+    overlay = InventoryOverlay(_inventory())
+    overlay.update_stock("P1", 2).set_category("P1", "grains").add_product({"Product_ID": "P6", "Category": "dairy"})
+    overlay.features()
+    overlay.rebase(_inventory().iloc[::-1].reset_index(drop=True))
+    overlay.features()
+    _assert_consistent(overlay)
+    merged = overlay.frame().set_index("Product_ID")
+    assert merged.loc["P1", "Category"] == "grains" and merged.loc["P1", "quantity_on_hand"] == 6.0
+
+
+def test_engineer_uses_the_given_day():
+    full = engineer(_inventory(), date(2024, 1, 1))
+    assert full["Days_to_Expiry"][0] == 9.0 and np.isnan(full["Days_to_Expiry"][1])
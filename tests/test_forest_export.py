@@ -0,0 +1,63 @@
+# tests/test_forest_export.py
+import json
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.components import forest_export
+from src.components.forest_export import benchmark, export_forest, load_compact, save_compact
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 3)).astype(np.float32)
+    y = 3 * X[:, 0] + np.sin(X[:, 1]) + rng.normal(scale=0.5, size=len(X))
+    return RandomForestRegressor(n_estimators=30, random_state=0).fit(X, y)
+
+
+def _rows(n: int) -> np.ndarray:
+    return np.random.default_rng(1).normal(size=(n, 3)).astype(np.float32)
+
+
+@pytest.mark.parametrize("n", [0, 1, 7, 5000])
+def test_compact_predictions_match_sklearn(forest, n):
+    compact = export_forest(forest, FEATURES)
+    X = _rows(n)
+    got = compact.predict(X)
+    assert got.shape == (n,)
+    if n:
+        np.testing.assert_allclose(got, forest.predict(X), atol=1e-3)
+    # a block of one tree at a time walks the same paths
+    np.testing.assert_allclose(compact.predict(X, block_pairs=1), got, atol=1e-6)
+
+
+def test_children_are_adjacent(forest):
+    compact = export_forest(forest, FEATURES)
+    inner = compact.left >= 0
+    assert np.array_equal(compact.right[inner], compact.left[inner] + 1)
+    assert np.all(compact.right[~inner] == -1)
+
+
+def test_load_skips_exports_with_an_older_layout(forest, tmp_path):
+    path = save_compact(export_forest(forest, FEATURES), tmp_path / "compact")
+    assert load_compact(path).n_trees == 30
+
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    del meta["layout"]
+    (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    forest_export._LOADED.clear()
+    assert load_compact(path) is None
+
+
+def test_benchmark_reports_matching_predictions(forest, tmp_path):
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(forest, model_path)
+    compact_dir = save_compact(export_forest(forest, FEATURES), tmp_path / "compact")
+    report = benchmark(model_path, compact_dir, _rows(2000), repeats=1)
+    assert report["compact"]["max_abs_diff"] < 1e-3
+    assert report["sklearn"]["rows_per_s"] > 0 and report["compact"]["rows_per_s"] > 0
@@ -0,0 +1,70 @@
+# tests/test_partitions.py
+import numpy as np
+import pandas as pd
+
+from src.components.partitions import PartitionDirectory, user_products
+from src.components.shared_inventory import InventoryOverlay
+from src.components.tables import normalize
+
+
+def _log() -> pd.DataFrame:
+    # P1: U1 bought it last on day 3, U2 on day 2 (so the products table holds U1's purchase)
+    return pd.DataFrame({
+        "User_ID": ["U1", "U2", "U1", "U2", "U1"],
+        "Product_ID": ["P1", "P1", "P1", "P2", "P2"],
+        "Product_Name": ["Milk", "Milk", "Milk", "Rice", "Rice"],
+        "Category": ["dairy", "dairy", "dairy", "grains", "grains"],
+        "purchase_date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05", None]),
+        "quantity_on_hand": [5.0, 9.0, 7.0, 2.0, 4.0],
+        "expiration_date": pd.to_datetime(["2024-02-01", "2024-02-02", "2024-02-03", "2024-03-05", "2024-03-01"]),
+        "unit_price_inr": [50.0, 55.0, 52.0, 80.0, 75.0],
+    })
+
+
+def _views(log: pd.DataFrame):
+    tables = normalize(log)
+    directory = PartitionDirectory.build(tables.transactions["user_key"].to_numpy(), len(tables.users))
+    return tables, {u: user_products(tables.products, tables.transactions, directory, k)
+                    for k, u in enumerate(tables.users["User_ID"].astype(str))}
+
+
+def test_user_view_stock_is_the_users_own_latest_purchase():
+    tables, views = _views(_log())
+    assert tables.products["quantity_on_hand"].tolist() == [7.0, 4.0]  # latest by anyone, NaT last
+
+    u1, u2 = views["U1"], views["U2"]
+    assert u1["Product_ID"].astype(str).tolist() == ["P1", "P2"]
+    assert u1["quantity_on_hand"].tolist() == [7.0, 4.0]
+    assert u2["Product_ID"].astype(str).tolist() == ["P1", "P2"]
+    assert u2["quantity_on_hand"].tolist() == [9.0, 2.0]
+    assert u2["unit_price_inr"].tolist() == [55.0, 80.0]
+    assert u2["expiration_date"].tolist() == list(pd.to_datetime(["2024-02-02", "2024-03-05"]))
+    assert list(u2.index) == [0, 1]
+
+
+def test_user_views_match_own_purchases_on_the_dataset(artifacts):
+    from src.components.state import load_partitions, load_tables
+
+    tables = load_tables(str(artifacts))
+    tx = tables.transactions
+    directory = load_partitions(str(artifacts))
+    for key in (0, 5, len(tables.users) - 1):
+        view = user_products(tables.products, tx, directory, key)
+        own = tx.iloc[np.flatnonzero(tx["user_key"].to_numpy() == key)]
+        last = (own.assign(_date=pd.to_datetime(own["purchase_date"]))
+                .sort_values("_date", kind="stable").drop_duplicates("product_key", keep="last")
+                .sort_values("product_key"))
+        assert (view["Product_ID"].astype(str).to_numpy()
+                == tables.products["Product_ID"].astype(str).to_numpy()[last["product_key"]]).all()
+        for col in ("quantity_on_hand", "unit_price_inr", "reorder_level"):
+            np.testing.assert_allclose(view[col].to_numpy(float), last[col].to_numpy(float))
+        assert (view["expiration_date"].to_numpy() == last["expiration_date"].to_numpy()).all()
+
+
+def test_session_stock_changes_replay_on_the_users_own_stock():
+    tables, views = _views(_log())
+    overlay = InventoryOverlay(tables.products)
+    overlay.update_stock("P1", 10).update_stock("P1", -12).update_stock("P2", -100)
+    assert overlay.frame()["quantity_on_hand"].tolist() == [5.0, 0.0]
+    assert overlay.replay_edits(views["U2"])["quantity_on_hand"].tolist() == [7.0, 0.0]
+    assert overlay.replay_edits(views["U1"])["quantity_on_hand"].tolist() == [5.0, 0.0]